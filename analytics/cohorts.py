@@ -0,0 +1,128 @@
+"""
+Cohort retention and churn.
+
+Members are grouped by join month. A member counts as retained in month k
+of their cohort if any of their subscriptions that actually ran (see
+NOT_RUN_STATUSES) covers some day of that month.
+
+Everything is loaded with one LEFT JOIN query (members without subscriptions
+still count towards their cohort's size) into NumPy arrays. The member x month
+coverage is then expanded, de-duplicated and counted with vectorised
+operations, so the cost is a few array passes over the rows rather than
+Python work per member. Results are cached for COHORT_CACHE_SECONDS.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils.timezone import now
+
+from analytics.metrics import NOT_RUN_STATUSES
+from members.models import Member
+
+COHORT_CACHE_SECONDS = 60 * 60
+
+
+def month_index(day):
+    """Months since 1970-01, the unit of datetime64[M]"""
+    return (day.year - 1970) * 12 + day.month - 1
+
+
+def _months(dates):
+    # ISO strings (None -> NaT) parsed by NumPy; NaT becomes a huge negative number
+    return np.array(dates, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def _rates(values, observable):
+    return [round(float(value), 4) if i < observable and np.isfinite(value) else None
+            for i, value in enumerate(values)]
+
+
+def cohort_cache_key(cohorts, months):
+    return f'analytics:cohorts:{now().date().isoformat()}:{cohorts}:{months}'
+
+
+def load_intervals(since, until):
+    """
+    One query: member id, join month, subscription start and end month and
+    whether the subscription ran, for every member who joined between
+    ``since`` and ``until``. Members who never subscribed appear once with
+    ran=False. Dates are fetched as ISO text and parsed by NumPy in bulk,
+    which is far cheaper than building a Python date per value.
+    """
+    rows = Member.objects.filter(join_date__range=(since, until)).values_list(
+        'id',
+        Cast('join_date', CharField()),
+        Cast('subscriptions__start_date', CharField()),
+        Cast('subscriptions__end_date', CharField()),
+        'subscriptions__status',
+    ).order_by()
+    member_ids, join_dates, starts, ends, statuses = zip(*rows) if rows else ((),) * 5
+    ran = np.array([status is not None and status not in NOT_RUN_STATUSES for status in statuses], dtype=bool)
+    return np.array(member_ids, dtype=np.int64), _months(join_dates), _months(starts), _months(ends), ran
+
+
+def compute_cohort_matrix(cohorts=12, months=12, today=None):
+    """
+    Retention for the last ``cohorts`` join months, over ``months`` months
+    after joining (month 0 is the join month). Cells that lie in the future
+    are None.
+    """
+    today = today or now().date()
+    first_cohort = month_index(today) - cohorts + 1
+    since = np.datetime64(first_cohort, 'M').astype('datetime64[D]').item()
+
+    member_ids, join_months, start_months, end_months, ran = load_intervals(since, today)
+    width = months
+
+    # Cohort sizes: one entry per distinct member
+    members, first_row = np.unique(member_ids, return_index=True)
+    cohort_of_row = join_months - first_cohort
+    member_cohort = cohort_of_row[first_row]
+    sizes = np.bincount(member_cohort, minlength=cohorts)
+
+    # Month offsets (relative to joining) covered by each subscription,
+    # clipped to the months we report on
+    join_m = join_months[ran]
+    start_off = np.maximum(start_months[ran] - join_m, 0)
+    end_off = np.minimum(end_months[ran] - join_m, width - 1)
+    keep = end_off >= start_off
+    start_off, end_off = start_off[keep], end_off[keep]
+    member_of_sub = np.searchsorted(members, member_ids[ran][keep])
+
+    # Expand every interval to one entry per covered month
+    lengths = end_off - start_off + 1
+    total = int(lengths.sum())
+    interval_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = np.repeat(start_off, lengths) + (np.arange(total) - interval_starts)
+    member_month = np.unique(np.repeat(member_of_sub, lengths) * width + offsets)
+
+    # Back to (cohort, offset) counts of distinct members
+    cells = member_cohort[member_month // width] * width + member_month % width
+    retained = np.bincount(cells, minlength=cohorts * width).reshape(cohorts, width)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retention = retained / sizes[:, None]
+        churn = 1 - retained[:, 1:] / retained[:, :-1]
+
+    result = []
+    for cohort in range(cohorts):
+        observable = cohorts - cohort  # months from the join month up to and including this month
+        result.append({
+            'cohort': str(np.datetime64(first_cohort + cohort, 'M')),
+            'members': int(sizes[cohort]),
+            'retained': [int(v) if i < observable else None for i, v in enumerate(retained[cohort])],
+            'retention': _rates(retention[cohort], observable),
+            # Net share of last month's retained members not retained this month
+            'churn': [None] + _rates(churn[cohort], observable - 1),
+        })
+    return {'cohorts': result, 'months': months}
+
+
+def get_cohort_matrix(cohorts=12, months=12):
+    key = cohort_cache_key(cohorts, months)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = compute_cohort_matrix(cohorts, months)
+        cache.set(key, matrix, COHORT_CACHE_SECONDS)
+    return matrix
@@ -0,0 +1,165 @@
+"""
+Renewal forecast for subscriptions expiring in the next 30/60/90 days.
+
+Historical renewal rates come from subscriptions whose outcome is already
+known: they ended at least RENEWAL_GRACE_DAYS ago. Such a subscription
+counts as renewed when the same member started an is_renewal subscription
+after it began and no later than RENEWAL_GRACE_DAYS past its end. Rates are
+kept per plan and per tenure bucket (how long the member had been with the
+gym when the subscription ended), falling back to the plan-wide rate and
+then to the overall rate where a bucket has no history.
+
+Both the rates and the upcoming expiries are GROUP BY aggregates, so the
+work does not grow with the number of members. The nightly sweep
+(analytics.tasks.snapshot_daily_metrics) recomputes the forecast and caches
+it until the next sweep; a request on a day the sweep has not run yet
+computes it on the spot.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Case, Count, DateField, Exists, ExpressionWrapper, F, OuterRef, Q, Value, When
+from django.utils.timezone import now
+
+from analytics.metrics import NOT_RUN_STATUSES
+from subscriptions.models import Subscription
+from subscriptions.windows import expiring_subscriptions, expiry_window
+
+FORECAST_WINDOWS = (30, 60, 90)
+RENEWAL_GRACE_DAYS = 30
+HISTORY_DAYS = 365
+FORECAST_CACHE_KEY = 'analytics:renewal-forecast'
+
+# (label, tenure in days below which a subscription falls in the bucket)
+TENURE_BUCKETS = [
+    ('0-6 months', 182),
+    ('6-12 months', 365),
+    ('1-2 years', 730),
+    ('2+ years', None),
+]
+
+
+def _tenure_bucket():
+    """Tenure at the end of the subscription, as a CASE over the member's join date."""
+    whens = [
+        When(end_date__lt=ExpressionWrapper(F('member__join_date') + timedelta(days=limit),
+                                            output_field=DateField()),
+             then=Value(label))
+        for label, limit in TENURE_BUCKETS if limit is not None
+    ]
+    return Case(*whens, default=Value(TENURE_BUCKETS[-1][0]))
+
+
+def renewal_rates(today=None):
+    """
+    {(plan_id, bucket): (ended, renewed)} over subscriptions that ended in
+    the HISTORY_DAYS before the grace period.
+    """
+    today = today or now().date()
+    latest_end = today - timedelta(days=RENEWAL_GRACE_DAYS)
+    renewal = Subscription.objects.filter(
+        member=OuterRef('member'),
+        is_renewal=True,
+        start_date__gt=OuterRef('start_date'),
+        start_date__lte=ExpressionWrapper(OuterRef('end_date') + timedelta(days=RENEWAL_GRACE_DAYS),
+                                          output_field=DateField()),
+    )
+    rows = (Subscription.objects
+            .filter(end_date__range=(latest_end - timedelta(days=HISTORY_DAYS), latest_end))
+            .exclude(status__in=NOT_RUN_STATUSES)
+            .annotate(bucket=_tenure_bucket(), renewed=Exists(renewal))
+            .values('plan_id', 'bucket')
+            .annotate(ended=Count('id'), renewed_count=Count('id', filter=Q(renewed=True)))
+            .order_by())
+    return {(row['plan_id'], row['bucket']): (row['ended'], row['renewed_count']) for row in rows}
+
+
+def _rate(ended, renewed):
+    return renewed / ended if ended else None
+
+
+def compute_renewal_forecast(today=None):
+    today = today or now().date()
+    history = renewal_rates(today)
+
+    by_plan = defaultdict(lambda: [0, 0])
+    overall = [0, 0]
+    for (plan_id, _bucket), (ended, renewed) in history.items():
+        by_plan[plan_id][0] += ended
+        by_plan[plan_id][1] += renewed
+        overall[0] += ended
+        overall[1] += renewed
+    overall_rate = _rate(*overall) or 0.0
+
+    def rate_for(plan_id, bucket):
+        for rate in (_rate(*history.get((plan_id, bucket), (0, 0))), _rate(*by_plan.get(plan_id, (0, 0)))):
+            if rate is not None:
+                return rate
+        return overall_rate
+
+    longest = max(FORECAST_WINDOWS)
+    window_counts = {
+        f'within_{days}': Count('id', filter=Q(end_date__lte=expiry_window(days, today)[1]))
+        for days in FORECAST_WINDOWS
+    }
+    upcoming = (expiring_subscriptions(longest, today)
+                .annotate(bucket=_tenure_bucket())
+                .values('plan_id', 'plan__name', 'plan__price', 'bucket')
+                .annotate(**window_counts)
+                .order_by('plan__name', 'bucket'))
+
+    windows = {days: {'days': days, 'expiring': 0, 'expected_renewals': 0.0,
+                      'expected_revenue': Decimal('0'), 'by_plan': {}} for days in FORECAST_WINDOWS}
+    for row in upcoming:
+        rate = rate_for(row['plan_id'], row['bucket'])
+        for days in FORECAST_WINDOWS:
+            expiring = row[f'within_{days}']
+            if not expiring:
+                continue
+            expected = expiring * rate
+            window = windows[days]
+            window['expiring'] += expiring
+            window['expected_renewals'] += expected
+            window['expected_revenue'] += row['plan__price'] * Decimal(str(round(expected, 4)))
+            plan = window['by_plan'].setdefault(row['plan_id'], {
+                'plan_id': row['plan_id'], 'plan_name': row['plan__name'],
+                'expiring': 0, 'expected_renewals': 0.0, 'expected_revenue': Decimal('0'),
+            })
+            plan['expiring'] += expiring
+            plan['expected_renewals'] += expected
+            plan['expected_revenue'] += row['plan__price'] * Decimal(str(round(expected, 4)))
+
+    for window in windows.values():
+        window['expected_renewals'] = round(window['expected_renewals'], 1)
+        window['expected_revenue'] = window['expected_revenue'].quantize(Decimal('0.01'))
+        window['by_plan'] = [
+            dict(plan, expected_renewals=round(plan['expected_renewals'], 1),
+                 expected_revenue=plan['expected_revenue'].quantize(Decimal('0.01')))
+            for plan in window['by_plan'].values()
+        ]
+
+    return {
+        'date': today,
+        'windows': [windows[days] for days in FORECAST_WINDOWS],
+        'renewal_rates': [
+            {'plan_id': plan_id, 'tenure': bucket, 'ended': ended, 'renewed': renewed,
+             'rate': round(_rate(ended, renewed), 4)}
+            for (plan_id, bucket), (ended, renewed) in sorted(history.items(), key=lambda item: str(item[0]))
+        ],
+        'overall_rate': round(overall_rate, 4),
+    }
+
+
+def refresh_renewal_forecast(today=None):
+    forecast = compute_renewal_forecast(today)
+    cache.set(FORECAST_CACHE_KEY, forecast, timeout=None)
+    return forecast
+
+
+def get_renewal_forecast():
+    forecast = cache.get(FORECAST_CACHE_KEY)
+    if forecast is None or forecast['date'] != now().date():
+        forecast = refresh_renewal_forecast()
+    return forecast
@@ -0,0 +1,96 @@
+"""
+Daily metrics snapshots.
+
+compute_daily_metrics(start, end) rebuilds the DailyMetrics rows for a date
+range from grouped aggregates over the rows that changed in that range: one
+GROUP BY query per metric whatever the length of the range, plus one
+distinct-member count per day for active_members. The nightly task runs it
+for yesterday and backfill_daily_metrics runs it over history in chunks.
+Rows are upserted on date, so recomputing a day is harmless.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+
+from analytics.models import DailyMetrics
+from members.models import Member
+from subscriptions.models import Subscription, SubscriptionHistory
+
+# Subscriptions in these states never ran to their end date, so they count
+# neither towards active members nor towards expiries
+NOT_RUN_STATUSES = ('pending', 'cancelled')
+
+METRIC_FIELDS = [
+    'active_members', 'new_members', 'new_subscriptions', 'renewals',
+    'expiries', 'cancellations', 'revenue', 'renewal_revenue',
+]
+
+
+def date_range(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def compute_daily_metrics(start, end=None):
+    """Recompute and store the metrics for every day from start to end inclusive."""
+    end = end or start
+    rows = defaultdict(lambda: dict.fromkeys(METRIC_FIELDS, 0))
+
+    joined = (Member.objects.filter(join_date__range=(start, end))
+              .values('join_date').annotate(count=Count('id')).order_by())
+    for row in joined:
+        rows[row['join_date']]['new_members'] = row['count']
+
+    created = (Subscription.objects.filter(created_at__date__range=(start, end))
+               .annotate(day=TruncDate('created_at')).values('day')
+               .annotate(
+                   new_subscriptions=Count('id', filter=Q(is_renewal=False)),
+                   renewals=Count('id', filter=Q(is_renewal=True)),
+                   revenue=Sum('plan__price'),
+                   renewal_revenue=Sum('plan__price', filter=Q(is_renewal=True)),
+               ).order_by())
+    for row in created:
+        rows[row.pop('day')].update({key: value or 0 for key, value in row.items()})
+
+    expired = (Subscription.objects.filter(end_date__range=(start, end))
+               .exclude(status__in=NOT_RUN_STATUSES)
+               .values('end_date').annotate(count=Count('id')).order_by())
+    for row in expired:
+        rows[row['end_date']]['expiries'] = row['count']
+
+    # A subscription can collect several "cancelled" snapshots; count it on
+    # the day of the first one
+    cancelled = SubscriptionHistory.objects.filter(snapshot__status='cancelled')
+    first_cancelled = (cancelled
+                       .filter(subscription_id__in=cancelled.filter(created_at__date__range=(start, end))
+                               .values('subscription_id'))
+                       .values('subscription_id').annotate(first=Min('created_at')).order_by())
+    for row in first_cancelled:
+        day = localtime(row['first']).date()
+        if start <= day <= end:
+            rows[day]['cancellations'] += 1
+
+    running = Subscription.objects.exclude(status__in=NOT_RUN_STATUSES)
+    for day in date_range(start, end):
+        rows[day]['active_members'] = (running.filter(start_date__lte=day, end_date__gte=day)
+                                       .values('member_id').distinct().count())
+
+    snapshots = [
+        DailyMetrics(date=day, **{
+            field: Decimal(value) if field.endswith('revenue') else value
+            for field, value in rows[day].items()
+        })
+        for day in date_range(start, end)
+    ]
+    return DailyMetrics.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=METRIC_FIELDS + ['computed_at'],
+    )
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('active_members', models.IntegerField(default=0, help_text='Members with a subscription covering the day')),
+                ('new_members', models.IntegerField(default=0, help_text='Members who joined on the day')),
+                ('new_subscriptions', models.IntegerField(default=0, help_text='First-time enrollments created on the day')),
+                ('renewals', models.IntegerField(default=0, help_text='Renewal subscriptions created on the day')),
+                ('expiries', models.IntegerField(default=0, help_text='Subscriptions whose last day was the day')),
+                ('cancellations', models.IntegerField(default=0, help_text='Subscriptions first recorded as cancelled on the day')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('renewal_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Metrics',
+                'verbose_name_plural': 'Daily Metrics',
+                'ordering': ['date'],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class DailyMetrics(models.Model):
+    """One row per calendar day, written by analytics.metrics.compute_daily_metrics"""
+    date = models.DateField(unique=True)
+
+    active_members = models.IntegerField(default=0, help_text="Members with a subscription covering the day")
+    new_members = models.IntegerField(default=0, help_text="Members who joined on the day")
+    new_subscriptions = models.IntegerField(default=0, help_text="First-time enrollments created on the day")
+    renewals = models.IntegerField(default=0, help_text="Renewal subscriptions created on the day")
+    expiries = models.IntegerField(default=0, help_text="Subscriptions whose last day was the day")
+    cancellations = models.IntegerField(default=0, help_text="Subscriptions first recorded as cancelled on the day")
+
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    renewal_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metrics for {self.date}"
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = 'Daily Metrics'
+        verbose_name_plural = 'Daily Metrics'
@@ -0,0 +1,155 @@
+"""
+Revenue reports by day, week or month.
+
+Each report is a GROUP BY over subscriptions created in the range, bucketed
+with TruncDay/TruncWeek/TruncMonth and split into first-time enrollments and
+renewals. Amounts are the plan's list price, as there is no separate payment
+record.
+
+A period that has ended can no longer gain subscriptions, so its rows are
+cached for CLOSED_PERIOD_CACHE_SECONDS. Only the current period and any
+closed period not yet in the cache are recomputed, in a single query
+covering the earliest to the latest missing period.
+
+Closed periods can still change: their amounts come from each plan's current
+price, and a subscription can change plan or be deleted. Those writes bump
+the revenue version (analytics/signals.py, and subscriptions/bulk.py for
+bulk updates, which send no signals), which is part of every cache
+key, so the old entries are no longer read and expire on their own.
+"""
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.utils.timezone import now
+
+from subscriptions.models import Subscription
+
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# grouping -> {ORM path: name in the response}
+GROUPINGS = {
+    'plan': {'plan_id': 'plan_id', 'plan__name': 'plan_name'},
+    'plan_type': {'plan__plan_type': 'plan_type'},
+    'total': {},
+}
+
+# Subscription fields (attnames) the revenue of a closed period depends on
+REVENUE_FIELDS = frozenset({'plan_id', 'is_renewal', 'created_at'})
+
+VERSION_KEY = 'analytics:revenue:version'
+# Long enough to serve closed periods for weeks, short enough that entries
+# orphaned by a version bump drain from the cache
+CLOSED_PERIOD_CACHE_SECONDS = 30 * 24 * 3600
+
+AMOUNT_FIELDS = ['new_revenue', 'renewal_revenue', 'total_revenue']
+COUNT_FIELDS = ['new_enrollments', 'renewals']
+
+
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start, period):
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def revenue_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Evicted or never set: entries cached under an older version are ignored
+        cache.add(VERSION_KEY, time.time(), None)
+        version = cache.get(VERSION_KEY, time.time())
+    return version
+
+
+def invalidate_revenue():
+    cache.set(VERSION_KEY, time.time(), None)
+
+
+def _cache_key(version, period, grouping, start):
+    return f'analytics:revenue:{version}:{period}:{grouping}:{start.isoformat()}'
+
+
+def _aggregate(start, end, period, grouping):
+    """Rows for subscriptions created on or after ``start`` and before ``end``, keyed by period."""
+    renames = GROUPINGS[grouping]
+    rows = (Subscription.objects
+            .filter(created_at__date__gte=start, created_at__date__lt=end)
+            .annotate(period=PERIODS[period]('created_at', output_field=DateField()))
+            .values('period', *renames)
+            .annotate(
+                new_enrollments=Count('id', filter=Q(is_renewal=False)),
+                renewals=Count('id', filter=Q(is_renewal=True)),
+                new_revenue=Sum('plan__price', filter=Q(is_renewal=False), default=Decimal('0')),
+                renewal_revenue=Sum('plan__price', filter=Q(is_renewal=True), default=Decimal('0')),
+            )
+            .order_by('period', *renames))
+
+    by_period = defaultdict(list)
+    for row in rows:
+        report_row = {'period': row['period']}
+        report_row.update({name: row[path] for path, name in renames.items()})
+        report_row.update({field: row[field] for field in COUNT_FIELDS})
+        report_row.update({
+            'new_revenue': row['new_revenue'],
+            'renewal_revenue': row['renewal_revenue'],
+            'total_revenue': row['new_revenue'] + row['renewal_revenue'],
+        })
+        by_period[row['period']].append(report_row)
+    return by_period
+
+
+def revenue_report(start, end, period='month', grouping='plan', today=None):
+    """
+    Revenue rows for every period overlapping ``start``..``end`` (inclusive),
+    plus totals across them. Ranges are widened to whole periods.
+    """
+    today = today or now().date()
+    periods = []
+    current = period_start(start, period)
+    while current <= end:
+        periods.append(current)
+        current = next_period(current, period)
+
+    version = revenue_version()
+    keys = {p: _cache_key(version, period, grouping, p) for p in periods}
+    closed = {p for p in periods if next_period(p, period) <= today}
+    cached = cache.get_many([keys[p] for p in periods if p in closed])
+    rows_by_period = {p: cached[keys[p]] for p in periods if keys[p] in cached}
+
+    missing = [p for p in periods if p not in rows_by_period]
+    if missing:
+        computed = _aggregate(missing[0], next_period(missing[-1], period), period, grouping)
+        for p in missing:
+            rows_by_period[p] = computed.get(p, [])
+        cache.set_many({keys[p]: rows_by_period[p] for p in missing if p in closed},
+                       timeout=CLOSED_PERIOD_CACHE_SECONDS)
+
+    rows = [row for p in periods for row in rows_by_period[p]]
+    totals = {field: sum((row[field] for row in rows), Decimal('0')) for field in AMOUNT_FIELDS}
+    totals.update({field: sum(row[field] for row in rows) for field in COUNT_FIELDS})
+    return {
+        'period': period,
+        'group_by': grouping,
+        'start': periods[0] if periods else start,
+        'end': next_period(periods[-1], period) - timedelta(days=1) if periods else end,
+        'rows': rows,
+        'totals': totals,
+    }
@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from analytics.models import DailyMetrics
+
+
+class DailyMetricsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyMetrics
+        fields = [
+            'date', 'active_members', 'new_members', 'new_subscriptions', 'renewals',
+            'expiries', 'cancellations', 'revenue', 'renewal_revenue', 'computed_at',
+        ]
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from analytics.revenue import REVENUE_FIELDS, invalidate_revenue
+from plans.models import MembershipPlan
+from subscriptions.models import Subscription
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_delete, sender=Subscription)
+def invalidate_revenue_on_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_revenue)
+
+
+@receiver(post_save, sender=Subscription)
+def invalidate_revenue_on_subscription_change(sender, instance, created, **kwargs):
+    if created:
+        return  # Lands in the current period, which is never cached
+    # Subscription.save() updates _loaded_values after post_save, so they
+    # still hold the values before this save
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None or any(
+        attname in loaded and loaded[attname] != getattr(instance, attname) for attname in REVENUE_FIELDS
+    ):
+        transaction.on_commit(invalidate_revenue)
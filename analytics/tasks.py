@@ -0,0 +1,26 @@
+import logging
+from datetime import date, timedelta
+
+from celery import shared_task
+from django.utils.timezone import now
+
+from analytics.forecast import refresh_renewal_forecast
+from analytics.metrics import compute_daily_metrics
+from gymcrm.db_router import read_from_replica
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def snapshot_daily_metrics(day=None):
+    """
+    Nightly: store yesterday's DailyMetrics row (or ``day``, as YYYY-MM-DD)
+    and replace the cached renewal forecast with today's.
+    """
+    day = date.fromisoformat(day) if day else now().date() - timedelta(days=1)
+    # Report queries; each block moves to the primary once it writes
+    with read_from_replica():
+        compute_daily_metrics(day)
+    logger.info("Stored daily metrics for %s", day)
+    with read_from_replica():
+        refresh_renewal_forecast()
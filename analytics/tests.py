@@ -0,0 +1,320 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from analytics.cohorts import compute_cohort_matrix
+from analytics.forecast import HISTORY_DAYS, RENEWAL_GRACE_DAYS, compute_renewal_forecast, renewal_rates
+from analytics.metrics import NOT_RUN_STATUSES, compute_daily_metrics
+from analytics.models import DailyMetrics
+from analytics.revenue import period_start
+from analytics.tasks import snapshot_daily_metrics
+from gymcrm.testing import add_edge_cases
+from management.models import User
+from members.models import Member
+from plans.models import MembershipPlan
+from subscriptions import seeding
+from subscriptions.bulk import bulk_update_subscriptions
+from subscriptions.models import Subscription, SubscriptionHistory
+from subscriptions.windows import expiring_subscriptions
+
+
+class DailyMetricsComputationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(members=30, subscriptions=90, history=0, seed_value=3)
+        add_edge_cases(1)
+
+    def test_matches_per_day_queries(self):
+        today = date.today()
+        start = today - timedelta(days=60)
+        compute_daily_metrics(start, today)
+
+        running = Subscription.objects.exclude(status__in=NOT_RUN_STATUSES)
+        for row in DailyMetrics.objects.filter(date__range=(start, today)):
+            created = Subscription.objects.filter(created_at__date=row.date)
+            self.assertEqual(row.new_members, Member.objects.filter(join_date=row.date).count())
+            self.assertEqual(row.new_subscriptions, created.filter(is_renewal=False).count())
+            self.assertEqual(row.renewals, created.filter(is_renewal=True).count())
+            self.assertEqual(row.revenue, created.aggregate(total=Sum('plan__price'))['total'] or Decimal('0'))
+            self.assertEqual(row.expiries, running.filter(end_date=row.date).count())
+            self.assertEqual(
+                row.active_members,
+                running.filter(start_date__lte=row.date, end_date__gte=row.date).values('member').distinct().count(),
+            )
+        self.assertEqual(DailyMetrics.objects.count(), 61)
+
+    def test_recompute_overwrites(self):
+        day = date.today()
+        compute_daily_metrics(day)
+        DailyMetrics.objects.filter(date=day).update(active_members=-1)
+        compute_daily_metrics(day)
+        self.assertEqual(DailyMetrics.objects.filter(date=day).count(), 1)
+        self.assertGreaterEqual(DailyMetrics.objects.get(date=day).active_members, 0)
+
+    def test_cancellation_counted_once(self):
+        today = date.today()
+        compute_daily_metrics(today)
+        before = DailyMetrics.objects.get(date=today).cancellations
+
+        subscription = Subscription.objects.filter(status='active').first()
+        subscription.status = 'cancelled'
+        subscription.save()
+        for note in ("Subscription cancelled", "Cancellation re-confirmed"):
+            SubscriptionHistory.objects.create(
+                subscription=subscription, snapshot={'status': 'cancelled'}, member_snapshot={}, note=note,
+            )
+        compute_daily_metrics(today)
+        self.assertEqual(DailyMetrics.objects.get(date=today).cancellations, before + 1)
+
+    def test_backfill_command(self):
+        end = date.today() - timedelta(days=1)
+        call_command('backfill_daily_metrics', start=end - timedelta(days=9), end=end, chunk_days=4, stdout=StringIO())
+        self.assertEqual(DailyMetrics.objects.filter(date__range=(end - timedelta(days=9), end)).count(), 10)
+
+
+class DailyMetricsEndpointTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='manager', email='manager@club7.local', password='x', role='admin', is_staff=True,
+        )
+        today = date.today()
+        DailyMetrics.objects.bulk_create([
+            DailyMetrics(date=today - timedelta(days=offset), active_members=offset) for offset in range(40)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_defaults_to_last_30_days(self):
+        response = self.client.get('/api/analytics/daily-metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 30)
+
+    def test_date_range(self):
+        end = date.today() - timedelta(days=5)
+        start = end - timedelta(days=9)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analytics/daily-metrics/', {'start': start, 'end': end})
+        self.assertEqual([row['date'] for row in response.data],
+                         [str(start + timedelta(days=i)) for i in range(10)])
+
+    def test_invalid_date(self):
+        response = self.client.get('/api/analytics/daily-metrics/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_retrieve_by_date(self):
+        response = self.client.get(f'/api/analytics/daily-metrics/{date.today()}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['active_members'], 0)
+
+
+class RevenueReportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='accounts', email='accounts@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=30, subscriptions=120, history=0, seed_value=5)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_matches_python_totals(self):
+        today = date.today()
+        start = period_start(today - timedelta(days=400), 'month')
+        response = self.client.get('/api/analytics/revenue/', {'period': 'month', 'group_by': 'plan_type',
+                                                               'start': start, 'end': today})
+        self.assertEqual(response.status_code, 200)
+
+        expected = {}
+        report_range = (response.data['start'], response.data['end'])
+        for subscription in Subscription.objects.filter(created_at__date__range=report_range).select_related('plan'):
+            key = (period_start(subscription.created_at.date(), 'month'), subscription.plan.plan_type)
+            new, renewal = expected.get(key, (Decimal('0'), Decimal('0')))
+            if subscription.is_renewal:
+                renewal += subscription.plan.price
+            else:
+                new += subscription.plan.price
+            expected[key] = (new, renewal)
+
+        actual = {(row['period'], row['plan_type']): (row['new_revenue'], row['renewal_revenue'])
+                  for row in response.data['rows']}
+        self.assertEqual(actual, expected)
+        self.assertEqual(response.data['totals']['total_revenue'], sum(new + renewal for new, renewal in expected.values()))
+
+    def test_closed_periods_are_cached(self):
+        today = date.today()
+        params = {'period': 'week', 'group_by': 'plan', 'start': today - timedelta(weeks=20), 'end': today}
+        first = self.client.get('/api/analytics/revenue/', params)
+        # Only the current, still-open week is recomputed
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/analytics/revenue/', params)
+        self.assertEqual(first.data, second.data)
+
+        closed = dict(params, end=period_start(today, 'week') - timedelta(days=1))
+        self.client.get('/api/analytics/revenue/', closed)
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/revenue/', closed)
+
+    def test_plan_and_subscription_changes_refresh_closed_periods(self):
+        today = date.today()
+        closed = {'period': 'month', 'group_by': 'total', 'start': today - timedelta(days=400),
+                  'end': period_start(today, 'month') - timedelta(days=1)}
+        total = lambda: self.client.get('/api/analytics/revenue/', closed).data['totals']['total_revenue']
+        before = total()
+
+        in_report = Subscription.objects.filter(
+            created_at__date__range=(period_start(closed['start'], 'month'), closed['end']))
+        subscription = in_report.select_related('plan').order_by('created_at').first()
+        plan = subscription.plan
+        sold = in_report.filter(plan=plan)
+        with self.captureOnCommitCallbacks(execute=True):
+            plan.price += 100
+            plan.save()
+        self.assertEqual(total(), before + 100 * sold.count())
+
+        other = MembershipPlan.objects.exclude(pk=plan.pk).order_by('price').first()
+        before = total()
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.plan = other
+            subscription.save()
+        self.assertEqual(total(), before - plan.price + other.price)
+
+        before = total()
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.delete()
+        self.assertEqual(total(), before - other.price)
+
+    def test_bulk_updates_refresh_closed_periods(self):
+        today = date.today()
+        closed = {'period': 'month', 'group_by': 'total', 'start': today - timedelta(days=400),
+                  'end': period_start(today, 'month') - timedelta(days=1)}
+        totals = lambda: self.client.get('/api/analytics/revenue/', closed).data['totals']
+        before = totals()
+
+        subscription = Subscription.objects.filter(
+            created_at__date__range=(period_start(closed['start'], 'month'), closed['end']),
+            is_renewal=False,
+        ).select_related('plan').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_subscriptions(Subscription.objects.filter(pk=subscription.pk), note="Renewal", is_renewal=True)
+        after = totals()
+        self.assertEqual(after['new_revenue'], before['new_revenue'] - subscription.plan.price)
+        self.assertEqual(after['renewal_revenue'], before['renewal_revenue'] + subscription.plan.price)
+
+    def test_rejects_unknown_period(self):
+        response = self.client.get('/api/analytics/revenue/', {'period': 'quarter'})
+        self.assertEqual(response.status_code, 400)
+
+
+class CohortRetentionTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='owner', email='owner@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=60, subscriptions=200, history=0, seed_value=11)
+        add_edge_cases(1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def _naive(self, cohorts, months, today):
+        def month(day):
+            return day.year * 12 + day.month - 1
+
+        first = month(today) - cohorts + 1
+        sizes = [0] * cohorts
+        retained = [[set() for _ in range(months)] for _ in range(cohorts)]
+        for member in Member.objects.prefetch_related('subscriptions'):
+            cohort = month(member.join_date) - first
+            if not 0 <= cohort < cohorts or member.join_date > today:
+                continue
+            sizes[cohort] += 1
+            for subscription in member.subscriptions.all():
+                if subscription.status in NOT_RUN_STATUSES:
+                    continue
+                for offset in range(months):
+                    covered = month(member.join_date) + offset
+                    if month(subscription.start_date) <= covered <= month(subscription.end_date):
+                        retained[cohort][offset].add(member.id)
+        return sizes, [[len(cell) for cell in row] for row in retained]
+
+    def test_matches_per_member_calculation(self):
+        today = date.today()
+        matrix = compute_cohort_matrix(cohorts=24, months=6, today=today)
+        sizes, retained = self._naive(24, 6, today)
+        self.assertEqual([row['members'] for row in matrix['cohorts']], sizes)
+        for row, expected in zip(matrix['cohorts'], retained):
+            observable = [value for value in row['retained'] if value is not None]
+            self.assertEqual(observable, expected[:len(observable)])
+        self.assertIsNone(matrix['cohorts'][-1]['retained'][1])
+
+    def test_endpoint_is_cached(self):
+        response = self.client.get('/api/analytics/cohorts/', {'cohorts': 6, 'months': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['cohorts']), 6)
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/cohorts/', {'cohorts': 6, 'months': 3})
+
+    def test_rejects_bad_sizes(self):
+        self.assertEqual(self.client.get('/api/analytics/cohorts/', {'months': 0}).status_code, 400)
+
+
+class RenewalForecastTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='sales', email='sales@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=80, subscriptions=300, history=0, seed_value=13)
+        add_edge_cases(1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_rates_match_per_subscription_check(self):
+        today = date.today()
+        rates = renewal_rates(today)
+        latest_end = today - timedelta(days=RENEWAL_GRACE_DAYS)
+        ended = (Subscription.objects.filter(end_date__range=(latest_end - timedelta(days=HISTORY_DAYS), latest_end))
+                 .exclude(status__in=('pending', 'cancelled')))
+        renewed = sum(
+            Subscription.objects.filter(
+                member_id=subscription.member_id, is_renewal=True, start_date__gt=subscription.start_date,
+                start_date__lte=subscription.end_date + timedelta(days=RENEWAL_GRACE_DAYS),
+            ).exists()
+            for subscription in ended
+        )
+        self.assertEqual(sum(total for total, _ in rates.values()), ended.count())
+        self.assertEqual(sum(count for _, count in rates.values()), renewed)
+
+    def test_windows_use_expiring_window(self):
+        forecast = compute_renewal_forecast()
+        for window in forecast['windows']:
+            self.assertEqual(window['expiring'], expiring_subscriptions(window['days']).count())
+            self.assertLessEqual(window['expected_renewals'], window['expiring'])
+        expiring = [window['expiring'] for window in forecast['windows']]
+        self.assertEqual(expiring, sorted(expiring))
+
+    def test_cached_until_next_sweep(self):
+        first = self.client.get('/api/analytics/renewal-forecast/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get('/api/analytics/renewal-forecast/')
+
+        with mock.patch('analytics.tasks.compute_daily_metrics'), \
+                mock.patch('analytics.tasks.refresh_renewal_forecast') as refresh:
+            snapshot_daily_metrics()
+        refresh.assert_called_once_with()
@@ -0,0 +1,14 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import DailyMetricsViewSet, cohort_retention, renewal_forecast, revenue
+
+router = DefaultRouter()
+router.register(r'analytics/daily-metrics', DailyMetricsViewSet, basename='daily-metrics')
+
+urlpatterns = [
+    path('analytics/revenue/', revenue, name='revenue-report'),
+    path('analytics/cohorts/', cohort_retention, name='cohort-retention'),
+    path('analytics/renewal-forecast/', renewal_forecast, name='renewal-forecast'),
+    path('', include(router.urls)),
+]
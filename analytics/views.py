@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+
+from django.utils.timezone import now
+from rest_framework import viewsets, serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from analytics.cohorts import get_cohort_matrix
+from analytics.forecast import get_renewal_forecast
+from analytics.models import DailyMetrics
+from analytics.revenue import GROUPINGS, PERIODS, revenue_report
+from analytics.serializers import DailyMetricsSerializer
+
+DEFAULT_RANGE_DAYS = 30
+# How far back a revenue report reaches when ?start is omitted
+DEFAULT_REVENUE_SPAN = {'day': timedelta(days=29), 'week': timedelta(weeks=11), 'month': timedelta(days=334)}
+
+
+def parse_date_param(request, name, default):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise serializers.ValidationError({name: 'Use YYYY-MM-DD'})
+
+
+class DailyMetricsViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Precomputed per-day metrics. ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive)
+    picks the range; the default is the last 30 days.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = DailyMetricsSerializer
+    lookup_field = 'date'
+
+    def get_queryset(self):
+        qs = DailyMetrics.objects.all()
+        if self.action != 'list':
+            return qs
+        end = parse_date_param(self.request, 'end', now().date())
+        start = parse_date_param(self.request, 'start', end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+        return qs.filter(date__range=(start, end))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def revenue(request):
+    """
+    Revenue split into new enrollments and renewals.
+    ?period=day|week|month (default month), ?group_by=plan|plan_type|total
+    (default plan), ?start / ?end as YYYY-MM-DD.
+    """
+    period = request.query_params.get('period', 'month')
+    grouping = request.query_params.get('group_by', 'plan')
+    if period not in PERIODS:
+        raise serializers.ValidationError({'period': f"One of {', '.join(PERIODS)}"})
+    if grouping not in GROUPINGS:
+        raise serializers.ValidationError({'group_by': f"One of {', '.join(GROUPINGS)}"})
+
+    end = parse_date_param(request, 'end', now().date())
+    start = parse_date_param(request, 'start', end - DEFAULT_REVENUE_SPAN[period])
+    if start > end:
+        raise serializers.ValidationError({'start': 'Must not be after end'})
+    return Response(revenue_report(start, end, period, grouping))
+
+
+def _int_param(request, name, default, maximum):
+    try:
+        value = int(request.query_params.get(name, default))
+    except ValueError:
+        raise serializers.ValidationError({name: 'Must be a whole number'})
+    if not 1 <= value <= maximum:
+        raise serializers.ValidationError({name: f'Must be between 1 and {maximum}'})
+    return value
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def cohort_retention(request):
+    """
+    Retention and churn per join-month cohort.
+    ?cohorts= how many join months back (default 12), ?months= how many
+    months after joining to follow each cohort (default 12).
+    """
+    cohorts = _int_param(request, 'cohorts', 12, 60)
+    months = _int_param(request, 'months', 12, 60)
+    return Response(get_cohort_matrix(cohorts, months))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def renewal_forecast(request):
+    """Expected renewals and revenue for subscriptions expiring in the next 30/60/90 days."""
+    return Response(get_renewal_forecast())
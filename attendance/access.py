@@ -0,0 +1,107 @@
+"""
+The door's allow/deny decision.
+
+Each process keeps the biometric IDs of every member who may enter right
+now (active member, active subscription covering today) in memory, mapped
+to the member id, so deciding a punch is a dict lookup instead of a join.
+
+Writes that can change the set (member and subscription saves and deletes,
+bulk subscription updates) bump a version number in the shared cache on
+commit. A process compares its copy against that version at most every
+ACCESS_CHECK_SECONDS and reloads the whole set (one query) when it moved
+or the date changed, so a sale at the counter opens the door within that
+interval on every worker. The map only answers for the day it was loaded
+for; punches from other days are checked against the database
+(load_coverage()).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import localdate
+
+VERSION_KEY = 'attendance:access:version'
+# Subscriptions that covered their days: an expired one did until it lapsed
+COVERING_STATUSES = ('active', 'expired')
+
+_lock = threading.Lock()
+_state = {'members': {}, 'version': None, 'date': None, 'checked': float('-inf')}
+
+
+def load_allowed_members(today=None):
+    """{biometric_id: member_id} for every member allowed in on ``today``."""
+    from subscriptions.models import Subscription
+
+    today = today or localdate()
+    return dict(
+        Subscription.objects.filter(status='active', start_date__lte=today, member__is_active=True)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=today))
+        .exclude(member__biometric_id='')
+        .values_list('member__biometric_id', 'member_id')
+    )
+
+
+def allowed_members():
+    """The current {biometric_id: member_id} map, reloaded when stale."""
+    return current_allowed_members()[1]
+
+
+def current_allowed_members():
+    """(the day the current map is for, the map), reloaded when stale."""
+    clock = time.monotonic()
+    if clock - _state['checked'] < settings.ACCESS_CHECK_SECONDS:
+        return _state['date'], _state['members']
+
+    with _lock:
+        if clock - _state['checked'] < settings.ACCESS_CHECK_SECONDS:
+            return _state['date'], _state['members']
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Evicted or never set; start a new version so every process reloads
+            version = time.time_ns()
+            cache.add(VERSION_KEY, version, None)
+            version = cache.get(VERSION_KEY, version)
+        today = localdate()
+        if version != _state['version'] or today != _state['date']:
+            _state['members'] = load_allowed_members(today)
+            _state['version'] = version
+            _state['date'] = today
+        _state['checked'] = time.monotonic()
+        return _state['date'], _state['members']
+
+
+def load_coverage(biometric_ids, first, last):
+    """
+    {biometric_id: (member_id, [(start_date, end_date)])} of the subscriptions
+    of active members with these biometric IDs that covered any day from
+    ``first`` to ``last``. Decides punches from days other than the one the
+    in-memory map is for, such as a backlog a device replays after an
+    outage: a subscription that has lapsed since still covered its days.
+    """
+    from subscriptions.models import Subscription
+
+    coverage = {}
+    rows = (
+        Subscription.objects.filter(status__in=COVERING_STATUSES, start_date__lte=last,
+                                    member__is_active=True, member__biometric_id__in=biometric_ids)
+        .filter(Q(end_date__isnull=True) | Q(end_date__gte=first))
+        .values_list('member__biometric_id', 'member_id', 'start_date', 'end_date')
+    )
+    for biometric_id, member_id, start_date, end_date in rows:
+        coverage.setdefault(biometric_id, (member_id, []))[1].append((start_date, end_date))
+    return coverage
+
+
+def covered(coverage, biometric_id, day):
+    """The member id if ``coverage`` (load_coverage()) lets ``biometric_id`` in on ``day``, else None."""
+    member_id, periods = coverage.get(biometric_id, (None, ()))
+    if any(start <= day and (end is None or day <= end) for start, end in periods):
+        return member_id
+    return None
+
+
+def invalidate_allowed_members():
+    """Make every process reload the set on its next check."""
+    cache.set(VERSION_KEY, time.time_ns(), None)
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from attendance.models import Attendance
+
+
+@admin.register(Attendance)
+class AttendanceAdmin(admin.ModelAdmin):
+    list_display = ('punched_at', 'biometric_id', 'member', 'device_id', 'allowed')
+    list_filter = ('allowed', 'device_id')
+    search_fields = ('biometric_id', 'member__full_name')
+    list_select_related = ('member',)
+    raw_id_fields = ('member',)
+    date_hierarchy = 'punched_at'
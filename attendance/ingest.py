@@ -0,0 +1,98 @@
+"""
+Batch ingest of biometric punches.
+
+Terminals send their punches in batches (a burst at opening time can be
+hundreds per device). A batch is validated by hand rather than through a
+per-item DRF serializer, which would cost more than the insert itself,
+decided, and written with one multi-row INSERT per INSERT_BATCH punches.
+Punches from today are decided against the in-memory allow set
+(attendance.access); punches from other days, such as a backlog a device
+replays after an outage, against the subscriptions of their own day.
+Repeated punches (same device, biometric ID and time) are skipped by the
+unique constraint, so a device may safely resend a batch whose response it
+lost.
+"""
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from attendance.access import covered, current_allowed_members, load_coverage
+from attendance.models import Attendance
+from members.models import Member
+
+MAX_PUNCHES = 5_000
+INSERT_BATCH = 1_000
+BIOMETRIC_ID_LENGTH = Attendance._meta.get_field('biometric_id').max_length
+DEVICE_ID_LENGTH = Attendance._meta.get_field('device_id').max_length
+
+
+class PunchError(ValueError):
+    pass
+
+
+def parse_punches(device_id, punches):
+    """[(biometric_id, punched_at)] from the request payload; raises PunchError."""
+    if not isinstance(device_id, str) or not 0 < len(device_id) <= DEVICE_ID_LENGTH:
+        raise PunchError(f"device_id must be a string of at most {DEVICE_ID_LENGTH} characters")
+    if not isinstance(punches, list) or not punches:
+        raise PunchError("punches must be a non-empty list")
+    if len(punches) > MAX_PUNCHES:
+        raise PunchError(f"At most {MAX_PUNCHES} punches per request")
+
+    default_tz = timezone.get_current_timezone()
+    parsed = []
+    for i, punch in enumerate(punches):
+        try:
+            biometric_id = punch['biometric_id']
+            punched_at = datetime.fromisoformat(punch['punched_at'])
+        except (TypeError, KeyError, ValueError):
+            raise PunchError(f"punches[{i}]: expected {{\"biometric_id\": ..., \"punched_at\": ISO 8601 time}}")
+        if not isinstance(biometric_id, str) or not 0 < len(biometric_id) <= BIOMETRIC_ID_LENGTH:
+            raise PunchError(f"punches[{i}]: invalid biometric_id")
+        if timezone.is_naive(punched_at):
+            # Terminals report local time
+            punched_at = timezone.make_aware(punched_at, default_tz)
+        parsed.append((biometric_id, punched_at))
+    return parsed
+
+
+def ingest_punches(device_id, punches):
+    """
+    Record ``punches`` [(biometric_id, punched_at)] from ``device_id``.
+    Returns the allow/deny decision for each punch, in order, for the day of
+    the punch.
+    """
+    today, allowed = current_allowed_members()
+    days = [timezone.localdate(punched_at) for _, punched_at in punches]
+    # Punches from another day (a replayed backlog) are checked against the
+    # subscriptions of that day, in one query for the batch
+    other_days = [(biometric_id, day) for (biometric_id, _), day in zip(punches, days) if day != today]
+    coverage = load_coverage(
+        {biometric_id for biometric_id, _ in other_days},
+        min(day for _, day in other_days), max(day for _, day in other_days),
+    ) if other_days else {}
+
+    member_ids = [
+        allowed.get(biometric_id) if day == today else covered(coverage, biometric_id, day)
+        for (biometric_id, _), day in zip(punches, days)
+    ]
+    # Denied punches still record the member when the ID is known
+    unknown = {biometric_id for (biometric_id, _), member_id in zip(punches, member_ids) if member_id is None}
+    others = dict(Member.objects.filter(biometric_id__in=unknown).values_list('biometric_id', 'id')) if unknown else {}
+
+    rows, decisions = [], []
+    for (biometric_id, punched_at), member_id in zip(punches, member_ids):
+        decisions.append(member_id is not None)
+        rows.append(Attendance(
+            member_id=member_id or others.get(biometric_id),
+            biometric_id=biometric_id,
+            device_id=device_id,
+            punched_at=punched_at,
+            allowed=member_id is not None,
+        ))
+
+    # One commit for the whole batch
+    with transaction.atomic():
+        Attendance.objects.bulk_create(rows, batch_size=INSERT_BATCH, ignore_conflicts=True)
+    return decisions
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('members', '0006_member_search_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('biometric_id', models.CharField(max_length=8)),
+                ('device_id', models.CharField(max_length=50)),
+                ('punched_at', models.DateTimeField(help_text='Time of the punch as reported by the device')),
+                ('allowed', models.BooleanField(help_text='Whether the member had a valid subscription at the time')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('member', models.ForeignKey(blank=True, help_text='Empty when the biometric ID matched no member', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance', to='members.member')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance',
+                'ordering': ['-punched_at'],
+                'indexes': [models.Index(fields=['member', 'punched_at'], name='attendance__member__7e6684_idx'), models.Index(fields=['punched_at'], name='attendance__punched_1f3615_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device_id', 'biometric_id', 'punched_at'), name='unique_punch')],
+            },
+        ),
+    ]
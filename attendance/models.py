@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class Attendance(models.Model):
+    """One punch at a biometric terminal, written by attendance.ingest.ingest_punches"""
+    member = models.ForeignKey(
+        'members.Member', on_delete=models.SET_NULL, null=True, blank=True, related_name='attendance',
+        help_text="Empty when the biometric ID matched no member",
+    )
+    biometric_id = models.CharField(max_length=8)
+    device_id = models.CharField(max_length=50)
+    punched_at = models.DateTimeField(help_text="Time of the punch as reported by the device")
+    allowed = models.BooleanField(help_text="Whether the member had a valid subscription at the time")
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.biometric_id} at {self.device_id} on {self.punched_at:%Y-%m-%d %H:%M:%S}"
+
+    class Meta:
+        ordering = ['-punched_at']
+        verbose_name_plural = 'Attendance'
+        constraints = [
+            # Devices resend a batch when the response is lost; the repeat is ignored
+            models.UniqueConstraint(fields=['device_id', 'biometric_id', 'punched_at'], name='unique_punch'),
+        ]
+        indexes = [
+            models.Index(fields=['member', 'punched_at']),
+            models.Index(fields=['punched_at']),
+        ]
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from attendance.access import invalidate_allowed_members
+from members.models import Member
+from subscriptions.models import Subscription
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_access_on_change(sender, instance, **kwargs):
+    # After commit, so no process reloads the set before the change is visible
+    transaction.on_commit(invalidate_allowed_members)
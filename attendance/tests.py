@@ -0,0 +1,120 @@
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from attendance import access
+from attendance.models import Attendance
+from gymcrm.testing import add_edge_cases
+from management.models import User
+from members.models import Member
+from subscriptions import seeding
+from subscriptions.bulk import bulk_update_subscriptions
+from subscriptions.models import Subscription
+
+
+@override_settings(ACCESS_CHECK_SECONDS=0)
+class AttendanceIngestTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='door', email='door@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=20, subscriptions=60, history=0, seed_value=42)
+        add_edge_cases(1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        today = date.today()
+        valid = (Subscription.objects.filter(status='active', start_date__lte=today, end_date__gte=today,
+                                             member__is_active=True)
+                 .values_list('member_id', flat=True))
+        self.allowed = Member.objects.filter(id__in=valid).order_by('id').first()
+        self.denied = Member.objects.exclude(id__in=valid).order_by('id').first()
+
+    def _ingest(self, punches, device_id='door-1'):
+        return self.client.post('/api/attendance/ingest/', {'device_id': device_id, 'punches': punches}, format='json')
+
+    def _punch(self, member, minutes=0, days_ago=0):
+        day = timezone.localdate() - timedelta(days=days_ago)
+        punched_at = datetime.combine(day, time(6, 0)) + timedelta(minutes=minutes)
+        return {'biometric_id': member.biometric_id, 'punched_at': punched_at.isoformat()}
+
+    def test_batch_is_decided_and_stored(self):
+        punches = [self._punch(self.allowed), self._punch(self.denied), {'biometric_id': 'ZZZZZZZZ',
+                                                                          'punched_at': '2025-01-31T06:00:00+05:30'}]
+        response = self._ingest(punches)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'received': 3, 'allowed': [True, False, False]})
+        rows = {row.biometric_id: row for row in Attendance.objects.all()}
+        self.assertEqual(rows[self.allowed.biometric_id].member_id, self.allowed.id)
+        self.assertEqual(rows[self.denied.biometric_id].member_id, self.denied.id)
+        self.assertIsNone(rows['ZZZZZZZZ'].member_id)
+        self.assertFalse(timezone.is_naive(rows[self.allowed.biometric_id].punched_at))
+
+    def test_resent_batch_is_not_duplicated(self):
+        punches = [self._punch(self.allowed, minutes) for minutes in range(5)]
+        self._ingest(punches)
+        self._ingest(punches)
+        self.assertEqual(Attendance.objects.count(), 5)
+
+    def test_queries_do_not_grow_with_punches(self):
+        counts = []
+        for device_id, size in (('door-1', 2), ('door-2', 100)):
+            access.allowed_members()  # load the set outside the measured request
+            with CaptureQueriesContext(connection) as queries:
+                self._ingest([self._punch(self.denied, minutes) for minutes in range(size)], device_id)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_subscription_change_refreshes_allow_set(self):
+        self.assertNotIn(self.denied.biometric_id, access.allowed_members())
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscription.objects.create(
+                member=self.denied, plan=Subscription.objects.first().plan, status='active',
+                start_date=date.today(), end_date=date.today() + timedelta(days=30),
+            )
+        self.assertEqual(self._ingest([self._punch(self.denied)]).json()['allowed'], [True])
+
+        subscriptions = Subscription.objects.filter(member=self.denied, status='active')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_update_subscriptions(subscriptions, note="Cancelled", status='cancelled')
+        self.assertEqual(self._ingest([self._punch(self.denied, 1)]).json()['allowed'], [False])
+
+    def test_backlog_is_decided_for_the_day_of_each_punch(self):
+        today = timezone.localdate()
+        plan = Subscription.objects.first().plan
+        lapsed, renewed = Member.objects.filter(is_active=True).exclude(
+            subscriptions__status='active').exclude(biometric_id='').order_by('id')[:2]
+        Subscription.objects.create(member=lapsed, plan=plan, status='expired',
+                                    start_date=today - timedelta(days=30), end_date=today - timedelta(days=1))
+        Subscription.objects.create(member=renewed, plan=plan, status='active',
+                                    start_date=today, end_date=today + timedelta(days=30))
+        access.invalidate_allowed_members()
+
+        punches = [self._punch(lapsed, days_ago=1), self._punch(renewed, days_ago=1),
+                   self._punch(lapsed), self._punch(renewed)]
+        self.assertEqual(self._ingest(punches).json()['allowed'], [True, False, False, True])
+        rows = Attendance.objects.filter(biometric_id=renewed.biometric_id)
+        self.assertEqual(set(rows.values_list('member_id', flat=True)), {renewed.id})
+
+    def test_set_is_not_reloaded_until_stale(self):
+        access.allowed_members()
+        with override_settings(ACCESS_CHECK_SECONDS=60), mock.patch.object(access, 'load_allowed_members') as load:
+            access.allowed_members()
+            access.invalidate_allowed_members()
+            access.allowed_members()
+        load.assert_not_called()
+
+    def test_rejects_malformed_batches(self):
+        for payload in ([], [{'biometric_id': self.allowed.biometric_id}],
+                        [{'biometric_id': 'TOOLONGID', 'punched_at': '2025-01-31T06:00:00'}]):
+            self.assertEqual(self._ingest(payload).status_code, 400)
+        self.assertEqual(self._ingest([self._punch(self.allowed)], device_id='').status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import ingest
+
+urlpatterns = [
+    path('attendance/ingest/', ingest, name='attendance-ingest'),
+]
@@ -0,0 +1,24 @@
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from attendance.ingest import PunchError, ingest_punches, parse_punches
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ingest(request):
+    """
+    Punches from a biometric terminal:
+    {"device_id": "door-1", "punches": [{"biometric_id": "A1B2C3D4", "punched_at": "2025-01-31T06:02:11"}, ...]}
+    Times without an offset are taken as local time. Returns whether each
+    punch was allowed, in order.
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    try:
+        punches = parse_punches(data.get('device_id'), data.get('punches'))
+    except PunchError as e:
+        raise serializers.ValidationError({'punches': str(e)})
+    decisions = ingest_punches(data['device_id'], punches)
+    return Response({'received': len(decisions), 'allowed': decisions}, status=status.HTTP_201_CREATED)
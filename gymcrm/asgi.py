@@ -3,6 +3,12 @@ ASGI config for gymcrm project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served by uvicorn (the ``web-asgi`` service in docker-compose.yml) for
+long-lived responses such as the live dashboard stream (gymcrm/live.py),
+which would otherwise hold a WSGI worker thread per open screen, and for
+the async read endpoints under /api/async/ (gymcrm/asyncapi.py). Django
+has no lifespan support, so run uvicorn with ``--lifespan off``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
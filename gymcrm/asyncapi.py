@@ -0,0 +1,64 @@
+"""
+Async JSON endpoints.
+
+DRF views are synchronous: under ASGI each request to one is handed to a
+worker thread for its whole duration. The hottest read paths also have
+plain async Django views (under /api/async/) that await the cache and the
+async ORM instead, so many concurrent requests are served by one event
+loop. They are meant to be served from gymcrm/asgi.py under uvicorn (the
+web-asgi service); under WSGI they still work, one thread per request.
+
+async_api_view gives these views what DRF would: JWT authentication,
+a 401/405 for the wrong caller or method, and a JSON response.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+
+def authenticate(request, allow_query_token=False):
+    """
+    The active user of the request's JWT (Authorization header, or ?token=
+    where allowed, for EventSource, which cannot send headers), or None.
+    """
+    auth = JWTAuthentication()
+    raw_token = request.GET.get('token') if allow_query_token else None
+    if raw_token is None:
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        user = auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+def unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+
+def async_api_view(view):
+    """
+    Wrap an async GET view returning JSON-serializable data (or an
+    HttpResponse) so it is authenticated and rendered like the DRF views.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user = await sync_to_async(authenticate)(request)
+        if user is None:
+            return unauthorized()
+        request.user = user
+        result = await view(request, *args, **kwargs)
+        if isinstance(result, HttpResponse):
+            return result
+        return JsonResponse(result, encoder=DjangoJSONEncoder, safe=False)
+    return wrapper
@@ -5,4 +5,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gymcrm.settings')
 
 app = Celery('gymcrm')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Queue-wait / runtime / retry histograms (connects Celery signal hooks)
+import gymcrm.task_metrics  # noqa: E402,F401
+
+# Keeps database connections open across tasks (see CONN_MAX_AGE in settings)
+import gymcrm.task_connections  # noqa: E402,F401
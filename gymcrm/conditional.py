@@ -0,0 +1,80 @@
+"""
+Conditional GET for catalog and detail endpoints.
+
+Screens request the same plan catalog, member and subscription again on
+every change of view. ConditionalGetMixin answers with 304 Not Modified
+when the client's copy (If-None-Match, or If-Modified-Since) is still
+current, before anything is serialized. The validators come from cheap
+sources only, the row's updated_at or the plan catalog version
+(plans/catalog.py), and never from rendering and hashing the body.
+
+A viewset lists its conditional actions and implements get_validators():
+the versions the response depends on, as datetimes, or None when the
+object does not exist (the action then runs and returns its 404). The
+newest of them is the Last-Modified time. Representations that also depend
+on the date (ages, grace periods) set ``changes_daily``. The ETag is weak:
+equal tags mean equal content, not byte-identical output.
+"""
+import calendar
+import hashlib
+from datetime import datetime, time
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    conditional_actions = ('retrieve',)
+    changes_daily = False
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def get_object_versions(self, *fields):
+        """values_list(*fields) of the requested object, or None if there is no such object."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        try:
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}) \
+                .values_list(*fields).first()
+        except (ValueError, ValidationError):
+            return None
+
+    def _etag_and_last_modified(self, request):
+        versions = self.get_validators()
+        if versions is None:
+            return None, None
+        versions = list(versions)
+        if self.changes_daily:
+            versions.append(timezone.make_aware(datetime.combine(timezone.localdate(), time.min)))
+        last_modified = calendar.timegm(max(versions).utctimetuple())
+        key = repr((
+            [version.isoformat() for version in versions],
+            request.get_host(), request.get_full_path(), request.accepted_renderer.format,
+        ))
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"', last_modified
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        if self.action not in self.conditional_actions:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self._etag_and_last_modified(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(last_modified)
+            # Cached copies must be revalidated, which is what makes this cheap
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,156 @@
+"""
+Read-replica routing.
+
+When DATABASE_REPLICA names a database alias (settings.py sets it when
+POSTGRES_REPLICA_HOST is set), reads that can tolerate a little replication
+lag go to it, so list and report endpoints do not compete with enrollments
+on the primary. Everything else stays on the primary:
+
+* Reads go to the replica only in GET/HEAD/OPTIONS requests
+  (ReplicaRoutingMiddleware) and inside read_from_replica(), which report
+  tasks enter around their queries. Elsewhere (other requests, the shell,
+  other tasks) the router leaves every query on the primary.
+* Read your writes: once a request or block writes anything, its later
+  reads go to the primary, and the middleware pins the client (its
+  Authorization header or session cookie) to the primary for
+  REPLICA_PIN_SECONDS, so the page it loads next shows the change.
+* Reads inside a transaction.atomic() on the primary stay on the primary.
+* Views opt out with @primary_db (on a function view, a view class or a
+  viewset action); code paths opt out with read_from_primary(). Data that
+  is cached and invalidated on write (member cards, the membership
+  summary, feature allowances) is always built from the primary, or a
+  lagging replica could put the old values back right after an
+  invalidation.
+
+With DATABASE_REPLICA unset the router and the middleware do nothing.
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY_PREFIX = 'db:pinned'
+
+
+class _Routing:
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+_primary_only = ContextVar('db_primary_only', default=False)
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+@contextmanager
+def read_from_replica():
+    """Send the reads of the block to the replica, until the block writes."""
+    token = _routing.set(_Routing(replica=replica_alias() is not None))
+    try:
+        yield _routing.get()
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Keep the reads of the block on the primary; also usable as a decorator."""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def primary_db(view):
+    """Keep a view (function, class or viewset action) off the replica."""
+    view.use_primary_db = True
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.replica or routing.wrote or _primary_only.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        # Not None: Django would then write an instance back to the database
+        # it was read from, which may be the replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica follows the primary's schema through replication
+        if db == replica_alias():
+            return False
+        return None
+
+
+def _pin_key(request):
+    credential = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return f'{PIN_KEY_PREFIX}:{hashlib.sha1(credential.encode()).hexdigest()}'
+
+
+def _uses_primary(request, view_func):
+    if getattr(view_func, 'use_primary_db', False):
+        return True
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        return False
+    if getattr(view_class, 'use_primary_db', False):
+        return True
+    # Viewset action or APIView/@api_view handler
+    actions = getattr(view_func, 'actions', None)
+    handler_name = actions.get(request.method.lower()) if actions else request.method.lower()
+    return getattr(getattr(view_class, handler_name or '', None), 'use_primary_db', False)
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of safe, non-pinned requests to the replica."""
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = _Routing(replica=False)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            key = _pin_key(request)
+            if key:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        if routing is None or request.method not in SAFE_METHODS or _uses_primary(request, view_func):
+            return None
+        key = _pin_key(request)
+        routing.replica = not (key and cache.get(key))
+        return None
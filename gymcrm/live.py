@@ -0,0 +1,134 @@
+"""
+Live dashboard updates over server-sent events.
+
+Front-desk screens open one stream (/api/live/dashboard/, served through
+gymcrm/asgi.py) instead of polling membership_summary, all_members and
+expiring_members. The stream sends:
+
+* ``summary``: the membership summary counters. The first event carries
+  all of them; later events carry only ``delta``, the change of each
+  counter that moved, plus the new values.
+* ``member``: the member card (members/cards.py) of a member whose row or
+  subscriptions changed.
+* ``member_deleted``: ``{"id": ...}`` of a deleted member.
+* ``reload``: too many members changed at once (a bulk update); reload
+  the lists.
+
+Writers only publish the ids of the members that changed, on commit, to a
+Redis pub/sub channel (publish_member_changes). Every stream is subscribed
+to it, collects the ids arriving within COALESCE_SECONDS and then reads the
+summary and the cards through their caches. However many screens are open,
+a burst of writes costs one summary computation and one card build per
+member.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'live:dashboard'
+KEEPALIVE_SECONDS = 15
+COALESCE_SECONDS = 0.5
+MAX_MEMBER_EVENTS = 50
+
+
+def publish_member_changes(changed=(), deleted=()):
+    """Tell every open stream that these members changed or were deleted."""
+    from gymcrm.redis_client import get_redis
+
+    message = {'changed': sorted(set(changed)), 'deleted': sorted(set(deleted))}
+    if not message['changed'] and not message['deleted']:
+        return
+    try:
+        get_redis().publish(CHANNEL, json.dumps(message))
+    except Exception as e:
+        # A missed update must never fail the write; screens resync on reconnect
+        logger.debug("Could not publish dashboard update: %s", e)
+
+
+def publish_on_commit(changed=(), deleted=()):
+    changed, deleted = list(changed), list(deleted)
+    transaction.on_commit(lambda: publish_member_changes(changed, deleted))
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+def _summary_delta(old, new):
+    return {
+        key: new[key] - old[key]
+        for key, value in new.items() if isinstance(value, int) and value != old.get(key)
+    }
+
+
+def _cards(member_ids, absolute_uri):
+    from members.cards import get_member_card
+
+    cards = []
+    for member_id in sorted(member_ids):
+        card = get_member_card(member_id)
+        if card is None:
+            continue
+        for photo in ('profile_photo', 'photo_thumbnail'):
+            if card[photo]:
+                card[photo] = absolute_uri(card[photo])
+        cards.append(card)
+    return cards
+
+
+async def dashboard_events(absolute_uri):
+    """The event stream of one screen, as SSE-formatted strings."""
+    from gymcrm.redis_client import get_async_redis
+    from members.summary import get_membership_summary
+
+    client = get_async_redis()
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(CHANNEL)
+        summary = await sync_to_async(get_membership_summary)()
+        yield _event('summary', {'summary': summary, 'delta': {}})
+
+        loop = asyncio.get_running_loop()
+        idle_since = loop.time()
+        while True:
+            # None also when the message read was a (skipped) subscribe confirmation
+            message = await pubsub.get_message(timeout=KEEPALIVE_SECONDS)
+            if message is None:
+                if loop.time() - idle_since >= KEEPALIVE_SECONDS:
+                    yield ': keepalive\n\n'
+                    idle_since = loop.time()
+                continue
+
+            changed, deleted = set(), set()
+            deadline = loop.time() + COALESCE_SECONDS
+            while message is not None:
+                data = json.loads(message['data'])
+                changed.update(data['changed'])
+                deleted.update(data['deleted'])
+                remaining = deadline - loop.time()
+                message = await pubsub.get_message(timeout=remaining) if remaining > 0 else None
+            changed -= deleted
+            idle_since = loop.time()
+
+            new_summary = await sync_to_async(get_membership_summary)()
+            delta = _summary_delta(summary, new_summary)
+            if delta:
+                summary = new_summary
+                yield _event('summary', {'summary': summary, 'delta': delta})
+
+            if len(changed) + len(deleted) > MAX_MEMBER_EVENTS:
+                yield _event('reload', {})
+                continue
+            for card in await sync_to_async(_cards)(changed, absolute_uri):
+                yield _event('member', card)
+            for member_id in sorted(deleted):
+                yield _event('member_deleted', {'id': member_id})
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
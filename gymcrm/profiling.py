@@ -0,0 +1,128 @@
+"""
+Per-endpoint query count / latency profiling.
+
+Enable with REQUEST_PROFILING_ENABLED=true. When disabled the middleware
+raises MiddlewareNotUsed, so Django drops it from the chain entirely and
+requests pay nothing. Stats are aggregated in process memory and exposed to
+admins at /api/admin/profiling/.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+TOP_DUPLICATES = 5
+# Bound memory use of the per-endpoint duplicate counters
+MAX_TRACKED_STATEMENTS = 200
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every statement of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.sql_count = 0
+        self.max_sql_count = 0
+        self.sql_time = 0.0
+        self.duplicates = Counter()
+
+    def add(self, elapsed, recorder):
+        self.requests += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.sql_count += recorder.count
+        self.max_sql_count = max(self.max_sql_count, recorder.count)
+        self.sql_time += recorder.time
+        for sql, executions in recorder.statements.items():
+            if executions > 1:
+                self.duplicates[sql] += executions
+        if len(self.duplicates) > MAX_TRACKED_STATEMENTS:
+            self.duplicates = Counter(dict(self.duplicates.most_common(MAX_TRACKED_STATEMENTS // 2)))
+
+    def as_dict(self, endpoint):
+        return {
+            'endpoint': endpoint,
+            'requests': self.requests,
+            'avg_ms': round(self.total_time / self.requests * 1000, 2),
+            'max_ms': round(self.max_time * 1000, 2),
+            'avg_queries': round(self.sql_count / self.requests, 2),
+            'max_queries': self.max_sql_count,
+            'avg_sql_ms': round(self.sql_time / self.requests * 1000, 2),
+            'top_duplicate_queries': [
+                {'sql': sql, 'executions': executions}
+                for sql, executions in self.duplicates.most_common(TOP_DUPLICATES)
+            ],
+        }
+
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def record(endpoint, elapsed, recorder):
+    with _lock:
+        _stats.setdefault(endpoint, EndpointStats()).add(elapsed, recorder)
+
+
+def snapshot():
+    """Current stats, slowest endpoints first."""
+    with _lock:
+        rows = [stats.as_dict(endpoint) for endpoint, stats in _stats.items()]
+    return sorted(rows, key=lambda row: row['avg_ms'], reverse=True)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def is_enabled():
+    return getattr(settings, 'REQUEST_PROFILING_ENABLED', False)
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        if match:
+            # DRF router patterns are regexes; drop the anchors for readability
+            endpoint = '/' + re.sub(r'(?<!\[)\^|\$', '', match.route)
+        else:
+            endpoint = request.path
+        record(f"{request.method} {endpoint}", elapsed, recorder)
+        return response
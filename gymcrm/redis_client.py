@@ -0,0 +1,31 @@
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared Redis client for counters and pub/sub that the Django cache API
+    cannot express (hashes, atomic increments, channels).
+    The connection pool is created lazily so importing this module is free.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+            health_check_interval=30,
+        )
+    return _client
+
+
+def get_async_redis():
+    """
+    A new asyncio Redis client for one long-lived consumer (a pub/sub
+    subscription). Each event loop needs its own connections, so this is not
+    shared; the caller closes it with ``await client.aclose()``.
+    """
+    return redis.asyncio.Redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, health_check_interval=30)
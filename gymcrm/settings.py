@@ -14,6 +14,8 @@ import os
 from twilio.rest import Client
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,16 +50,21 @@ INSTALLED_APPS = [
     'django_extensions',
     'subscriptions',
     'management',
+    'analytics',
+    'attendance',
+    'sync',
 ]
 
 MIDDLEWARE = [
 
+    'gymcrm.profiling.QueryProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'gymcrm.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
    
@@ -65,6 +72,9 @@ MIDDLEWARE = [
 
 
 
+# Per-endpoint SQL count/latency profiling; the middleware removes itself when off
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "false").lower() == "true"
+
 ROOT_URLCONF = 'gymcrm.urls'
 
 TEMPLATES = [
@@ -88,6 +98,19 @@ WSGI_APPLICATION = 'gymcrm.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connections are kept open between requests and tasks instead of paying for
+# a new Postgres connection and authentication each time. How long depends on
+# the process (PROCESS_TYPE is set per service in docker-compose.yml):
+#   web     WSGI: each server thread keeps its connection across requests.
+#   worker  Celery: kept across tasks (gymcrm/task_connections.py).
+#   asgi    0: requests may run on ever-new threads, each of which would
+#           hold on to its own connection.
+#   beat    0: it hardly queries.
+# A reused connection is health-checked before its first query of a request
+# or task, so one dropped by Postgres is replaced instead of failing.
+PROCESS_TYPE = os.getenv("PROCESS_TYPE", "web")
+DEFAULT_CONN_MAX_AGE = {'web': 60, 'worker': 600, 'asgi': 0, 'beat': 0}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -96,9 +119,27 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'club7Secure123'),
         'HOST': os.environ.get('POSTGRES_HOST', 'club7gymcrm_db'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", DEFAULT_CONN_MAX_AGE.get(PROCESS_TYPE, 0))),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Optional streaming replica for list and report reads (gymcrm/db_router.py).
+# To try it locally, point POSTGRES_REPLICA_HOST at the primary: two aliases,
+# one database. Without POSTGRES_REPLICA_HOST the alias still exists, pointing
+# at the primary, but nothing is routed to it (DATABASE_REPLICA is None)
+# except by the routing tests. In tests it mirrors the primary's test database.
+DATABASE_REPLICA = 'replica' if os.getenv("POSTGRES_REPLICA_HOST") else None
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'HOST': os.getenv("POSTGRES_REPLICA_HOST", DATABASES['default']['HOST']),
+    'PORT': os.getenv("POSTGRES_REPLICA_PORT", DATABASES['default']['PORT']),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['gymcrm.db_router.ReplicaRouter']
+# How long a client that wrote reads from the primary; cover the replication lag
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,13 +201,134 @@ TWILIO_WHATSAPP_NUMBER = 'whatsapp:+14155238886'
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://club7gymcrm_redis:6379/0")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://club7gymcrm_redis:6379/0")
 
+# Redis database for application counters (task metrics etc.), kept apart
+# from the broker so a FLUSHDB on one never wipes the other.
+REDIS_URL = os.getenv("REDIS_URL", "redis://club7gymcrm_redis:6379/1")
+
+# Task latency metrics (see gymcrm/task_metrics.py), scraped from /metrics/tasks/
+# with METRICS_TOKEN as a bearer token. The scrape is refused while it is unset.
+TASK_METRICS_ENABLED = os.getenv("TASK_METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Shared cache for dashboard aggregates. Redis rather than the per-process
+# default so every web worker sees the same entries and the same locks. It
+# is switched on by CACHE_URL (set in docker-compose.yml); without it, as in
+# a dev checkout or the test environment, Django's per-process LocMem cache
+# is used and no Redis server is needed. Tests call cache.clear(), so never
+# run them with CACHE_URL pointing at a shared Redis.
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'club7',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds the membership summary may be served from cache (see members/summary.py)
+MEMBERSHIP_SUMMARY_CACHE_SECONDS = int(os.getenv("MEMBERSHIP_SUMMARY_CACHE_SECONDS", "30"))
+
+# Seconds a member card and its phone/email/biometric ID lookups stay cached
+# (see members/cards.py); writes invalidate them earlier
+MEMBER_CARD_CACHE_SECONDS = int(os.getenv("MEMBER_CARD_CACHE_SECONDS", "300"))
+
+# How often each process checks whether its in-memory set of biometric IDs
+# allowed through the door is stale (see attendance/access.py)
+ACCESS_CHECK_SECONDS = float(os.getenv("ACCESS_CHECK_SECONDS", "1"))
+
+# Seconds a subscription's feature allowances stay cached for door checks
+# (see subscriptions/usage.py); subscription writes invalidate them earlier
+FEATURE_ALLOWANCE_CACHE_SECONDS = int(os.getenv("FEATURE_ALLOWANCE_CACHE_SECONDS", "300"))
+
+# Days deletions are remembered for syncing clients; an older sync cursor
+# must start over (see sync/changes.py)
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+
+# Subscription history older than this many months is moved to compressed
+# files under HISTORY_ARCHIVE_ROOT by `manage.py archive_subscription_history`
+HISTORY_ARCHIVE_ROOT = os.getenv("HISTORY_ARCHIVE_ROOT", os.path.join(BASE_DIR, 'archive', 'subscription_history'))
+HISTORY_ARCHIVE_AFTER_MONTHS = int(os.getenv("HISTORY_ARCHIVE_AFTER_MONTHS", "12"))
+
 
 # Task routing
+# Each workload class gets its own queue (and its own worker pool in
+# docker-compose.yml) so a burst of bulk messages can never sit in front of
+# an enrollment receipt. Lower priority numbers are served first on Redis.
+CELERY_TASK_QUEUES = (
+    Queue('transactional', routing_key='transactional'),
+    Queue('pdf', routing_key='pdf'),
+    Queue('bulk', routing_key='bulk'),
+    Queue('maintenance', routing_key='maintenance'),
+)
+CELERY_TASK_DEFAULT_QUEUE = 'maintenance'
+CELERY_TASK_DEFAULT_PRIORITY = 5
+
+CELERY_TASK_ROUTES = {
+    # Messages a member is waiting for at the counter
+    'members.tasks.send_member_welcome_whatsapp': {'queue': 'transactional', 'priority': 0},
+    'subscriptions.tasks.send_membership_expiry_reminder': {'queue': 'transactional', 'priority': 2},
+
+    # Messages that render a PDF receipt before sending
+    'subscriptions.tasks.send_membership_enrolled_message': {'queue': 'pdf', 'priority': 0},
+    'subscriptions.tasks.send_plan_change_notification': {'queue': 'pdf', 'priority': 1},
+
+    # Fan-out messaging
+    'members.tasks.generate_birthday_wishes': {'queue': 'bulk', 'priority': 6},
+
+    # Scheduled sweeps
+    'members.tasks.daily_birthday_wishes': {'queue': 'maintenance', 'priority': 9},
+    'subscriptions.tasks.expire_lapsed_subscriptions': {'queue': 'maintenance', 'priority': 9},
+    'subscriptions.tasks.flush_feature_usage': {'queue': 'maintenance', 'priority': 8},
+    'analytics.tasks.snapshot_daily_metrics': {'queue': 'maintenance', 'priority': 9},
+    'sync.tasks.prune_tombstones': {'queue': 'maintenance', 'priority': 9},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    # Close out subscriptions that ended yesterday, before the metrics run
+    'expire-lapsed-subscriptions': {
+        'task': 'subscriptions.tasks.expire_lapsed_subscriptions',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    # Feature usage is counted in Redis; persist the counts every minute
+    'flush-feature-usage': {
+        'task': 'subscriptions.tasks.flush_feature_usage',
+        'schedule': crontab(),
+    },
+    # Yesterday's DailyMetrics row, once the day is closed
+    'snapshot-daily-metrics': {
+        'task': 'analytics.tasks.snapshot_daily_metrics',
+        'schedule': crontab(hour=0, minute=15),
+    },
+    'prune-tombstones': {
+        'task': 'sync.tasks.prune_tombstones',
+        'schedule': crontab(hour=0, minute=30),
+    },
+}
+
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+
+# Results are only kept for tasks that explicitly need them; messaging tasks
+# set ignore_result=True. Anything that is stored expires after a day.
+CELERY_RESULT_EXPIRES = timedelta(days=1)
 
 # Worker configuration
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ACKS_LATE = True
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+# Celery closes every database connection around each task unless this is
+# set; at the child's task limit, CONN_MAX_AGE alone decides when to reconnect
+CELERY_DB_REUSE_MAX = CELERY_WORKER_MAX_TASKS_PER_CHILD
 
 # Task time limits
 CELERY_TASK_SOFT_TIME_LIMIT = 60  # 1 minute
@@ -0,0 +1,191 @@
+"""
+Sparse fieldsets and expandable relations.
+
+Screens use a handful of the ~30 member fields, and a subscription nests a
+full member and a full plan with its features. List, detail and sync
+endpoints of viewsets with SparseFieldsMixin accept
+
+    ?fields=id,full_name,phone_number    only these fields
+    ?expand=member,plan                  nest these relations
+    ?fields=id,status,member.full_name   narrow an expanded relation too
+                                         (a dotted name expands it)
+
+With either parameter, relations are nested only when expanded and are
+otherwise rendered as their primary key. Without both, responses are
+unchanged. The selection is applied twice: the serializer drops the other
+fields, and the queryset loads only the columns those fields read (only(),
+plus select_related/prefetch_related for what is expanded), so both the
+SQL and the JSON shrink. Unknown names are a 400.
+
+Serializers opt in with SparseFieldsSerializerMixin and describe themselves
+in Meta:
+
+* ``expandable_fields``: {name: serializer class} of nested relations.
+* ``field_sources``: {name: [model field paths]} for fields that are not a
+  model field of the same name (properties, method fields). A selected
+  field that is neither leaves the queryset unrestricted.
+* ``field_prefetch``: {name: [prefetch lookups]} a field needs to render
+  without a query per row.
+
+The restriction is applied in filter_queryset(), so it reaches list and
+detail whatever get_queryset() a viewset has; actions that build their own
+queryset (sync) pass it through restrict_queryset().
+"""
+from rest_framework import serializers
+
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsSerializerMixin:
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        selected, nested = self.split_fields(fields)
+        expand = set(expand or ()) | set(nested)
+
+        if selected is not None:
+            for name in set(self.fields) - selected - expand:
+                self.fields.pop(name)
+        for name, serializer_class in expandable.items():
+            if name not in self.fields:
+                continue
+            if name in expand:
+                sparse = issubclass(serializer_class, SparseFieldsSerializerMixin)
+                self.fields[name] = serializer_class(
+                    read_only=True, **({'fields': nested.get(name)} if sparse else {}),
+                )
+            else:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    @classmethod
+    def readable_fields(cls):
+        """Names a response can contain: write-only fields are not selectable."""
+        return {name for name, field in cls().fields.items() if not field.write_only}
+
+    @staticmethod
+    def split_fields(fields):
+        """(top-level names or None for all, {relation: names of its fields})"""
+        if fields is None:
+            return None, {}
+        selected, nested = set(), {}
+        for name in fields:
+            relation, _, field = name.partition('.')
+            if field:
+                nested.setdefault(relation, set()).add(field)
+            else:
+                selected.add(relation)
+        return selected, nested
+
+    @classmethod
+    def validate_selection(cls, fields, expand):
+        """Raise a 400 ValidationError for names the serializer does not have."""
+        available = cls.readable_fields()
+        expandable = getattr(cls.Meta, 'expandable_fields', {})
+        selected, nested = cls.split_fields(fields)
+        errors = {}
+        unknown = (selected or set()) - available
+        for relation, names in nested.items():
+            serializer_class = expandable.get(relation)
+            if serializer_class is None:
+                unknown.add(relation)
+            else:
+                readable = (serializer_class.readable_fields()
+                            if issubclass(serializer_class, SparseFieldsSerializerMixin)
+                            else set(serializer_class().fields))
+                unknown |= {f'{relation}.{name}' for name in names - readable}
+        if unknown:
+            errors['fields'] = f"Unknown fields: {', '.join(sorted(unknown))}"
+        if set(expand or ()) - set(expandable):
+            errors['expand'] = f"Cannot expand: {', '.join(sorted(set(expand) - set(expandable)))}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    @classmethod
+    def queryset_plan(cls, model, fields, expand, prefix=''):
+        """
+        (only() paths or None for every column, select_related, prefetch_related)
+        needed to render the selection.
+        """
+        meta = cls.Meta
+        expandable = getattr(meta, 'expandable_fields', {})
+        sources = getattr(meta, 'field_sources', {})
+        selected, nested = cls.split_fields(fields)
+        expand = set(expand or ()) | set(nested)
+        if selected is None:
+            selected = cls.readable_fields()
+        selected |= expand & set(expandable)
+        concrete = {field.name: field for field in model._meta.concrete_fields}
+
+        only, select, prefetch = {prefix + model._meta.pk.name}, set(), set()
+        for name in selected:
+            prefetch.update(prefix + lookup for lookup in getattr(meta, 'field_prefetch', {}).get(name, ()))
+            if name in expandable:
+                if name not in expand:
+                    only.add(prefix + name)
+                    continue
+                related = concrete[name].related_model
+                select.add(prefix + name)
+                serializer_class = expandable[name]
+                if issubclass(serializer_class, SparseFieldsSerializerMixin):
+                    columns, nested_select, nested_prefetch = serializer_class.queryset_plan(
+                        related, nested.get(name), (), prefix=f'{prefix}{name}__')
+                    select |= nested_select
+                    prefetch |= nested_prefetch
+                else:
+                    columns = {f'{prefix}{name}__{field.name}' for field in related._meta.concrete_fields}
+                if columns is None:
+                    return None, set(), set()
+                only |= columns
+            elif name in sources:
+                for path in sources[name]:
+                    only.add(prefix + path)
+                    if '__' in path:
+                        select.add(prefix + path.rsplit('__', 1)[0])
+            elif name in concrete:
+                only.add(prefix + name)
+            else:
+                return None, set(), set()
+        return only, select, prefetch
+
+
+class SparseFieldsMixin:
+    """Viewset side: read ?fields= and ?expand=, and narrow the queryset and the serializer."""
+    sparse_actions = ('list', 'retrieve', 'sync')
+
+    def get_sparse_selection(self):
+        """(fields, expand) of the request, or None when it asks for the full representation."""
+        if not hasattr(self, '_sparse_selection'):
+            params = self.request.query_params
+            selection = None
+            if self.action in self.sparse_actions and ('fields' in params or 'expand' in params):
+                fields = sorted(_names(params['fields'])) if 'fields' in params else None
+                expand = sorted(_names(params.get('expand')))
+                self.get_serializer_class().validate_selection(fields, expand)
+                selection = fields, expand
+            self._sparse_selection = selection
+        return self._sparse_selection
+
+    def restrict_queryset(self, queryset, always=()):
+        """``queryset`` loading only what the requested fields need (plus ``always``)."""
+        selection = self.get_sparse_selection()
+        if selection is None:
+            return queryset
+        only, select, prefetch = self.get_serializer_class().queryset_plan(queryset.model, *selection)
+        if only is None:
+            return queryset
+        return (queryset.select_related(None).prefetch_related(None)
+                .select_related(*select).prefetch_related(*prefetch).only(*only, *always))
+
+    def filter_queryset(self, queryset):
+        return self.restrict_queryset(super().filter_queryset(queryset))
+
+    def get_serializer(self, *args, **kwargs):
+        selection = self.get_sparse_selection()
+        if selection is not None:
+            kwargs.setdefault('fields', selection[0])
+            kwargs.setdefault('expand', selection[1])
+        return super().get_serializer(*args, **kwargs)
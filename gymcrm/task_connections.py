@@ -0,0 +1,29 @@
+"""
+Database connection reuse in Celery workers.
+
+Django keeps a connection open for CONN_MAX_AGE seconds (set per process
+type in settings.py) but only checks its age and health around HTTP
+requests. These hooks do the same around tasks: before and after each task,
+close_old_connections() drops the connection if it is past CONN_MAX_AGE,
+errored, or left outside autocommit, and otherwise keeps it for the next
+task. With CONN_HEALTH_CHECKS a reused connection is pinged before its
+first query, so one dropped by Postgres is replaced instead of failing the
+task.
+
+Celery's own Django fixup closes every connection around each task unless
+CELERY_DB_REUSE_MAX is set; settings.py sets it to the child's task limit,
+which leaves recycling to CONN_MAX_AGE. The fixup still drops the
+connections a pool child inherits from the parent at fork (without closing
+the socket the parent is using), so each child opens its own.
+"""
+from celery.signals import task_postrun, task_prerun
+from django.db import close_old_connections
+
+
+@task_prerun.connect
+@task_postrun.connect
+def close_stale_connections(sender=None, **kwargs):
+    # Eager tasks run inside the caller's request or transaction
+    if sender is not None and getattr(sender.request, 'is_eager', False):
+        return
+    close_old_connections()
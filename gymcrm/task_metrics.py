@@ -0,0 +1,196 @@
+"""
+Celery task latency metrics.
+
+Signal hooks record, per task name, how long a message waited in Redis before
+a worker picked it up, how long the task ran, and how often it retried or
+failed. Timings of slow external calls (Twilio, PDF rendering) are recorded
+with ``timed()``. Everything is aggregated in Redis so every worker process
+contributes to the same histograms, and ``render_prometheus()`` turns it into
+the Prometheus text format served at ``/metrics/tasks/``.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+)
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds. Queue waits of minutes are exactly what we want to
+# see, so the top buckets are wide.
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HISTOGRAMS = {
+    'celery_task_queue_wait_seconds': 'Time between publish (or ETA) and a worker starting the task.',
+    'celery_task_runtime_seconds': 'Wall time spent executing the task body.',
+    'external_call_seconds': 'Wall time of calls to external services.',
+}
+COUNTERS = {
+    'celery_task_runs_total': 'Finished task executions by state.',
+    'celery_task_retries_total': 'Task retries requested.',
+    'celery_task_failures_total': 'Tasks that raised an exception.',
+}
+
+KEY_PREFIX = 'metrics'
+INDEX_KEY = f'{KEY_PREFIX}:index'
+
+# task_id -> perf_counter() at task_prerun, per worker process
+_started = {}
+
+
+def _enabled():
+    return getattr(settings, 'TASK_METRICS_ENABLED', True)
+
+
+def _key(metric, label):
+    return f'{KEY_PREFIX}:{metric}:{label}'
+
+
+def observe(metric, label, seconds):
+    """Add one observation to a histogram."""
+    if not _enabled():
+        return
+    from gymcrm.redis_client import get_redis
+
+    bucket = next((str(b) for b in BUCKETS if seconds <= b), '+Inf')
+    key = _key(metric, label)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(key, bucket, 1)
+        pipe.hincrby(key, 'count', 1)
+        pipe.hincrbyfloat(key, 'sum', seconds)
+        pipe.sadd(INDEX_KEY, f'{metric}|{label}')
+        pipe.execute()
+    except Exception as e:
+        # Metrics must never break the task that is being measured
+        logger.debug("Could not record %s for %s: %s", metric, label, e)
+
+
+def increment(metric, label, amount=1):
+    """Increment a counter."""
+    if not _enabled():
+        return
+    from gymcrm.redis_client import get_redis
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(_key(metric, label), 'count', amount)
+        pipe.sadd(INDEX_KEY, f'{metric}|{label}')
+        pipe.execute()
+    except Exception as e:
+        logger.debug("Could not increment %s for %s: %s", metric, label, e)
+
+
+@contextmanager
+def timed(label, metric='external_call_seconds'):
+    """Time a block, e.g. ``with timed('twilio_send'): ...``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(metric, label, time.perf_counter() - start)
+
+
+# --- Celery signal hooks ---
+
+@before_task_publish.connect
+def stamp_publish_time(sender=None, headers=None, **kwargs):
+    # Custom headers end up on task.request in the worker
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(sender=None, task_id=None, task=None, **kwargs):
+    _started[task_id] = time.perf_counter()
+
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at is None:
+        return  # eager call or a message from an older publisher
+
+    ready_at = float(published_at)
+    eta = getattr(task.request, 'eta', None)
+    if eta:
+        try:
+            ready_at = max(ready_at, datetime.fromisoformat(str(eta)).timestamp())
+        except ValueError:
+            pass
+    observe('celery_task_queue_wait_seconds', task.name, max(time.time() - ready_at, 0.0))
+
+
+@task_postrun.connect
+def record_runtime(sender=None, task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        observe('celery_task_runtime_seconds', task.name, time.perf_counter() - started)
+    increment('celery_task_runs_total', f'{task.name}|{state or "UNKNOWN"}')
+
+
+@task_retry.connect
+def record_retry(sender=None, **kwargs):
+    increment('celery_task_retries_total', sender.name)
+
+
+@task_failure.connect
+def record_failure(sender=None, **kwargs):
+    increment('celery_task_failures_total', sender.name)
+
+
+# --- Exposition ---
+
+def _labels(metric, label):
+    if metric == 'celery_task_runs_total':
+        task, state = label.rsplit('|', 1)
+        return f'task="{task}",state="{state}"'
+    if metric == 'external_call_seconds':
+        return f'call="{label}"'
+    return f'task="{label}"'
+
+
+def render_prometheus():
+    """Render every recorded metric in the Prometheus text exposition format."""
+    from gymcrm.redis_client import get_redis
+
+    client = get_redis()
+    series = sorted(m.decode() for m in client.smembers(INDEX_KEY))
+    pipe = client.pipeline(transaction=False)
+    for entry in series:
+        pipe.hgetall(_key(*entry.split('|', 1)))
+    values = pipe.execute()
+
+    by_metric = {}
+    for entry, data in zip(series, values):
+        metric, label = entry.split('|', 1)
+        data = {k.decode(): v.decode() for k, v in data.items()}
+        by_metric.setdefault(metric, []).append((label, data))
+
+    lines = []
+    for metric, help_text in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for label, data in by_metric.get(metric, []):
+            labels = _labels(metric, label)
+            cumulative = 0
+            for bound in BUCKETS:
+                cumulative += int(data.get(str(bound), 0))
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += int(data.get('+Inf', 0))
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{metric}_sum{{{labels}}} {float(data.get("sum", 0))}')
+            lines.append(f'{metric}_count{{{labels}}} {int(data.get("count", 0))}')
+
+    for metric, help_text in COUNTERS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for label, data in by_metric.get(metric, []):
+            lines.append(f'{metric}{{{_labels(metric, label)}}} {int(data.get("count", 0))}')
+
+    return '\n'.join(lines) + '\n'
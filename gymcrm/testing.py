@@ -0,0 +1,121 @@
+"""
+Shared base for the per-app query-budget tests.
+
+Every endpoint is requested twice: once against a small seeded dataset and
+once after the dataset has grown (more members, subscriptions, history and
+plans). The second request must stay within the endpoint's query budget,
+issue exactly as many queries as the first (so N+1 patterns fail here
+instead of at the front desk) and answer within ``max_response_ms``.
+"""
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from celery.app.task import Task
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from management.models import User
+from members.models import Member
+from plans.models import Feature, MembershipPlan, PlanFeature
+from subscriptions import seeding
+from subscriptions.models import Subscription
+
+
+def add_edge_cases(tag):
+    """
+    Members in every dashboard bucket (expiring soon, overdue but still
+    active, expired, cancelled, pending, never subscribed, blocked), which
+    random seed data does not reliably produce.
+    """
+    today = date.today()
+    plan = MembershipPlan.objects.order_by('duration_days').first()
+    # (status, end date offset from today, member is_active)
+    cases = [
+        ('active', 3, True),
+        ('active', 40, True),
+        ('active', -2, True),
+        ('expired', -20, True),
+        ('cancelled', 10, True),
+        ('pending', 30, True),
+        (None, None, True),
+        ('active', 20, False),
+    ]
+    for i, (status, end_offset, is_active) in enumerate(cases):
+        member = Member.objects.create(
+            full_name=f'Edge {tag} {i}', phone_number=f'7{tag}{i:07d}', email=f'edge{tag}{i}@example.com',
+            gender='M', dob=date(1990, 1, 1), address_line_1='Main Road', city='Kalpetta',
+            district='Wayanad', state='Kerala', pin_code='673121', is_active=is_active,
+        )
+        if status:
+            end = today + timedelta(days=end_offset)
+            Subscription.objects.create(
+                member=member, plan=plan, status=status,
+                start_date=end - timedelta(days=plan.duration_days), end_date=end,
+            )
+
+
+class QueryBudgetTestCase(APITestCase):
+    initial_data = {'members': 8, 'subscriptions': 24, 'history': 48}
+    growth_data = {'members': 24, 'subscriptions': 72, 'history': 144}
+    max_response_ms = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='frontdesk', email='frontdesk@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(seed_value=1, **cls.initial_data)
+        add_edge_cases(1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        # Nothing in these tests should reach the broker
+        patcher = mock.patch.object(Task, 'apply_async')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def grow(self):
+        seeding.seed(seed_value=2, **self.growth_data)
+        add_edge_cases(2)
+        feature = Feature.objects.create(name='Budget Test Pool', feature_type='facility')
+        for i in range(3):
+            plan = MembershipPlan.objects.create(
+                name=f'Budget Test Plan {i}', plan_type='basic', duration_days=30 * (i + 1),
+                price=Decimal('1000.00') * (i + 1),
+            )
+            PlanFeature.objects.create(plan=plan, feature=feature, allowed_uses=4)
+        cache.clear()
+
+    def _measure(self, prepare):
+        request = prepare()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        return response, queries, elapsed_ms
+
+    def assertQueryBudget(self, budget, prepare, status_codes=(200,)):
+        """
+        ``prepare()`` does any lookups needed to build the request (outside the
+        measured window) and returns a zero-argument callable issuing it.
+        """
+        response, before, _ = self._measure(prepare)
+        self.assertIn(response.status_code, status_codes, getattr(response, 'data', response))
+
+        self.grow()
+        response, after, elapsed_ms = self._measure(prepare)
+        self.assertIn(response.status_code, status_codes, getattr(response, 'data', response))
+
+        sql = '\n'.join(q['sql'] for q in after.captured_queries)
+        self.assertLessEqual(len(after), budget, f"{len(after)} queries over a budget of {budget}:\n{sql}")
+        self.assertEqual(
+            len(after), len(before),
+            f"Query count grew with data size ({len(before)} -> {len(after)}):\n{sql}",
+        )
+        self.assertLess(elapsed_ms, self.max_response_ms)
+        return response
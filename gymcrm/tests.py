@@ -0,0 +1,427 @@
+import asyncio
+import json
+import time
+from unittest import mock
+
+import fakeredis
+from asgiref.sync import sync_to_async
+from celery.signals import task_failure, task_postrun, task_prerun, task_retry
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from gymcrm import live, profiling
+from gymcrm.db_router import ReplicaRoutingMiddleware, primary_db, read_from_primary, read_from_replica
+from gymcrm.profiling import QueryProfilingMiddleware
+from gymcrm.task_metrics import render_prometheus
+from gymcrm.testing import add_edge_cases
+from management.models import User
+from members.models import Member
+from members.summary import invalidate_membership_summary
+from subscriptions import seeding
+from subscriptions.models import Subscription
+
+
+class LiveDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='screen', email='screen@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=6, subscriptions=12, history=0, seed_value=44)
+        add_edge_cases(1)
+
+    def setUp(self):
+        cache.clear()
+        server = fakeredis.FakeServer()
+        self.enterContext(mock.patch('gymcrm.redis_client._client', fakeredis.FakeRedis(server=server)))
+        self.enterContext(mock.patch('gymcrm.redis_client.get_async_redis',
+                                     lambda: fakeredis.FakeAsyncRedis(server=server)))
+        self.enterContext(mock.patch.object(live, 'COALESCE_SECONDS', 0.05))
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def _next_event(self, stream):
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        name, data = chunk.decode().split('\n')[:2]
+        return name.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    async def test_stream_pushes_changes(self):
+        response = await self.async_client.get('/api/live/dashboard/', {'token': self.token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+
+        name, data = await self._next_event(stream)
+        self.assertEqual(name, 'summary')
+        blocked = data['summary']['blocked_members']
+
+        member = await Member.objects.filter(is_active=True).afirst()
+        member.is_active = False
+        await member.asave(update_fields=['is_active'])
+        await sync_to_async(invalidate_membership_summary)()
+        await sync_to_async(live.publish_member_changes)(changed=[member.id])
+
+        name, data = await self._next_event(stream)
+        self.assertEqual(name, 'summary')
+        self.assertEqual(data['delta']['blocked_members'], 1)
+        self.assertEqual(data['summary']['blocked_members'], blocked + 1)
+        name, data = await self._next_event(stream)
+        self.assertEqual((name, data['id'], data['is_active']), ('member', member.id, False))
+
+        await sync_to_async(live.publish_member_changes)(deleted=[member.id])
+        self.assertEqual(await self._next_event(stream), ('member_deleted', {'id': member.id}))
+        await stream.aclose()
+
+    async def test_stream_requires_token(self):
+        self.assertEqual((await self.async_client.get('/api/live/dashboard/')).status_code, 401)
+        response = await self.async_client.get('/api/live/dashboard/', {'token': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_writes_publish_on_commit(self):
+        subscription = Subscription.objects.select_related('member').order_by('created_at').first()
+        with mock.patch.object(live, 'publish_member_changes') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                subscription.status = 'cancelled'
+                subscription.save()
+            publish.assert_called_with([subscription.member_id], [])
+
+
+class AsyncEndpointTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='async', email='async@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=6, subscriptions=12, history=0, seed_value=45)
+        add_edge_cases(1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        self.auth = {'headers': {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}}
+
+    async def _get(self, path, params=None):
+        response = await self.async_client.get(path, params or {}, **self.auth)
+        return response.status_code, response.json()
+
+    async def test_same_data_as_sync_endpoints(self):
+        member = await Member.objects.filter(subscriptions__status='active').order_by('id').afirst()
+        pairs = [
+            ('/api/subscriptions/member_lookup/', '/api/async/members/lookup/', {'phone': member.phone_number}),
+            ('/api/members/membership-summary/', '/api/async/members/membership-summary/', {}),
+            ('/api/subscriptions/available_plans/', '/api/async/membership-plans/', {}),
+        ]
+        for sync_path, async_path, params in pairs:
+            with self.subTest(async_path):
+                response = await sync_to_async(self.client.get)(sync_path, params)
+                self.assertEqual(await self._get(async_path, params), (200, response.json()))
+
+        status, card = await self._get(f'/api/async/members/{member.id}/card/')
+        self.assertEqual((status, card['id']), (200, member.id))
+        self.assertEqual((await self._get('/api/async/members/999999/card/'))[0], 404)
+        self.assertEqual((await self._get('/api/async/members/lookup/'))[0], 400)
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get('/api/async/members/membership-summary/')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post('/api/async/members/membership-summary/', **self.auth)
+        self.assertEqual(response.status_code, 405)
+
+
+
+@override_settings(TASK_METRICS_ENABLED=False)
+class TaskConnectionTests(TestCase):
+    def _run_task_signals(self, task):
+        task_prerun.send(sender=task, task_id='t1', task=task, args=(), kwargs={})
+        task_postrun.send(sender=task, task_id='t1', task=task, args=(), kwargs={}, retval=None, state='SUCCESS')
+
+    @mock.patch('gymcrm.task_connections.close_old_connections')
+    def test_connections_are_checked_around_worker_tasks(self, close_old):
+        from subscriptions.tasks import flush_feature_usage
+
+        self._run_task_signals(flush_feature_usage)
+        self.assertEqual(close_old.call_count, 2)
+
+    @mock.patch('gymcrm.task_connections.close_old_connections')
+    def test_eager_tasks_leave_the_callers_connection_alone(self, close_old):
+        from subscriptions.tasks import flush_feature_usage
+
+        flush_feature_usage.push_request(is_eager=True)
+        try:
+            self._run_task_signals(flush_feature_usage)
+        finally:
+            flush_feature_usage.pop_request()
+        close_old.assert_not_called()
+
+
+@override_settings(REQUEST_PROFILING_ENABLED=True)
+class RequestProfilingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='profiler', email='profiler@club7.local', password='x', role='admin', is_staff=True,
+        )
+        cls.staff = User.objects.create_user(
+            username='frontdesk', email='frontdesk@club7.local', password='x', role='staff',
+        )
+        seeding.seed(members=3, subscriptions=3, history=0, seed_value=28)
+
+    def setUp(self):
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+
+    @override_settings(REQUEST_PROFILING_ENABLED=False)
+    def test_disabled_middleware_is_dropped(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryProfilingMiddleware(lambda request: HttpResponse())
+
+    def test_queries_are_aggregated_per_endpoint(self):
+        def view(request):
+            for _ in range(2):
+                list(Member.objects.filter(is_active=True))
+            Member.objects.count()
+            return HttpResponse()
+
+        middleware = QueryProfilingMiddleware(view)
+        for _ in range(2):
+            middleware(RequestFactory().get('/profiled/'))
+
+        [row] = profiling.snapshot()
+        self.assertEqual(row['endpoint'], 'GET /profiled/')
+        self.assertEqual(row['requests'], 2)
+        self.assertEqual(row['avg_queries'], 3)
+        self.assertEqual(row['max_queries'], 3)
+        [duplicate] = row['top_duplicate_queries']
+        self.assertIn('"members_member"', duplicate['sql'])
+        self.assertEqual(duplicate['executions'], 4)
+
+    def test_profiled_requests_are_reported_to_admins(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/members/').status_code, 200)
+        response = self.client.get('/api/admin/profiling/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['enabled'])
+        members = [row for row in response.data['endpoints'] if row['endpoint'] == 'GET /api/members/']
+        self.assertEqual(members[0]['requests'], 1)
+        self.assertGreaterEqual(members[0]['max_queries'], 1)
+
+        self.assertEqual(self.client.delete('/api/admin/profiling/').status_code, 204)
+        # Only the DELETE itself, recorded after the reset
+        self.assertEqual([row['endpoint'] for row in profiling.snapshot()], ['DELETE /api/admin/profiling/'])
+
+    def test_report_requires_an_admin(self):
+        self.assertEqual(self.client.get('/api/admin/profiling/').status_code, 401)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/admin/profiling/').status_code, 403)
+        self.client.get('/api/members/')
+        self.assertEqual(self.client.delete('/api/admin/profiling/').status_code, 403)
+        self.assertTrue(profiling.snapshot())
+
+
+class TaskMetricsTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch('gymcrm.redis_client._client', fakeredis.FakeRedis()))
+        # The connection hooks share these signals; they are tested above
+        self.enterContext(mock.patch('gymcrm.task_connections.close_old_connections'))
+
+    def test_signal_hooks_record_histograms_and_counters(self):
+        from subscriptions.tasks import flush_feature_usage as task
+
+        task.push_request(published_at=time.time() - 3)
+        try:
+            task_prerun.send(sender=task, task_id='t1', task=task, args=(), kwargs={})
+            task_postrun.send(sender=task, task_id='t1', task=task, args=(), kwargs={}, retval=None, state='SUCCESS')
+            task_retry.send(sender=task, request=task.request, reason='busy', einfo=None)
+            task_failure.send(sender=task, task_id='t1', exception=ValueError(), args=(), kwargs={}, einfo=None)
+        finally:
+            task.pop_request()
+
+        text = render_prometheus()
+        labels = f'task="{task.name}"'
+        # Waited about 3 s: in the 5 s bucket and every bucket above it
+        self.assertIn(f'celery_task_queue_wait_seconds_bucket{{{labels},le="2.5"}} 0', text)
+        self.assertIn(f'celery_task_queue_wait_seconds_bucket{{{labels},le="5"}} 1', text)
+        self.assertIn(f'celery_task_queue_wait_seconds_bucket{{{labels},le="+Inf"}} 1', text)
+        self.assertIn(f'celery_task_queue_wait_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'celery_task_runtime_seconds_bucket{{{labels},le="0.01"}} 1', text)
+        self.assertIn(f'celery_task_runtime_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'celery_task_runs_total{{{labels},state="SUCCESS"}} 1', text)
+        self.assertIn(f'celery_task_retries_total{{{labels}}} 1', text)
+        self.assertIn(f'celery_task_failures_total{{{labels}}} 1', text)
+
+    def test_messages_without_a_publish_time_have_no_queue_wait(self):
+        from subscriptions.tasks import flush_feature_usage as task
+
+        task_prerun.send(sender=task, task_id='t2', task=task, args=(), kwargs={})
+        task_postrun.send(sender=task, task_id='t2', task=task, args=(), kwargs={}, retval=None, state='FAILURE')
+        text = render_prometheus()
+        self.assertNotIn('celery_task_queue_wait_seconds_count', text)
+        self.assertIn(f'celery_task_runs_total{{task="{task.name}",state="FAILURE"}} 1', text)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_scrape_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get('/metrics/tasks/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/tasks/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics/tasks/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'# TYPE celery_task_runtime_seconds histogram', response.content)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_scrape_endpoint_is_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics/tasks/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_redis_outage_is_a_503(self):
+        with mock.patch('gymcrm.views.render_prometheus', side_effect=RedisConnectionError), \
+                self.assertLogs('gymcrm.views', 'ERROR'):
+            response = self.client.get('/metrics/tasks/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 503)
+
+
+@override_settings(DATABASE_REPLICA='replica', REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    # No database: the tests only look at which alias queries would use
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _request(self, view, method='get', token='abc', view_func=None):
+        """Run ``view`` through the middleware; returns the alias its reads used."""
+        used = []
+        def get_response(request):
+            middleware.process_view(request, view_func or view, (), {})
+            used.append(view(request))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(self.factory, method)('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        middleware(request)
+        return used[0]
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self._request(lambda request: Member.objects.all().db), 'replica')
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        self.assertEqual(self._request(lambda request: Member.objects.all().db, method='post'), 'default')
+
+    def test_reads_after_a_write_use_the_primary_and_pin_the_client(self):
+        def view(request):
+            router.db_for_write(Member)
+            return Member.objects.all().db
+
+        self.assertEqual(self._request(view), 'default')
+        read = lambda request: Member.objects.all().db
+        self.assertEqual(self._request(read), 'default')
+        self.assertEqual(self._request(read, token='other'), 'replica')
+
+    def test_views_can_opt_out(self):
+        self.assertEqual(self._request(primary_db(lambda request: Member.objects.all().db)), 'default')
+
+    def test_viewset_actions_can_opt_out(self):
+        from subscriptions.views import SubscriptionViewSet
+
+        read = lambda request: Member.objects.all().db
+        enrollment_data = SubscriptionViewSet.as_view({'get': 'enrollment_data'})
+        all_members = SubscriptionViewSet.as_view({'get': 'all_members'})
+        self.assertEqual(self._request(read, view_func=enrollment_data), 'default')
+        self.assertEqual(self._request(read, view_func=all_members), 'replica')
+
+    def test_sync_reads_from_the_primary(self):
+        from members.views import MemberViewSet
+        from subscriptions.views import SubscriptionViewSet
+
+        read = lambda request: Member.objects.all().db
+        for viewset in (MemberViewSet, SubscriptionViewSet):
+            self.assertEqual(self._request(read, view_func=viewset.as_view({'get': 'sync'})), 'default')
+
+    def test_read_from_primary_overrides_the_request(self):
+        @read_from_primary()
+        def build(request):
+            return Member.objects.all().db
+
+        self.assertEqual(self._request(build), 'default')
+
+    def test_report_blocks(self):
+        self.assertEqual(Member.objects.all().db, 'default')
+        with read_from_replica():
+            self.assertEqual(Member.objects.all().db, 'replica')
+            router.db_for_write(Member)
+            self.assertEqual(Member.objects.all().db, 'default')
+
+    def test_instances_read_from_the_replica_are_written_to_the_primary(self):
+        member = Member(full_name='Replica Read')
+        member._state.db = 'replica'
+        with read_from_replica():
+            self.assertEqual(router.db_for_write(Member, instance=member), 'default')
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_a_replica_everything_uses_the_primary(self):
+        with read_from_replica():
+            self.assertEqual(Member.objects.all().db, 'default')
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class ReplicaAliasTests(TransactionTestCase):
+    # The replica alias mirrors the primary's test database (settings.py)
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='replica@example.com', username='replica', password='x',
+                                         role='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def _queries(self, request):
+        """(response, SQL run on the primary, SQL run on the replica)"""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = request()
+        return response, [q['sql'] for q in primary.captured_queries], [q['sql'] for q in replica.captured_queries]
+
+    def test_list_reads_run_on_the_replica_alias(self):
+        response, primary, replica = self._queries(lambda: self.client.get('/api/members/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('"members_member"' in sql for sql in replica))
+        self.assertFalse(primary)
+
+    def test_writes_and_the_reads_after_them_run_on_the_primary(self):
+        response, primary, replica = self._queries(lambda: self.client.post('/api/members/', {
+            'full_name': 'Replica Write', 'phone_number': '9000000048', 'gender': 'M', 'dob': '1990-01-01',
+            'address_line_1': '1 Main Road', 'city': 'Kochi', 'district': 'Ernakulam', 'state': 'Kerala',
+            'pin_code': '682001',
+        }))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(any(sql.startswith('INSERT INTO "members_member"') for sql in primary))
+        self.assertFalse(replica)
+
+        # Pinned to the primary after the write
+        response, primary, replica = self._queries(lambda: self.client.get('/api/members/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('"members_member"' in sql for sql in primary))
+        self.assertFalse(replica)
+
+    def test_rows_read_from_the_replica_are_saved_on_the_primary(self):
+        member_id = Member.objects.create(
+            full_name='Replica Save', phone_number='9000000047', gender='M', dob='1990-01-01',
+            address_line_1='1 Main Road', city='Kochi', district='Ernakulam', state='Kerala', pin_code='682001',
+        ).pk
+        with read_from_replica():
+            member = Member.objects.get(pk=member_id)
+            self.assertEqual(member._state.db, settings.DATABASE_REPLICA)
+            with CaptureQueriesContext(connections['default']) as primary_queries, \
+                    CaptureQueriesContext(connections[settings.DATABASE_REPLICA]) as replica_queries:
+                member.city = 'Thrissur'
+                member.save()
+        self.assertTrue(any(query['sql'].startswith('UPDATE') for query in primary_queries.captured_queries))
+        self.assertFalse(replica_queries.captured_queries)
+        self.assertEqual(member._state.db, 'default')
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from management.views import LoginView, RegisterView, get_user_profile
+from gymcrm.views import live_dashboard, task_metrics, request_profiling
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -13,10 +14,15 @@ urlpatterns = [
     path('api/', include('members.urls')),
     path('api/', include('plans.urls')),
     path('api/', include('subscriptions.urls')),
+    path('api/', include('analytics.urls')),
+    path('api/', include('attendance.urls')),
     path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/register/', RegisterView.as_view(), name='register'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/profile/', get_user_profile, name='user_profile'),
+    path('metrics/tasks/', task_metrics, name='task_metrics'),
+    path('api/admin/profiling/', request_profiling, name='request_profiling'),
+    path('api/live/dashboard/', live_dashboard, name='live_dashboard'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,68 @@
+import hmac
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from redis.exceptions import RedisError
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from gymcrm import live, profiling
+from gymcrm.asyncapi import authenticate, unauthorized
+from gymcrm.task_metrics import render_prometheus
+
+logger = logging.getLogger(__name__)
+
+
+def task_metrics(request):
+    """
+    Prometheus scrape endpoint for Celery task metrics.
+    Not behind JWT so a scraper can read it; it sends METRICS_TOKEN as a
+    bearer token instead (``authorization`` in its scrape config). Without
+    a METRICS_TOKEN every scrape is refused.
+    """
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if not (settings.METRICS_TOKEN and scheme.lower() == 'bearer'
+            and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode())):
+        return HttpResponseForbidden()
+    try:
+        text = render_prometheus()
+    except RedisError:
+        logger.exception("Task metrics are unavailable")
+        return HttpResponse("Task metrics are unavailable\n", status=503, content_type='text/plain')
+    return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def request_profiling(request):
+    """
+    Per-endpoint wall time, SQL count/time and top duplicate queries collected
+    by QueryProfilingMiddleware in this process. DELETE resets the counters.
+    """
+    if request.method == 'DELETE':
+        profiling.reset()
+        return Response(status=204)
+    return Response({
+        'enabled': profiling.is_enabled(),
+        'endpoints': profiling.snapshot(),
+    })
+
+
+async def live_dashboard(request):
+    """
+    Server-sent events keeping a dashboard current (see gymcrm/live.py).
+    Needs an ASGI server: each open stream holds a connection, not a worker thread.
+    """
+    user = await sync_to_async(authenticate)(request, allow_query_token=True)
+    if user is None:
+        return unauthorized()
+
+    response = StreamingHttpResponse(live.dashboard_events(request.build_absolute_uri),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,50 @@
+"""
+Async variants of the hottest member read paths (see gymcrm/asyncapi.py).
+They return the same data as their DRF counterparts.
+"""
+from django.http import JsonResponse
+
+from gymcrm.asyncapi import async_api_view
+from members.cards import LOOKUP_FIELDS, aget_member_card, aresolve_member_id
+from members.summary import aget_membership_summary
+
+
+def _absolute_photos(request, card):
+    for photo in ('profile_photo', 'photo_thumbnail'):
+        if card[photo]:
+            card[photo] = request.build_absolute_uri(card[photo])
+    return card
+
+
+@async_api_view
+async def membership_summary(request):
+    return await aget_membership_summary()
+
+
+@async_api_view
+async def member_card(request, member_id):
+    card = await aget_member_card(member_id)
+    if card is None:
+        return JsonResponse({'error': 'Member not found'}, status=404)
+    return _absolute_photos(request, card)
+
+
+@async_api_view
+async def member_lookup(request):
+    """Same parameters and response as /api/subscriptions/member_lookup/"""
+    member_id = request.GET.get('member_id')
+    lookups = {field: request.GET.get(field) for field in LOOKUP_FIELDS if request.GET.get(field)}
+    if not member_id and not lookups:
+        return JsonResponse({'error': 'Please provide member_id, phone, email, or biometric_id'}, status=400)
+
+    if member_id:
+        if not member_id.isdigit():
+            return JsonResponse({'error': 'member_id must be a number'}, status=400)
+    else:
+        field, value = next(iter(lookups.items()))
+        member_id = await aresolve_member_id(field, value)
+
+    card = await aget_member_card(member_id) if member_id else None
+    if card is None:
+        return JsonResponse({'error': 'Member not found'}, status=404)
+    return _absolute_photos(request, card)
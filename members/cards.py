@@ -0,0 +1,185 @@
+"""
+Member cards for the lookup at the counter.
+
+A card is the compact view staff need when a member walks up: identity,
+photo and thumbnail, and the current subscription with its days remaining.
+Cards are cached by member id for MEMBER_CARD_CACHE_SECONDS and dropped
+whenever the member or one of their subscriptions is written (see the
+receivers in members/signals.py and subscriptions/signals.py, and
+subscriptions.bulk). Only days_remaining is computed per request, so a
+cached card never goes stale at midnight.
+
+Lookups by phone, email or biometric id go through a small cached map
+from lookup value to member id. A stale entry is harmless: the card it
+points to must carry the value that was looked up, otherwise the lookup
+falls back to the database.
+
+The thumbnail is generated with Pillow when the card is built. Its file
+name follows the photo, so replacing the photo produces a new thumbnail.
+"""
+import hashlib
+import io
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.timezone import now
+from PIL import Image, ImageOps
+
+from gymcrm.db_router import read_from_primary
+from members.models import Member
+
+THUMBNAIL_SIZE = (96, 96)
+THUMBNAIL_DIR = 'members/thumbnails'
+
+# lookup parameter -> (Member field, how to normalize the value)
+LOOKUP_FIELDS = {
+    'phone': ('phone_number', str.strip),
+    'email': ('email', lambda value: value.strip().lower()),
+    'biometric_id': ('biometric_id', str.strip),
+}
+
+
+def card_cache_key(member_id):
+    return f'members:card:{member_id}'
+
+
+def _lookup_cache_key(field, value):
+    digest = hashlib.sha1(value.encode()).hexdigest()
+    return f'members:lookup:{field}:{digest}'
+
+
+def photo_thumbnail(member):
+    """Storage name of the member's photo thumbnail, created if missing; None without a usable photo."""
+    if not member.profile_photo:
+        return None
+    photo_hash = hashlib.sha1(member.profile_photo.name.encode()).hexdigest()[:12]
+    name = f'{THUMBNAIL_DIR}/{member.pk}-{photo_hash}.jpg'
+    if default_storage.exists(name):
+        return name
+    try:
+        with member.profile_photo.open('rb') as f, Image.open(f) as image:
+            thumbnail = ImageOps.exif_transpose(image).convert('RGB')
+            thumbnail.thumbnail(THUMBNAIL_SIZE)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, 'JPEG', quality=85)
+    except (OSError, ValueError):
+        # Missing or unreadable photo file
+        return None
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+@read_from_primary()
+def build_member_card(member_id):
+    """The cacheable part of a member's card, or None if there is no such member."""
+    from subscriptions.models import Subscription
+
+    member = Member.objects.filter(id=member_id).first()
+    if member is None:
+        return None
+
+    # The active subscription if there is one, otherwise the most recent
+    current = (Subscription.objects.filter(member_id=member_id)
+               .select_related('plan')
+               .order_by('-start_date', '-created_at'))
+    subscription = current.filter(status='active').first() or current.first()
+
+    thumbnail = photo_thumbnail(member)
+    return {
+        'id': member.id,
+        'full_name': member.full_name,
+        'phone_number': member.phone_number,
+        'email': member.email,
+        'biometric_id': member.biometric_id,
+        'is_active': member.is_active,
+        'join_date': member.join_date,
+        'profile_photo': member.profile_photo.url if thumbnail else None,
+        'photo_thumbnail': default_storage.url(thumbnail) if thumbnail else None,
+        'has_active_subscription': bool(subscription and subscription.status == 'active'),
+        'current_subscription': {
+            'id': subscription.id,
+            'plan_id': subscription.plan_id,
+            'plan_name': subscription.plan.name,
+            'plan_type': subscription.plan.plan_type,
+            'status': subscription.status,
+            'start_date': subscription.start_date,
+            'end_date': subscription.end_date,
+        } if subscription else None,
+    }
+
+
+def _with_days_remaining(card):
+    subscription = card['current_subscription']
+    if subscription is None:
+        return card
+    end_date = subscription['end_date']
+    return dict(card, current_subscription=dict(
+        subscription, days_remaining=(end_date - now().date()).days if end_date else None,
+    ))
+
+
+def get_member_card(member_id):
+    card = cache.get(card_cache_key(member_id))
+    if card is None:
+        card = build_member_card(member_id)
+        if card is None:
+            return None
+        cache.set(card_cache_key(member_id), card, settings.MEMBER_CARD_CACHE_SECONDS)
+    return _with_days_remaining(card)
+
+
+async def aget_member_card(member_id):
+    """get_member_card() for async views."""
+    card = await cache.aget(card_cache_key(member_id))
+    if card is None:
+        # Building may write a thumbnail file, so it runs in a thread as a whole
+        card = await sync_to_async(build_member_card)(member_id)
+        if card is None:
+            return None
+        await cache.aset(card_cache_key(member_id), card, settings.MEMBER_CARD_CACHE_SECONDS)
+    return _with_days_remaining(card)
+
+
+def _lookup(field, value):
+    """(Member field, normalize, normalized value, lookup map key, queryset of matching ids)"""
+    attname, clean = LOOKUP_FIELDS[field]
+    value = clean(value)
+    filters = {f'{attname}__iexact' if field == 'email' else attname: value}
+    members = Member.objects.filter(**filters).order_by('id').values_list('id', flat=True)
+    return attname, clean, value, _lookup_cache_key(field, value), members
+
+
+def resolve_member_id(field, value):
+    """Member id for a phone number, email or biometric id, via the cached lookup map."""
+    attname, clean, value, key, members = _lookup(field, value)
+    member_id = cache.get(key)
+    if member_id is not None:
+        card = cache.get(card_cache_key(member_id))
+        if card is not None and clean(card[attname] or '') == value:
+            return member_id
+
+    member_id = members.first()
+    if member_id is not None:
+        cache.set(key, member_id, settings.MEMBER_CARD_CACHE_SECONDS)
+    return member_id
+
+
+async def aresolve_member_id(field, value):
+    """resolve_member_id() for async views."""
+    attname, clean, value, key, members = _lookup(field, value)
+    member_id = await cache.aget(key)
+    if member_id is not None:
+        card = await cache.aget(card_cache_key(member_id))
+        if card is not None and clean(card[attname] or '') == value:
+            return member_id
+
+    member_id = await members.afirst()
+    if member_id is not None:
+        await cache.aset(key, member_id, settings.MEMBER_CARD_CACHE_SECONDS)
+    return member_id
+
+
+def invalidate_member_cards(member_ids):
+    cache.delete_many([card_cache_key(member_id) for member_id in member_ids])
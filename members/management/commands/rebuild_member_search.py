@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from members.models import Member
+from members.search import build_search_key, install_search_index
+
+BATCH_SIZE = 2_000
+
+
+class Command(BaseCommand):
+    help = ("Recompute every member's search_key and recreate the search index "
+            "(needed on SQLite after a migration rebuilds the members table)")
+
+    def handle(self, *args, **options):
+        began = time.perf_counter()
+        updated = 0
+        with transaction.atomic():
+            last_pk = 0
+            while True:
+                batch = list(Member.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                    'full_name', 'phone_number', 'alternate_phone', 'biometric_id', 'search_key')[:BATCH_SIZE])
+                if not batch:
+                    break
+                changed = [member for member in batch if member.search_key != build_search_key(member)]
+                for member in changed:
+                    member.search_key = build_search_key(member)
+                Member.objects.bulk_update(changed, ['search_key'], batch_size=500)
+                updated += len(changed)
+                last_pk = batch[-1].pk
+
+        install_search_index(connection)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated:,} search keys and rebuilt the {connection.vendor} search index "
+            f"in {time.perf_counter() - began:.1f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_alter_member_referral_source'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='biometric_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=8, unique=True),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:20
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2_000
+
+# Frozen copies of members.search as of this migration: later changes to the
+# search key or the indexes get their own migration
+
+LOCAL_DIGITS = 10
+FTS_TABLE = 'members_member_search'
+TRIGRAM_INDEX = 'members_member_search_key_trgm'
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def _phone_words(phone):
+    digits = ''.join(ch for ch in phone or '' if ch.isdigit())
+    return [digits, digits[-LOCAL_DIGITS:]] if len(digits) > LOCAL_DIGITS else [digits]
+
+
+def build_search_key(member):
+    return ' '.join(filter(None, [
+        normalize(member.full_name),
+        *_phone_words(member.phone_number),
+        *_phone_words(member.alternate_phone),
+        normalize(member.biometric_id),
+    ]))
+
+
+INDEX_STATEMENTS = {
+    'sqlite': [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            search_key, content='members_member', content_rowid='id',
+            prefix='2 3', tokenize='unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON members_member BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON members_member BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_key ON members_member BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+            INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+        END""",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    ],
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON members_member USING gin (search_key gin_trgm_ops)",
+    ],
+}
+
+DROP_STATEMENTS = {
+    'sqlite': [f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}' for suffix in ('insert', 'delete', 'update')]
+              + [f'DROP TABLE IF EXISTS {FTS_TABLE}'],
+    'postgresql': [f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}'],
+}
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements.get(connection.vendor, []):
+            cursor.execute(statement)
+
+
+def fill_search_keys(apps, schema_editor):
+    Member = apps.get_model('members', 'Member')
+    members = Member.objects.using(schema_editor.connection.alias).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(members.filter(pk__gt=last_pk).only(
+            'full_name', 'phone_number', 'alternate_phone', 'biometric_id')[:BATCH_SIZE])
+        if not batch:
+            break
+        for member in batch:
+            member.search_key = build_search_key(member)
+        Member.objects.using(schema_editor.connection.alias).bulk_update(batch, ['search_key'], batch_size=500)
+        last_pk = batch[-1].pk
+
+
+def create_search_index(apps, schema_editor):
+    _execute(schema_editor.connection, INDEX_STATEMENTS)
+
+
+def remove_search_index(apps, schema_editor):
+    _execute(schema_editor.connection, DROP_STATEMENTS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_alter_member_biometric_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='search_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
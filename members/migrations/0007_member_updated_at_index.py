@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_member_search_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['updated_at', 'id'], name='members_mem_updated_36eff7_idx'),
+        ),
+    ]
@@ -53,7 +53,7 @@ class Member(models.Model):
     weight_kg = models.FloatField(blank=True, null=True)
 
     # 4. Biometric & Visual ID
-    biometric_id = models.CharField(max_length=4, unique=True, editable=False, blank=True, db_index=True)
+    biometric_id = models.CharField(max_length=8, unique=True, editable=False, blank=True, db_index=True)
     profile_photo = models.ImageField(upload_to='members/photos/', blank=True, null=True)
 
     # 5. Registration
@@ -64,6 +64,9 @@ class Member(models.Model):
     # Status
     is_active = models.BooleanField(default=True)
 
+    # Normalized name, phone numbers and biometric id (see members/search.py)
+    search_key = models.CharField(max_length=255, blank=True, default='', editable=False)
+
     # Derived fields
     @property
     def age(self):
@@ -91,6 +94,12 @@ class Member(models.Model):
                 last_id = 0
             new_id = last_id + 1
             self.biometric_id = f"{new_id:04d}"  # Format: 0001, 0002, etc.
+
+        from members.search import build_search_key
+        self.search_key = build_search_key(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_key' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_key']
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -104,4 +113,6 @@ class Member(models.Model):
             models.Index(fields=['phone_number']),
             models.Index(fields=['email']),
             models.Index(fields=['biometric_id']),
+            # Incremental sync (sync/changes.py)
+            models.Index(fields=['updated_at', 'id']),
         ]
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Member search for the reception typeahead and the subscription list filter.
+
+Every member has a ``search_key``: their name, phone numbers and biometric
+id, case-folded and stripped of accents and punctuation (see
+build_search_key). A query is normalized the same way, and every query word
+must match:
+
+* PostgreSQL: a pg_trgm GIN index on search_key serves the substring
+  (LIKE '%word%') filters.
+* SQLite: an FTS5 table over search_key with prefix indexes serves
+  word-prefix matches. Triggers keep it in sync with members_member.
+* Any other backend gets the substring filters without an index.
+
+Matches are ranked: exact biometric id or phone number first, then matches
+at the start of the name, then at the start of any word, then the rest. On
+PostgreSQL, trigram word similarity breaks ties.
+
+The indexes are created by migration 0006. SQLite drops a table's triggers
+when a migration rebuilds it, so after altering Member on SQLite, reinstall
+them with ``manage.py rebuild_member_search``.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+TYPEAHEAD_LIMIT = 10
+LOCAL_DIGITS = 10  # Indian mobile numbers
+FTS_TABLE = 'members_member_search'
+TRIGRAM_INDEX = 'members_member_search_key_trgm'
+
+_SEPARATORS = re.compile(r'[\W_]+')
+_PHONE_LIKE = re.compile(r'[\d\s+\-()]+')
+
+
+def normalize(text):
+    """Lowercase words without accents or punctuation, single-space separated."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return _SEPARATORS.sub(' ', text).strip()
+
+
+def _digits(text):
+    return ''.join(ch for ch in text or '' if ch.isdigit())
+
+
+def _phone_words(phone):
+    # Also without the country code, so a typed local number matches as a prefix
+    digits = _digits(phone)
+    return [digits, digits[-LOCAL_DIGITS:]] if len(digits) > LOCAL_DIGITS else [digits]
+
+
+def build_search_key(member):
+    return ' '.join(filter(None, [
+        normalize(member.full_name),
+        *_phone_words(member.phone_number),
+        *_phone_words(member.alternate_phone),
+        normalize(member.biometric_id),
+    ]))
+
+
+def query_words(query):
+    """The words of a search query; phone numbers typed with spaces or dashes stay one word."""
+    query = (query or '').strip()
+    if _PHONE_LIKE.fullmatch(query):
+        digits = _digits(query)
+        return [digits] if digits else []
+    return normalize(query).split()
+
+
+def matching_members(query):
+    """Unordered queryset of the members matching every word of ``query``."""
+    from members.models import Member
+
+    words = query_words(query)
+    if not words:
+        return Member.objects.none()
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        return Member.objects.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+    condition = Q()
+    for word in words:
+        condition &= Q(search_key__contains=word)
+    return Member.objects.filter(condition)
+
+
+def search_members(query, limit=TYPEAHEAD_LIMIT):
+    """The best ``limit`` matches for ``query``, best first."""
+    key = ' '.join(query_words(query))
+    raw = (query or '').strip()
+    members = matching_members(query).annotate(match_quality=Case(
+        When(Q(biometric_id=raw) | Q(phone_number=raw), then=Value(0)),
+        When(search_key__startswith=key, then=Value(1)),
+        When(search_key__contains=f' {key}', then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    ))
+    ordering = ['match_quality']
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        members = members.annotate(similarity=TrigramWordSimilarity(key, 'search_key'))
+        ordering.append('-similarity')
+    return members.order_by(*ordering, 'full_name', 'id')[:limit]
+
+
+# --- Index maintenance (used by migration 0006 and rebuild_member_search) ---
+
+_SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_key, content='members_member', content_rowid='id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON members_member BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON members_member BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF search_key ON members_member BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_key) VALUES ('delete', old.id, old.search_key);
+        INSERT INTO {FTS_TABLE}(rowid, search_key) VALUES (new.id, new.search_key);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+_POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON members_member USING gin (search_key gin_trgm_ops)",
+]
+
+
+def install_search_index(connection):
+    """Create whatever part of the search index is missing and load every key into it."""
+    statements = {'sqlite': _SQLITE_INDEX, 'postgresql': _POSTGRES_INDEX}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(connection):
+    statements = {
+        'sqlite': [f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}' for suffix in ('insert', 'delete', 'update')]
+                  + [f'DROP TABLE IF EXISTS {FTS_TABLE}'],
+        'postgresql': [f'DROP INDEX IF EXISTS {TRIGRAM_INDEX}'],
+    }.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from gymcrm.sparse import SparseFieldsSerializerMixin
 from .models import Member
 
 
-class MemberSerializer(serializers.ModelSerializer):
+class MemberSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     # Read-only calculated fields
     age = serializers.SerializerMethodField(read_only=True)
     bmi = serializers.SerializerMethodField(read_only=True)
@@ -56,6 +57,11 @@ class MemberSerializer(serializers.ModelSerializer):
             'age',
             'bmi',
         )
+        # Columns the calculated fields read (see gymcrm/sparse.py)
+        field_sources = {
+            'age': ['dob'],
+            'bmi': ['height_cm', 'weight_kg'],
+        }
 
     def get_age(self, obj):
         return obj.age
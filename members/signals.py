@@ -1,7 +1,10 @@
 # members/signals.py - Enhanced debugging version
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Member
+from gymcrm.live import publish_on_commit
+from .cards import invalidate_member_cards
+from .summary import invalidate_membership_summary
 from .tasks import send_member_welcome_whatsapp
 from django.db import transaction
 from django.conf import settings
@@ -56,3 +59,27 @@ def send_welcome_whatsapp_signal(sender, instance, created, **kwargs):
     else:
         pass
 
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_summary_on_member_change(sender, instance, **kwargs):
+    # After commit, so a concurrent poller can't re-cache the old counts
+    transaction.on_commit(invalidate_membership_summary)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_card_on_member_change(sender, instance, **kwargs):
+    # Lookup map entries need no invalidation: they are checked against the card
+    member_id = instance.pk
+    transaction.on_commit(lambda: invalidate_member_cards([member_id]))
+
+
+@receiver(post_save, sender=Member)
+def publish_member_change(sender, instance, **kwargs):
+    publish_on_commit(changed=[instance.pk])
+
+
+@receiver(post_delete, sender=Member)
+def publish_member_deletion(sender, instance, **kwargs):
+    publish_on_commit(deleted=[instance.pk])
@@ -0,0 +1,95 @@
+"""
+Membership summary shown on the dashboard.
+
+All buckets come from one conditional-aggregate query over members, with an
+EXISTS probe per subscription condition instead of joins plus DISTINCT. The
+dashboard polls the endpoint, so the result is cached for
+MEMBERSHIP_SUMMARY_CACHE_SECONDS and dropped whenever a member or
+subscription is written (see the post_save/post_delete receivers in
+members/signals.py and subscriptions/signals.py).
+
+When the entry is missing only one caller recomputes it: the first one takes
+a short-lived lock with cache.add(); everyone else polls the cache until the
+value appears, falling back to computing it themselves if the lock holder
+never delivers.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils.timezone import now
+
+from gymcrm.db_router import read_from_primary
+from members.models import Member
+
+LOCK_SECONDS = 10
+POLL_INTERVAL = 0.05
+
+
+def _cache_key(today):
+    return f'members:membership-summary:{today.isoformat()}'
+
+
+@read_from_primary()
+def compute_membership_summary(today=None):
+    from subscriptions.models import Subscription
+    from subscriptions.windows import expiring_subscriptions, expiry_window
+
+    today, check_date = expiry_window(today=today)
+
+    subscriptions = Subscription.objects.filter(member=OuterRef('pk'))
+    has_any = Exists(subscriptions)
+    has_active = Exists(subscriptions.filter(status='active'))
+    has_expiring = Exists(expiring_subscriptions(today=today).filter(member=OuterRef('pk')))
+
+    summary = Member.objects.aggregate(
+        active_members=Count('pk', filter=Q(has_active, is_active=True)),
+        expiring_members=Count('pk', filter=Q(has_expiring, is_active=True)),
+        inactive_members=Count('pk', filter=Q(has_any, ~Q(has_active), is_active=True)),
+        never_subscribed=Count('pk', filter=Q(~Q(has_any), is_active=True)),
+        blocked_members=Count('pk', filter=Q(is_active=False)),
+        total_members=Count('pk'),
+    )
+    summary['check_date'] = check_date
+    return summary
+
+
+def get_membership_summary():
+    today = now().date()
+    key = _cache_key(today)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_SECONDS):
+        try:
+            summary = compute_membership_summary(today)
+            cache.set(key, summary, settings.MEMBERSHIP_SUMMARY_CACHE_SECONDS)
+        finally:
+            cache.delete(lock_key)
+        return summary
+
+    # Someone else is computing it; wait for their result
+    deadline = time.monotonic() + LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        summary = cache.get(key)
+        if summary is not None:
+            return summary
+    return compute_membership_summary(today)
+
+
+async def aget_membership_summary():
+    """get_membership_summary() for async views; only a cache miss takes a thread."""
+    summary = await cache.aget(_cache_key(now().date()))
+    if summary is None:
+        # The miss path may wait on another caller's lock with time.sleep()
+        summary = await sync_to_async(get_membership_summary)()
+    return summary
+
+
+def invalidate_membership_summary():
+    cache.delete(_cache_key(now().date()))
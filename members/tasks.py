@@ -5,13 +5,13 @@ from plans.models import MembershipPlan
 from .whatsapp import send_whatsapp_message
 import logging
 from django.utils import timezone
-from django.db import connection, transaction
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 import time
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@shared_task(bind=True, max_retries=3, default_retry_delay=60, ignore_result=True)
 def send_member_welcome_whatsapp(self, member_id):
     """
     Send welcome WhatsApp message to new member
@@ -19,9 +19,6 @@ def send_member_welcome_whatsapp(self, member_id):
     task_id = self.request.id
     
     try:
-        # Force close existing connections to prevent stale connections
-        connection.close()
-        
         # Add small delay to ensure database consistency
         time.sleep(1)
         
@@ -92,7 +89,7 @@ def send_member_welcome_whatsapp(self, member_id):
         logger.info(f"[Task {task_id}] Task completed")
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@shared_task(bind=True, max_retries=3, default_retry_delay=60, ignore_result=True)
 def generate_birthday_wishes(self, member_id):
     """
     Send birthday wishes to member via WhatsApp
@@ -100,9 +97,6 @@ def generate_birthday_wishes(self, member_id):
     task_id = self.request.id
     
     try:
-        # Force close existing connections to prevent stale connections
-        connection.close()
-        
         # Add small delay to ensure database consistency
         time.sleep(1)
         
@@ -185,7 +179,7 @@ def generate_birthday_wishes(self, member_id):
 
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def daily_birthday_wishes():
     """
     Daily task to send birthday wishes to members
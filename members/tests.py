@@ -1,3 +1,243 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from gymcrm.testing import QueryBudgetTestCase, add_edge_cases
+from management.models import User
+from members.models import Member
+from members.search import matching_members, search_members
+from members.summary import compute_membership_summary, get_membership_summary
+from subscriptions import seeding
+from subscriptions.models import Subscription
+
+
+def _member(**filters):
+    return Member.objects.filter(**filters).order_by('id').first()
+
+
+class MemberEndpointQueryBudgetTests(QueryBudgetTestCase):
+    def test_list(self):
+        self.assertQueryBudget(1, lambda: lambda: self.client.get('/api/members/'))
+
+    def test_retrieve(self):
+        def prepare():
+            member = _member()
+            return lambda: self.client.get(f'/api/members/{member.id}/')
+        # The member's updated_at for the ETag, then the member
+        self.assertQueryBudget(2, prepare)
+
+    def test_create(self):
+        payload = {
+            'full_name': 'Budget Member', 'phone_number': '8000000001', 'gender': 'F',
+            'dob': '1995-05-05', 'address_line_1': 'Main Road', 'city': 'Kalpetta',
+            'district': 'Wayanad', 'state': 'Kerala', 'pin_code': '673121',
+        }
+
+        def prepare():
+            payload['phone_number'] = str(int(payload['phone_number']) + 1)
+            return lambda: self.client.post('/api/members/', payload, format='json')
+        self.assertQueryBudget(2, prepare, status_codes=(201,))
+
+    def test_partial_update(self):
+        def prepare():
+            member = _member()
+            return lambda: self.client.patch(f'/api/members/{member.id}/', {'occupation': 'Engineer'}, format='json')
+        self.assertQueryBudget(2, prepare)
+
+    def test_destroy(self):
+        def prepare():
+            member = _member(subscriptions__isnull=True) or _member()
+            return lambda: self.client.delete(f'/api/members/{member.id}/')
+        # The member's attendance rows are kept with member set to NULL, and
+        # a tombstone is written for syncing clients
+        self.assertQueryBudget(5, prepare, status_codes=(204,))
+
+    def test_sync(self):
+        # The changed rows and the tombstones
+        self.assertQueryBudget(2, lambda: lambda: self.client.get('/api/members/sync/'))
+
+    def test_block_and_unblock(self):
+        def prepare():
+            member = _member(is_active=True)
+            return lambda: self.client.patch(f'/api/members/{member.id}/block/')
+        self.assertQueryBudget(2, prepare)
+
+        def prepare():
+            member = _member(is_active=False)
+            return lambda: self.client.patch(f'/api/members/{member.id}/unblock/')
+        self.assertQueryBudget(2, prepare)
+
+    def test_active_with_membership(self):
+        self.assertQueryBudget(1, lambda: lambda: self.client.get('/api/members/active-with-membership/'))
+
+    def test_expiring_members(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/members/expiring-members/'))
+
+    def test_inactive_members(self):
+        self.assertQueryBudget(2, lambda: lambda: self.client.get('/api/members/inactive-members/'))
+
+    def test_membership_summary(self):
+        self.assertQueryBudget(1, lambda: lambda: self.client.get('/api/members/membership-summary/'))
+
+    def test_search(self):
+        self.assertQueryBudget(1, lambda: lambda: self.client.get('/api/members/search/', {'q': 'ra'}))
+
+
+class MembershipSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(members=8, subscriptions=24, history=0, seed_value=1)
+        add_edge_cases(1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_buckets_match_per_bucket_queries(self):
+        summary = compute_membership_summary()
+        members = Member.objects.filter(is_active=True)
+        self.assertEqual(summary['active_members'], members.filter(subscriptions__status='active').distinct().count())
+        self.assertEqual(
+            summary['inactive_members'],
+            members.filter(subscriptions__isnull=False).exclude(subscriptions__status='active').distinct().count(),
+        )
+        self.assertEqual(summary['never_subscribed'], members.filter(subscriptions__isnull=True).count())
+        self.assertEqual(summary['blocked_members'], Member.objects.filter(is_active=False).count())
+        self.assertEqual(summary['total_members'], Member.objects.count())
+        self.assertGreaterEqual(summary['expiring_members'], 1)
+
+    def test_cached_until_a_write(self):
+        first = get_membership_summary()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_membership_summary(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.filter(is_active=True).first().delete()
+        self.assertEqual(get_membership_summary()['total_members'], first['total_members'] - 1)
+
+
+class MemberSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reception', email='reception@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=40, subscriptions=60, history=0, seed_value=31)
+        address = {'dob': '1990-01-01', 'gender': 'M', 'address_line_1': 'MG Road', 'city': 'Kochi',
+                   'district': 'Ernakulam', 'state': 'Kerala', 'pin_code': '682001'}
+        cls.jose = Member.objects.create(full_name='José Álvarez', phone_number='+91 98470-12345', **address)
+        cls.zubin = Member.objects.create(full_name='Zubin Xaviour', phone_number='7012000001', **address)
+        cls.xaviour = Member.objects.create(full_name='Xaviour Quadros', phone_number='7012000002', **address)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def _names(self, query):
+        return [member.full_name for member in search_members(query)]
+
+    def test_accents_case_and_punctuation_are_ignored(self):
+        self.assertEqual(self._names('JOSE alv'), ['José Álvarez'])
+        self.assertEqual(self._names('98470 12'), ['José Álvarez'])
+        self.assertEqual(self._names('+91-98470'), ['José Álvarez'])
+
+    def test_ranked_by_match_quality(self):
+        self.assertEqual(self._names('xavi'), ['Xaviour Quadros', 'Zubin Xaviour'])
+        self.assertEqual(self._names(self.zubin.biometric_id)[0], 'Zubin Xaviour')
+
+    def test_index_follows_writes(self):
+        self.xaviour.full_name = 'Xaviour Menezes'
+        self.xaviour.save()
+        self.assertEqual(self._names('xaviour menez'), ['Xaviour Menezes'])
+        self.assertEqual(self._names('quadros'), [])
+        self.zubin.delete()
+        self.assertEqual(self._names('zubin xav'), [])
+
+    def test_typeahead_endpoint(self):
+        response = self.client.get('/api/members/search/', {'q': 'a'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(set(response.data[0]), {'id', 'full_name', 'phone_number', 'biometric_id', 'is_active'})
+        self.assertEqual(self.client.get('/api/members/search/', {'q': ' '}).data, [])
+
+    def test_subscription_list_filter(self):
+        member = Subscription.objects.order_by('created_at').first().member
+        surname = member.full_name.split()[-1]
+        response = self.client.get('/api/subscriptions/', {'q': surname.lower()})
+        self.assertEqual(response.status_code, 200)
+        expected = Subscription.objects.filter(member__in=matching_members(surname)).count()
+        self.assertGreaterEqual(expected, 1)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(len(rows), expected)
+
+    def test_rebuild_command(self):
+        Member.objects.filter(pk=self.jose.pk).update(search_key='')
+        self.assertEqual(self._names('alvarez'), [])
+        call_command('rebuild_member_search', stdout=StringIO())
+        self.assertEqual(self._names('alvarez'), ['José Álvarez'])
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='conditional', email='conditional@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=4, subscriptions=6, history=0, seed_value=48)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def _revalidate(self, path):
+        """(first response, response to the same request with its ETag)"""
+        first = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        return first, self.client.get(path, HTTP_IF_NONE_MATCH=first['ETag'])
+
+    def test_unchanged_member_is_not_sent_again(self):
+        member = _member()
+        first, again = self._revalidate(f'/api/members/{member.id}/')
+        self.assertTrue(first['ETag'].startswith('W/'))
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertEqual(again.content, b'')
+
+    def test_not_modified_serializes_nothing(self):
+        member = _member()
+        first = self.client.get(f'/api/members/{member.id}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/members/{member.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_member_is_sent(self):
+        member = _member()
+        first = self.client.get(f'/api/members/{member.id}/')
+        member.city = 'Thrissur'
+        member.save()
+        response = self.client.get(f'/api/members/{member.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['city'], 'Thrissur')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_if_modified_since(self):
+        member = _member()
+        first = self.client.get(f'/api/members/{member.id}/')
+        response = self.client.get(f'/api/members/{member.id}/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_subscription_follows_its_member(self):
+        subscription = Subscription.objects.order_by('created_at').first()
+        first, again = self._revalidate(f'/api/subscriptions/{subscription.id}/')
+        self.assertEqual(again.status_code, 304)
+
+        subscription.member.save()
+        response = self.client.get(f'/api/subscriptions/{subscription.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
 
-# Create your tests here.
+    def test_missing_objects_are_still_404(self):
+        self.assertEqual(self.client.get('/api/members/999999/', HTTP_IF_NONE_MATCH='W/"x"').status_code, 404)
+        self.assertEqual(self.client.get('/api/members/abc/').status_code, 404)
+        self.assertEqual(self.client.get('/api/subscriptions/not-a-uuid/').status_code, 404)
@@ -1,8 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import MemberViewSet
 
 router = DefaultRouter()
 router.register(r'members', MemberViewSet, basename='member')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('async/members/membership-summary/', async_views.membership_summary, name='async-membership-summary'),
+    path('async/members/lookup/', async_views.member_lookup, name='async-member-lookup'),
+    path('async/members/<int:member_id>/card/', async_views.member_card, name='async-member-card'),
+]
@@ -1,17 +1,39 @@
+import logging
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import models
+from gymcrm.conditional import ConditionalGetMixin
+from gymcrm.db_router import primary_db
+from gymcrm.sparse import SparseFieldsMixin
+from sync.changes import sync_response
 from .models import Member
+from .search import search_members
 from .serializers import MemberSerializer
+from .summary import get_membership_summary
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view
 
+logger = logging.getLogger(__name__)
+
 
-class MemberViewSet(viewsets.ModelViewSet):
+class MemberViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Member.objects.all()
     serializer_class = MemberSerializer
     permission_classes = [IsAuthenticated]
+    # The representation includes the member's age
+    changes_daily = True
+
+    def get_validators(self):
+        return self.get_object_versions('updated_at')
+
+    @primary_db
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Members changed or deleted since ?updated_since=<cursor> (see sync/changes.py)"""
+        # The cursor is built from updated_at whatever ?fields= asks for
+        return sync_response(self, self.restrict_queryset(Member.objects.all(), always=['updated_at']))
 
     @action(detail=True, methods=['patch'], url_path='block')
     def block_member(self, request, pk=None):
@@ -42,13 +64,11 @@ class MemberViewSet(viewsets.ModelViewSet):
                 subscriptions__status='active'
             ).select_related().distinct()
             
-            print(f"Members with active subscriptions (v2): {members_with_active_subscriptions.count()}")
-            
             serializer = MemberSerializer(members_with_active_subscriptions, many=True)
             return Response(serializer.data)
             
         except Exception as e:
-            print(f"Error in active_with_membership_v2: {str(e)}")
+            logger.exception("Error in active_with_membership")
             return Response(
                 {'error': f'Database error: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -59,36 +79,27 @@ class MemberViewSet(viewsets.ModelViewSet):
         """
         List members whose active subscriptions are expiring within 5 days from now.
         """
-        from subscriptions.models import Subscription
-        from django.utils.timezone import now
-        from datetime import timedelta
+        from subscriptions.windows import expiry_window, expiring_subscriptions as expiring_within
+        from django.db.models import Prefetch
         
         try:
-            # Calculate date 5 days from now
-            five_days_from_now = now().date() + timedelta(days=5)
-            
-            # Debug info
-            print(f"Checking for subscriptions expiring by: {five_days_from_now}")
+            today, five_days_from_now = expiry_window()
             
             # Get active subscriptions expiring within 5 days
-            expiring_subscriptions = Subscription.objects.filter(
-                status='active',
-                end_date__lte=five_days_from_now,
-                end_date__gte=now().date()  # Don't include already expired ones
-            )
-            
-            print(f"Found {expiring_subscriptions.count()} expiring subscriptions")
+            expiring_subscriptions = expiring_within(today=today)
             
-            # Get member IDs from expiring subscriptions
-            expiring_member_ids = expiring_subscriptions.values_list('member_id', flat=True).distinct()
-            
-            # Get members who are active and have expiring subscriptions
+            # Active members with an expiring subscription; the subscriptions
+            # themselves come in one prefetch instead of a query per member
             members = Member.objects.filter(
-                id__in=expiring_member_ids,
+                id__in=expiring_subscriptions.values('member_id'),
                 is_active=True
-            ).select_related()
-            
-            print(f"Found {members.count()} members with expiring subscriptions")
+            ).prefetch_related(
+                Prefetch(
+                    'subscriptions',
+                    queryset=expiring_subscriptions.select_related('plan'),
+                    to_attr='expiring_subscriptions'
+                )
+            )
             
             # Enhanced serializer data with expiration info
             members_data = []
@@ -96,13 +107,13 @@ class MemberViewSet(viewsets.ModelViewSet):
                 member_data = MemberSerializer(member).data
                 
                 # Get the expiring subscription details
-                expiring_sub = expiring_subscriptions.filter(member=member).first()
+                expiring_sub = member.expiring_subscriptions[0] if member.expiring_subscriptions else None
                 if expiring_sub:
                     member_data['expiring_subscription'] = {
                         'id': str(expiring_sub.id),
                         'plan_name': expiring_sub.plan.name,
                         'end_date': expiring_sub.end_date,
-                        'days_left': (expiring_sub.end_date - now().date()).days
+                        'days_left': (expiring_sub.end_date - today).days
                     }
                 
                 members_data.append(member_data)
@@ -112,12 +123,12 @@ class MemberViewSet(viewsets.ModelViewSet):
                 'debug_info': {
                     'check_date': five_days_from_now,
                     'expiring_subscriptions_count': expiring_subscriptions.count(),
-                    'expiring_members_count': members.count()
+                    'expiring_members_count': len(members_data)
                 }
             })
             
         except Exception as e:
-            print(f"Error in expiring_members: {str(e)}")
+            logger.exception("Error in expiring_members")
             return Response(
                 {'error': f'Database error: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -133,24 +144,30 @@ class MemberViewSet(viewsets.ModelViewSet):
         3. Are still active members (is_active=True)
         """
         from subscriptions.models import Subscription
-        from django.db.models import Count, Q
+        from django.db.models import Count, Prefetch, Q
         
         try:
-            # Get members who have subscriptions but no active ones
+            # Subscription stats are aggregated in the same query and the last
+            # subscription comes from a single prefetch, so the cost does not
+            # grow with the number of members
             inactive_members = Member.objects.filter(
-                is_active=True,  # Member account is still active
-                subscriptions__isnull=False  # Has at least one subscription (took initial membership)
-            ).exclude(
-                subscriptions__status='active'  # But no active subscriptions
+                is_active=True  # Member account is still active
             ).annotate(
                 total_subscriptions=Count('subscriptions'),
-                active_subscriptions=Count('subscriptions', filter=Q(subscriptions__status='active'))
+                active_subscriptions=Count('subscriptions', filter=Q(subscriptions__status='active')),
+                expired_subscriptions=Count('subscriptions', filter=Q(subscriptions__status='expired')),
+                cancelled_subscriptions=Count('subscriptions', filter=Q(subscriptions__status='cancelled')),
+                renewals=Count('subscriptions', filter=Q(subscriptions__is_renewal=True))
             ).filter(
                 total_subscriptions__gt=0,  # Has taken at least one subscription
                 active_subscriptions=0  # But no active subscriptions
-            ).distinct()
-            
-            print(f"Found {inactive_members.count()} inactive members")
+            ).prefetch_related(
+                Prefetch(
+                    'subscriptions',
+                    queryset=Subscription.objects.select_related('plan').order_by('-end_date'),
+                    to_attr='subscriptions_by_end_date'
+                )
+            )
             
             # Enhanced serializer data with subscription history
             members_data = []
@@ -158,7 +175,7 @@ class MemberViewSet(viewsets.ModelViewSet):
                 member_data = MemberSerializer(member).data
                 
                 # Get last subscription details
-                last_subscription = member.subscriptions.order_by('-end_date').first()
+                last_subscription = member.subscriptions_by_end_date[0] if member.subscriptions_by_end_date else None
                 if last_subscription:
                     member_data['last_subscription'] = {
                         'id': str(last_subscription.id),
@@ -171,10 +188,10 @@ class MemberViewSet(viewsets.ModelViewSet):
                 
                 # Get subscription counts
                 member_data['subscription_stats'] = {
-                    'total_subscriptions': member.subscriptions.count(),
-                    'expired_subscriptions': member.subscriptions.filter(status='expired').count(),
-                    'cancelled_subscriptions': member.subscriptions.filter(status='cancelled').count(),
-                    'has_renewed': member.subscriptions.filter(is_renewal=True).exists()
+                    'total_subscriptions': member.total_subscriptions,
+                    'expired_subscriptions': member.expired_subscriptions,
+                    'cancelled_subscriptions': member.cancelled_subscriptions,
+                    'has_renewed': member.renewals > 0
                 }
                 
                 members_data.append(member_data)
@@ -182,13 +199,13 @@ class MemberViewSet(viewsets.ModelViewSet):
             return Response({
                 'data': members_data,
                 'debug_info': {
-                    'inactive_members_count': inactive_members.count(),
+                    'inactive_members_count': len(members_data),
                     'criteria': 'Members with initial membership but no active subscriptions'
                 }
             })
             
         except Exception as e:
-            print(f"Error in inactive_members: {str(e)}")
+            logger.exception("Error in inactive_members")
             return Response(
                 {'error': f'Database error: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -199,66 +216,23 @@ class MemberViewSet(viewsets.ModelViewSet):
         """
         Get a summary of all membership statuses
         """
-        from subscriptions.models import Subscription
-        from django.utils.timezone import now
-        from datetime import timedelta
-        
         try:
-            five_days_from_now = now().date() + timedelta(days=5)
-            
-            # Active members with active subscriptions
-            active_members = Member.objects.filter(
-                is_active=True,
-                subscriptions__status='active'
-            ).distinct()
-            
-            # Expiring members
-            expiring_subscriptions = Subscription.objects.filter(
-                status='active',
-                end_date__lte=five_days_from_now,
-                end_date__gte=now().date()
-            )
-            expiring_members = Member.objects.filter(
-                is_active=True,
-                id__in=expiring_subscriptions.values_list('member_id', flat=True)
-            ).distinct()
-            
-            # Inactive members (have subscriptions but no active ones)
-            inactive_members = Member.objects.filter(
-                is_active=True,
-                subscriptions__isnull=False
-            ).exclude(
-                subscriptions__status='active'
-            ).distinct()
-            
-            # Never subscribed members
-            never_subscribed = Member.objects.filter(
-                is_active=True,
-                subscriptions__isnull=True
-            )
-            
-            # Blocked members
-            blocked_members = Member.objects.filter(is_active=False)
-            
-            summary = {
-                'active_members': active_members.count(),
-                'expiring_members': expiring_members.count(),
-                'inactive_members': inactive_members.count(),
-                'never_subscribed': never_subscribed.count(),
-                'blocked_members': blocked_members.count(),
-                'total_members': Member.objects.count(),
-                'check_date': five_days_from_now
-            }
-            
-            return Response(summary)
-            
+            return Response(get_membership_summary())
         except Exception as e:
-            print(f"Error in membership_summary: {str(e)}")
+            logger.exception("Error in membership_summary")
             return Response(
                 {'error': f'Database error: {str(e)}'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Typeahead for reception: the top matches for ?q= by name, phone or biometric id
+        """
+        members = search_members(request.query_params.get('q', ''))
+        return Response(list(members.values('id', 'full_name', 'phone_number', 'biometric_id', 'is_active')))
+
     def get_queryset(self):
         return Member.objects.all()
 
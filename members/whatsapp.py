@@ -2,6 +2,7 @@ from django.conf import settings
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 import re
+from gymcrm.task_metrics import timed
 
 def format_indian_phone_number(phone):
     if not phone:
@@ -28,11 +29,12 @@ def send_whatsapp_message(to, message):
         # IMPORTANT: Use the correct WhatsApp number
         from_number = settings.TWILIO_WHATSAPP_NUMBER  # e.g., 'whatsapp:+14155238886'
 
-        msg = client.messages.create(
-            from_=from_number,
-            body=message,
-            to=f'whatsapp:{formatted_phone}'
-        )
+        with timed('twilio_send_message'):
+            msg = client.messages.create(
+                from_=from_number,
+                body=message,
+                to=f'whatsapp:{formatted_phone}'
+            )
         return msg.sid
 
     except TwilioRestException as e:
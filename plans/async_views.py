@@ -0,0 +1,11 @@
+"""Async variant of the plan catalog (see gymcrm/asyncapi.py)."""
+from gymcrm.asyncapi import async_api_view
+from plans.models import MembershipPlan
+from plans.serializers import PLAN_FEATURES_PREFETCH, MembershipPlanSerializer
+
+
+@async_api_view
+async def plan_catalog(request):
+    """Same response as /api/subscriptions/available_plans/"""
+    plans = [plan async for plan in MembershipPlan.objects.prefetch_related(PLAN_FEATURES_PREFETCH)]
+    return MembershipPlanSerializer(plans, many=True).data
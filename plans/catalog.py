@@ -0,0 +1,29 @@
+"""
+Plan catalog version.
+
+Plans, features and plan features have no updated_at. Instead, every save
+or delete of one sets the catalog version, the time of the change, in the
+shared cache on commit. Conditional GETs of the catalog and of
+subscriptions, which embed their plan, are answered from it without reading
+the plans (see gymcrm/conditional.py).
+"""
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+VERSION_KEY = 'plans:catalog:version'
+
+
+def catalog_version():
+    """The time of the last catalog change, as a UTC datetime."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Evicted or never set: treat the catalog as changed now
+        cache.add(VERSION_KEY, time.time(), None)
+        version = cache.get(VERSION_KEY, time.time())
+    return datetime.fromtimestamp(version, tz=timezone.utc)
+
+
+def invalidate_catalog():
+    cache.set(VERSION_KEY, time.time(), None)
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:33
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0002_membershipplan_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feature',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('feature_type', models.CharField(choices=[('facility', 'Facility'), ('service', 'Service'), ('class', 'Group Class')], max_length=20)),
+                ('price_per_session', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['feature_type', 'name'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='membershipplan',
+            options={'ordering': ['plan_type', 'price']},
+        ),
+        migrations.RemoveField(
+            model_name='membershipplan',
+            name='type',
+        ),
+        migrations.AddField(
+            model_name='membershipplan',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='membershipplan',
+            name='includes_personal_training',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='membershipplan',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='membershipplan',
+            name='plan_type',
+            field=models.CharField(choices=[('basic', 'Basic Membership'), ('premium', 'Premium Membership'), ('personal_training', 'Personal Training'), ('combo', 'Combo Package')], default='basic', max_length=20),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='membershipplan',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RemoveField(
+            model_name='membershipplan',
+            name='features',
+        ),
+        migrations.AlterField(
+            model_name='membershipplan',
+            name='id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.CreateModel(
+            name='PlanFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('allowed_uses', models.IntegerField(default=0, help_text='0 = unlimited')),
+                ('is_unlimited', models.BooleanField(default=False)),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='plans.feature')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='plans.membershipplan')),
+            ],
+            options={
+                'unique_together': {('plan', 'feature')},
+            },
+        ),
+        migrations.AddField(
+            model_name='membershipplan',
+            name='features',
+            field=models.ManyToManyField(blank=True, through='plans.PlanFeature', to='plans.feature'),
+        ),
+    ]
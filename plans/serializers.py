@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from gymcrm.sparse import SparseFieldsSerializerMixin
 from .models import MembershipPlan, Feature, PlanFeature
 
+# Prefetch path that lets MembershipPlanSerializer render features without a
+# query per plan
+PLAN_FEATURES_PREFETCH = 'planfeature_set__feature'
+
 class FeatureSerializer(serializers.ModelSerializer):
     class Meta:
         model = Feature
@@ -15,7 +20,7 @@ class PlanFeatureSerializer(serializers.ModelSerializer):
         model = PlanFeature
         fields = ['feature', 'allowed_uses', 'is_unlimited']
 
-class MembershipPlanSerializer(serializers.ModelSerializer):
+class MembershipPlanSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     features = serializers.SerializerMethodField()
 
     class Meta:
@@ -24,7 +29,15 @@ class MembershipPlanSerializer(serializers.ModelSerializer):
             'id', 'name', 'plan_type', 'duration_days', 'price',
             'description', 'includes_personal_training', 'is_active', 'created_at', 'features'
         ]
+        # See gymcrm/sparse.py
+        field_sources = {'features': []}
+        field_prefetch = {'features': [PLAN_FEATURES_PREFETCH]}
 
     def get_features(self, obj):
-        plan_features = PlanFeature.objects.filter(plan=obj)
+        # Querysets that list plans prefetch 'planfeature_set__feature'
+        # (see PLAN_FEATURES_PREFETCH); fall back to one joined query otherwise
+        if 'planfeature_set' in getattr(obj, '_prefetched_objects_cache', {}):
+            plan_features = obj.planfeature_set.all()
+        else:
+            plan_features = obj.planfeature_set.select_related('feature')
         return PlanFeatureSerializer(plan_features, many=True).data
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from plans.catalog import invalidate_catalog
+from plans.models import Feature, MembershipPlan, PlanFeature
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+@receiver(post_save, sender=PlanFeature)
+@receiver(post_delete, sender=PlanFeature)
+def invalidate_catalog_on_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_catalog)
@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from gymcrm.testing import QueryBudgetTestCase
+from management.models import User
+from plans.models import MembershipPlan, PlanFeature
+from subscriptions import seeding
+
+
+def _plan():
+    return MembershipPlan.objects.order_by('created_at').first()
+
+
+class MembershipPlanEndpointQueryBudgetTests(QueryBudgetTestCase):
+    def test_list(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/membership-plans/'))
+
+    def test_retrieve(self):
+        def prepare():
+            plan = _plan()
+            return lambda: self.client.get(f'/api/membership-plans/{plan.id}/')
+        self.assertQueryBudget(3, prepare)
+
+    def test_create(self):
+        payload = {'name': 'Student Monthly', 'plan_type': 'basic', 'duration_days': 30, 'price': '900.00'}
+        self.assertQueryBudget(2, lambda: lambda: self.client.post('/api/membership-plans/', payload, format='json'),
+                               status_codes=(201,))
+
+    def test_partial_update(self):
+        def prepare():
+            plan = _plan()
+            return lambda: self.client.patch(f'/api/membership-plans/{plan.id}/', {'description': 'Updated'},
+                                             format='json')
+        self.assertQueryBudget(5, prepare)
+
+    def test_destroy(self):
+        def prepare():
+            plan = MembershipPlan.objects.create(name='Retired Plan', plan_type='basic', duration_days=30, price=500)
+            return lambda: self.client.delete(f'/api/membership-plans/{plan.id}/')
+        self.assertQueryBudget(7, prepare, status_codes=(204,))
+
+    def test_block(self):
+        def prepare():
+            plan = _plan()
+            return lambda: self.client.post(f'/api/membership-plans/{plan.id}/block/')
+        # 0 only because block is still a placeholder that touches nothing;
+        # raise it when the endpoint gets a real implementation
+        self.assertQueryBudget(0, prepare)
+
+
+class PlanCatalogConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='catalog', email='catalog@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed_catalog()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_catalog_is_answered_without_queries(self):
+        first = self.client.get('/api/membership-plans/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/membership-plans/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_plan_or_feature_changes_move_the_etag(self):
+        first = self.client.get('/api/membership-plans/')
+        with self.captureOnCommitCallbacks(execute=True):
+            PlanFeature.objects.order_by('pk').first().delete()
+        response = self.client.get('/api/membership-plans/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_plan_detail(self):
+        path = f'/api/membership-plans/{_plan().id}/'
+        first = self.client.get(path)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertNotEqual(first['ETag'], self.client.get('/api/membership-plans/')['ETag'])
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from .async_views import plan_catalog
 from .views import MembershipPlanViewSet
 
 router = DefaultRouter()
 router.register(r'membership-plans', MembershipPlanViewSet)
 
 urlpatterns = [
+    path('async/membership-plans/', plan_catalog, name='async-plan-catalog'),
     path('', include(router.urls)),
 ] 
\ No newline at end of file
@@ -2,16 +2,23 @@ from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from gymcrm.conditional import ConditionalGetMixin
+from .catalog import catalog_version
 from .models import MembershipPlan
-from .serializers import MembershipPlanSerializer
+from .serializers import MembershipPlanSerializer, PLAN_FEATURES_PREFETCH
 from rest_framework.permissions import IsAuthenticated
 
 # Create your views here.
 
-class MembershipPlanViewSet(viewsets.ModelViewSet):
+class MembershipPlanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
-    queryset = MembershipPlan.objects.all()
+    queryset = MembershipPlan.objects.prefetch_related(PLAN_FEATURES_PREFETCH)
     serializer_class = MembershipPlanSerializer
+    conditional_actions = ('list', 'retrieve')
+
+    def get_validators(self):
+        # Any plan or feature change, deletion included, moves the version
+        return [catalog_version()]
 
     @action(detail=True, methods=['post'])
     def block(self, request, pk=None):
@@ -1,3 +1,28 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from subscriptions.bulk import bulk_update_subscriptions
+from subscriptions.models import Subscription
+
+
+@admin.register(Subscription)
+class SubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('member', 'plan', 'status', 'start_date', 'end_date', 'is_renewal')
+    list_filter = ('status', 'is_renewal', 'plan')
+    search_fields = ('member__full_name', 'member__phone_number')
+    list_select_related = ('member', 'plan')
+    raw_id_fields = ('member',)
+    actions = ['mark_expired', 'mark_cancelled']
+
+    # Bulk actions go through bulk_update_subscriptions so every change is
+    # recorded in SubscriptionHistory, which queryset.update() would skip
+    @admin.action(description="Mark selected subscriptions as expired")
+    def mark_expired(self, request, queryset):
+        count = bulk_update_subscriptions(queryset, note="Marked expired by admin", status='expired')
+        self.message_user(request, f"{count} subscription(s) marked as expired.", messages.SUCCESS)
+
+    @admin.action(description="Cancel selected active or pending subscriptions")
+    def mark_cancelled(self, request, queryset):
+        count = bulk_update_subscriptions(
+            queryset.filter(status__in=['active', 'pending']), note="Cancelled by admin", status='cancelled',
+        )
+        self.message_user(request, f"{count} subscription(s) cancelled.", messages.SUCCESS)
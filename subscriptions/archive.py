@@ -0,0 +1,243 @@
+"""
+Archival of old subscription history.
+
+SubscriptionHistory is append-only, so the table (and every vacuum, backup
+and history query) grows without bound. Entries older than
+HISTORY_ARCHIVE_AFTER_MONTHS are moved out of the database into
+gzip-compressed JSONL files under HISTORY_ARCHIVE_ROOT, one file per
+calendar month per archival run.
+
+Inside a file each member's entries are contiguous, and the file is a
+sequence of independent gzip members ("blocks") of up to BLOCK_BYTES of
+JSON each. An ArchivedHistorySegment row records the block holding a
+member's entries for the month, so reading a member's archived timeline
+seeks to and decompresses only those blocks. index.json in the archive root
+lists every file with its month, entry count and checksum, so the archive
+can be verified or restored without the database.
+
+Archived entries are written in the SubscriptionHistorySerializer format
+and member_timeline() merges them with the live rows.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, time, timedelta
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from rest_framework import serializers
+
+from subscriptions.models import ArchivedHistorySegment, MemberSnapshot, SubscriptionHistory
+from subscriptions.serializers import SubscriptionHistorySerializer
+
+BLOCK_BYTES = 256 * 1024
+FETCH_CHUNK = 2_000
+DELETE_BATCH = 1_000
+INDEX_FILE = 'index.json'
+# Snapshots this recent are never pruned (see prune_member_snapshots())
+SNAPSHOT_PRUNE_MARGIN = timedelta(hours=1)
+
+_timestamp = serializers.DateTimeField()
+
+
+def archive_root():
+    return Path(settings.HISTORY_ARCHIVE_ROOT)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def archive_cutoff(months=None, today=None):
+    """First day of the oldest month that stays in the database."""
+    months = settings.HISTORY_ARCHIVE_AFTER_MONTHS if months is None else months
+    today = today or timezone.now().date()
+    return _add_months(today.replace(day=1), -months)
+
+
+def _month_bounds(month):
+    start = timezone.make_aware(datetime.combine(month, time.min))
+    end = timezone.make_aware(datetime.combine(_add_months(month, 1), time.min))
+    return start, end
+
+
+def _record(row):
+    entry_id, subscription_id, member_id, snapshot, member_snapshot, note, created_at = row
+    return {
+        'id': entry_id,
+        'subscription': str(subscription_id),
+        'member': member_id,
+        'snapshot': snapshot,
+        'member_snapshot': member_snapshot,
+        'note': note,
+        'created_at': _timestamp.to_representation(created_at),
+    }
+
+
+def _load_index(root):
+    try:
+        with open(root / INDEX_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'files': {}}
+
+
+def _save_index(root, index):
+    tmp = root / f'{INDEX_FILE}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, root / INDEX_FILE)
+
+
+def archivable_months(cutoff):
+    return list(SubscriptionHistory.objects.filter(created_at__lt=timezone.make_aware(
+        datetime.combine(cutoff, time.min))).dates('created_at', 'month'))
+
+
+def archive_month(month, root=None, stamp=None):
+    """
+    Move every history entry created in ``month`` to a new archive file.
+    The file is complete and renamed into place before any row is deleted;
+    segment rows and the deletes are committed together.
+    Returns (relative path, entries, members), or None if there was nothing to move.
+    """
+    root = root or archive_root()
+    stamp = stamp or timezone.now().strftime('%Y%m%dT%H%M%S')
+    start, end = _month_bounds(month)
+    entries = SubscriptionHistory.objects.filter(created_at__gte=start, created_at__lt=end)
+    rows = (entries
+            .order_by('subscription__member_id', 'created_at', 'id')
+            .values_list('id', 'subscription_id', 'subscription__member_id', 'snapshot',
+                         'member_snapshot_ref__data', 'note', 'created_at')
+            .iterator(chunk_size=FETCH_CHUNK))
+
+    relative = Path(f'{month:%Y}') / f'{month:%Y-%m}-{stamp}.jsonl.gz'
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+
+    segments, archived_ids = [], []
+    checksum = hashlib.sha256()
+    with open(tmp, 'wb') as f:
+        block, block_members = [], []
+        block_bytes = 0
+
+        def flush():
+            nonlocal block_bytes
+            data = gzip.compress(b''.join(block))
+            offset = f.tell()
+            f.write(data)
+            checksum.update(data)
+            for member_id, count in block_members:
+                segments.append(ArchivedHistorySegment(
+                    member_id=member_id, month=month, path=str(relative),
+                    offset=offset, length=len(data), entries=count,
+                ))
+            block.clear()
+            block_members.clear()
+            block_bytes = 0
+
+        for member_id, member_rows in groupby(rows, key=lambda row: row[2]):
+            count = 0
+            for row in member_rows:
+                line = json.dumps(_record(row), separators=(',', ':')).encode() + b'\n'
+                block.append(line)
+                block_bytes += len(line)
+                archived_ids.append(row[0])
+                count += 1
+            block_members.append((member_id, count))
+            if block_bytes >= BLOCK_BYTES:
+                flush()
+        if block:
+            flush()
+        f.flush()
+        os.fsync(f.fileno())
+
+    if not archived_ids:
+        tmp.unlink()
+        return None
+    os.replace(tmp, path)
+
+    try:
+        with transaction.atomic():
+            ArchivedHistorySegment.objects.bulk_create(segments, batch_size=FETCH_CHUNK)
+            for i in range(0, len(archived_ids), DELETE_BATCH):
+                SubscriptionHistory.objects.filter(id__in=archived_ids[i:i + DELETE_BATCH]).delete()
+    except Exception:
+        # The rows are still in the database; don't leave an unindexed copy behind
+        path.unlink()
+        raise
+
+    index = _load_index(root)
+    index['files'][str(relative)] = {
+        'month': f'{month:%Y-%m}',
+        'entries': len(archived_ids),
+        'members': len(segments),
+        'bytes': path.stat().st_size,
+        'sha256': checksum.hexdigest(),
+        'archived_at': timezone.now().isoformat(),
+    }
+    _save_index(root, index)
+    return str(relative), len(archived_ids), len(segments)
+
+
+def prune_member_snapshots(started=None):
+    """
+    Delete member snapshots no longer referenced by any live history entry.
+
+    A writer interns a snapshot before it inserts the entry pointing at it,
+    so an unreferenced snapshot may be about to be used. Snapshots created
+    after ``started`` (when the archive run began, default now) minus
+    SNAPSHOT_PRUNE_MARGIN are kept, and so are older ones a writer has
+    interned and locked in a transaction that is still open.
+    """
+    cutoff = (started or timezone.now()) - SNAPSHOT_PRUNE_MARGIN
+    referenced = SubscriptionHistory.objects.filter(member_snapshot_ref=OuterRef('pk'))
+    with transaction.atomic():
+        unused = list(
+            MemberSnapshot.objects.filter(~Exists(referenced), created_at__lt=cutoff)
+            .select_for_update(skip_locked=True).values_list('pk', flat=True)
+        )
+        deleted = 0
+        for i in range(0, len(unused), DELETE_BATCH):
+            deleted += MemberSnapshot.objects.filter(pk__in=unused[i:i + DELETE_BATCH]).delete()[0]
+    return deleted
+
+
+def read_archived_history(member_id, root=None):
+    """A member's archived entries, newest first."""
+    root = root or archive_root()
+    records = []
+    blocks = (ArchivedHistorySegment.objects.filter(member_id=member_id)
+              .values_list('path', 'offset', 'length').order_by().distinct())
+    for relative, offset, length in blocks:
+        with open(root / relative, 'rb') as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        for line in data.splitlines():
+            record = json.loads(line)
+            if record['member'] == member_id:
+                records.append(record)
+    records.sort(key=lambda record: (record['created_at'], record['id']), reverse=True)
+    return records
+
+
+def member_timeline(member_id):
+    """
+    A member's full subscription history, newest first: live entries
+    followed by archived ones, each flagged with ``archived``.
+    """
+    live = (SubscriptionHistory.objects.filter(subscription__member_id=member_id)
+            .select_related('member_snapshot_ref')
+            .order_by('-created_at', '-id'))
+    timeline = [dict(entry, archived=False) for entry in SubscriptionHistorySerializer(live, many=True).data]
+    for record in read_archived_history(member_id):
+        record.pop('member')
+        timeline.append(dict(record, archived=True))
+    return timeline
@@ -0,0 +1,299 @@
+"""
+Endpoint benchmark runner.
+
+Each target issues a real request through the full Django/DRF stack with an
+authenticated staff user and records latency and query counts. Mutating
+targets (enroll, renew) run inside a transaction that is rolled back, so runs
+are repeatable against the same seeded database. Celery publishing is
+short-circuited: we are measuring the web path, not the broker.
+"""
+import statistics
+import time
+from datetime import timedelta
+from unittest import mock
+
+from celery.app.task import Task
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from members.models import Member
+from subscriptions.models import Subscription
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _member_with_active_subscription():
+    return (Subscription.objects.filter(status='active')
+            .select_related('member').order_by('created_at').first())
+
+
+def _member_without_active_subscription():
+    return Member.objects.exclude(subscriptions__status='active').order_by('id').first()
+
+
+def _plan_id():
+    from plans.models import MembershipPlan
+    return MembershipPlan.objects.order_by('price').values_list('id', flat=True).first()
+
+
+def target_all_members():
+    return lambda client: client.get('/api/subscriptions/all_members/')
+
+
+def target_membership_summary():
+    return lambda client: client.get('/api/members/membership-summary/')
+
+
+def target_cohort_retention():
+    from analytics.cohorts import cohort_cache_key
+    # Measure the computation, not a cache hit
+    cache.delete(cohort_cache_key(12, 12))
+    return lambda client: client.get('/api/analytics/cohorts/')
+
+
+def target_member_lookup():
+    phone = _member_with_active_subscription().member.phone_number
+    return lambda client: client.get('/api/subscriptions/member_lookup/', {'phone': phone})
+
+
+def target_enroll():
+    payload = {'member_id': _member_without_active_subscription().id, 'plan_id': str(_plan_id())}
+    return lambda client: client.post('/api/subscriptions/enroll/', payload, format='json')
+
+
+def target_renew():
+    subscription_id = _member_with_active_subscription().id
+    return lambda client: client.post(f'/api/subscriptions/{subscription_id}/renew/', {}, format='json')
+
+
+def target_attendance_ingest():
+    from django.utils import timezone
+
+    # A peak-hour burst: 1,000 punches from members with and without access
+    biometric_ids = list(Member.objects.exclude(biometric_id='').order_by('id')
+                         .values_list('biometric_id', flat=True)[:1000])
+    start = timezone.now().replace(microsecond=0)
+    payload = {'device_id': 'benchmark', 'punches': [
+        {'biometric_id': biometric_id, 'punched_at': (start + timedelta(seconds=i)).isoformat()}
+        for i, biometric_id in enumerate(biometric_ids)
+    ]}
+    return lambda client: client.post('/api/attendance/ingest/', payload, format='json')
+
+
+# name -> (prepare() -> request(client), mutates data). Preparation (finding a
+# suitable member etc.) happens outside the measured window.
+TARGETS = {
+    'all_members': (target_all_members, False),
+    'membership_summary': (target_membership_summary, False),
+    'member_lookup': (target_member_lookup, False),
+    'cohort_retention': (target_cohort_retention, False),
+    'enroll': (target_enroll, True),
+    'renew': (target_renew, True),
+    'attendance_ingest': (target_attendance_ingest, True),
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run_once(client, prepare, mutates):
+    func = prepare()
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if mutates:
+            try:
+                with transaction.atomic():
+                    response = func(client)
+                    raise _Rollback
+            except _Rollback:
+                pass
+        else:
+            response = func(client)
+        elapsed = time.perf_counter() - start
+    return response.status_code, elapsed, len(queries)
+
+
+def run(user, names=None, iterations=5, warmup=1):
+    """Benchmark the selected targets; returns one result dict per target."""
+    client = APIClient(HTTP_HOST='localhost')
+    client.force_authenticate(user)
+
+    results = []
+    with mock.patch.object(Task, 'apply_async'):
+        for name in names or TARGETS:
+            prepare, mutates = TARGETS[name]
+            for _ in range(warmup):
+                _run_once(client, prepare, mutates)
+
+            timings, query_counts, statuses = [], [], set()
+            for _ in range(iterations):
+                status_code, elapsed, query_count = _run_once(client, prepare, mutates)
+                timings.append(elapsed * 1000)
+                query_counts.append(query_count)
+                statuses.add(status_code)
+
+            results.append({
+                'name': name,
+                'iterations': iterations,
+                'status_codes': sorted(statuses),
+                'mean_ms': round(statistics.mean(timings), 2),
+                'p50_ms': round(_percentile(timings, 50), 2),
+                'p95_ms': round(_percentile(timings, 95), 2),
+                'max_ms': round(max(timings), 2),
+                'queries': max(query_counts),
+            })
+    return results
+
+
+# --- Concurrency benchmark against running servers ---
+
+# name -> (prepare() -> query params, sync path, async path)
+CONCURRENCY_TARGETS = {
+    'member_lookup': (
+        lambda: {'phone': _member_with_active_subscription().member.phone_number},
+        '/api/subscriptions/member_lookup/', '/api/async/members/lookup/',
+    ),
+    'membership_summary': (
+        dict, '/api/members/membership-summary/', '/api/async/members/membership-summary/',
+    ),
+    'plan_catalog': (
+        dict, '/api/subscriptions/available_plans/', '/api/async/membership-plans/',
+    ),
+}
+
+
+def run_concurrent(url, token, clients=200, duration=10.0, params=None):
+    """
+    Hammer ``url`` from ``clients`` threads, each with its own keep-alive
+    connection, for ``duration`` seconds. Returns throughput and latency.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    timings, failures = [], []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def client():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        local_timings, local_failures = [], 0
+        while time.perf_counter() < deadline:
+            began = time.perf_counter()
+            try:
+                ok = session.get(url, params=params, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                local_timings.append((time.perf_counter() - began) * 1000)
+            else:
+                local_failures += 1
+        with lock:
+            timings.extend(local_timings)
+            failures.append(local_failures)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(timings),
+        'errors': sum(failures),
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(_percentile(timings, 50), 1) if timings else None,
+        'p95_ms': round(_percentile(timings, 95), 1) if timings else None,
+    }
+
+
+# --- Connection reuse: a new database connection per request/task vs a kept one ---
+
+def _wsgi_get(handler, path, token):
+    """GET ``path`` through the real WSGI handler, request signals included."""
+    import io
+
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f'Bearer {token}', 'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(),
+        'wsgi.url_scheme': 'http', 'wsgi.multithread': True, 'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    statuses = []
+    response = handler(environ, lambda status, headers: statuses.append(status))
+    b''.join(response)
+    response.close()  # request_finished
+    return int(statuses[0].split()[0])
+
+
+def _task_cycle(task, member_id):
+    """One task's database lifecycle as a worker runs it (gymcrm/task_connections.py)."""
+    from gymcrm.task_connections import close_stale_connections
+
+    close_stale_connections(sender=task)
+    Member.objects.filter(pk=member_id).first()
+    close_stale_connections(sender=task)
+    return 200
+
+
+def run_connection_reuse(token, cycles=200, max_age=60):
+    """
+    Time ``cycles`` requests (through the WSGI handler) and task runs with
+    CONN_MAX_AGE=0, a new connection each time, and with ``max_age``,
+    counting the connections opened.
+    """
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db.backends.signals import connection_created
+
+    from subscriptions.tasks import flush_feature_usage
+
+    handler = WSGIHandler()
+    member_id = Member.objects.order_by('pk').values_list('pk', flat=True).first()
+    lifecycles = {
+        'request': lambda: _wsgi_get(handler, '/api/subscriptions/available_plans/', token),
+        'task': lambda: _task_cycle(flush_feature_usage, member_id),
+    }
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    original = connection.settings_dict['CONN_MAX_AGE']
+    results = []
+    connection_created.connect(count)
+    try:
+        for name, cycle in lifecycles.items():
+            for age in (0, max_age):
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = age
+                cycle()  # warm up
+                opened.clear()
+                timings, statuses = [], set()
+                for _ in range(cycles):
+                    start = time.perf_counter()
+                    statuses.add(cycle())
+                    timings.append((time.perf_counter() - start) * 1000)
+                results.append({
+                    'name': name,
+                    'conn_max_age': age,
+                    'cycles': cycles,
+                    'status_codes': sorted(statuses),
+                    'connections_opened': len(opened),
+                    'mean_ms': round(statistics.mean(timings), 3),
+                    'p50_ms': round(_percentile(timings, 50), 3),
+                    'p95_ms': round(_percentile(timings, 95), 3),
+                })
+    finally:
+        connection_created.disconnect(count)
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = original
+    return results
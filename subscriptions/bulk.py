@@ -0,0 +1,103 @@
+"""
+Mass subscription changes that keep the history trail.
+
+queryset.update() skips the pre_save signal, so the change leaves no
+SubscriptionHistory entry. Saving row by row keeps the history but costs a
+handful of queries per subscription. bulk_update_subscriptions() works in
+chunks instead. Each chunk locks and loads its subscriptions with their
+members and plans, writes one history entry per subscription that actually
+changes (the same snapshots the signal records), and applies the change
+with one UPDATE, all in one transaction. That is four queries per chunk
+whatever its size. Each chunk drops the caches it affects and notifies the
+live dashboards on commit.
+
+Used by the nightly expiry sweep, the admin bulk actions and the
+import_subscription_changes command.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from analytics.revenue import REVENUE_FIELDS, invalidate_revenue
+from attendance.access import invalidate_allowed_members
+from gymcrm.live import publish_on_commit
+from members.cards import invalidate_member_cards
+from members.summary import invalidate_membership_summary
+from subscriptions.models import Subscription, SubscriptionHistory
+from subscriptions.signals import get_member_snapshot, get_subscription_snapshot
+from subscriptions.usage import invalidate_allowances
+
+CHUNK_SIZE = 500
+
+# Relations need per-row handling (plan changes have grace-period rules and
+# their own change log), so they are not bulk-updatable
+BULK_FIELDS = {'status', 'start_date', 'end_date', 'is_renewal', 'signed_by_member'}
+
+
+def bulk_update_subscriptions(queryset, note, chunk_size=CHUNK_SIZE, **changes):
+    """
+    Set ``changes`` (field=value) on every subscription in ``queryset`` and
+    record a history entry with ``note`` for each one that changed.
+    Subscriptions that already have these values are left alone. Returns
+    the number of subscriptions updated.
+    """
+    unknown = set(changes) - BULK_FIELDS
+    if unknown:
+        raise ValueError(f"Cannot bulk update {', '.join(sorted(unknown))}")
+    if not changes:
+        return 0
+
+    # Keyset pagination over the matching primary keys, so rows updated in an
+    # earlier chunk (and possibly no longer matching) do not shift the pages
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    updated = 0
+    last_pk = None
+    while True:
+        page = pks.filter(pk__gt=last_pk) if last_pk is not None else pks
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+        updated += _update_chunk(chunk, note, changes)
+    return updated
+
+
+def _update_chunk(pks, note, changes):
+    with transaction.atomic():
+        subscriptions = list(
+            Subscription.objects.filter(pk__in=pks)
+            .select_related('member', 'plan')
+            .select_for_update(of=('self',))
+            .order_by()
+        )
+        changed = [
+            subscription for subscription in subscriptions
+            if any(getattr(subscription, field) != value for field, value in changes.items())
+        ]
+        if not changed:
+            return 0
+
+        entries = [
+            SubscriptionHistory(
+                subscription=subscription,
+                snapshot=get_subscription_snapshot(subscription),
+                member_snapshot=get_member_snapshot(subscription.member),
+                note=note,
+            )
+            for subscription in changed
+        ]
+        member_ids = {subscription.member_id for subscription in changed}
+        subscription_ids = [subscription.pk for subscription in changed]
+        # Caches first, so dashboard streams notified by the publish read fresh data
+        transaction.on_commit(invalidate_membership_summary)
+        transaction.on_commit(invalidate_allowed_members)
+        transaction.on_commit(lambda: invalidate_member_cards(member_ids))
+        transaction.on_commit(lambda: invalidate_allowances(subscription_ids))
+        if set(changes) & REVENUE_FIELDS:
+            # update() sends no post_save, so analytics.signals does not see it
+            transaction.on_commit(invalidate_revenue)
+        publish_on_commit(changed=member_ids)
+        SubscriptionHistory.resolve_member_snapshots(entries)
+        SubscriptionHistory.objects.bulk_create(entries)
+        return Subscription.objects.filter(pk__in=subscription_ids).update(
+            updated_at=timezone.now(), **changes,
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from subscriptions.archive import archivable_months, archive_cutoff, archive_month, archive_root, prune_member_snapshots
+
+
+class Command(BaseCommand):
+    help = ("Move subscription history older than N months to compressed JSONL files "
+            "under HISTORY_ARCHIVE_ROOT (see subscriptions/archive.py)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=settings.HISTORY_ARCHIVE_AFTER_MONTHS,
+                            help="Keep this many months (plus the current one) in the database")
+        parser.add_argument('--dry-run', action='store_true', help="List the months that would be archived")
+
+    def handle(self, *args, **options):
+        if options['months'] < 1:
+            raise CommandError("--months must be at least 1")
+
+        cutoff = archive_cutoff(options['months'])
+        months = archivable_months(cutoff)
+        if not months:
+            self.stdout.write(f"No history before {cutoff}")
+            return
+        if options['dry_run']:
+            for month in months:
+                self.stdout.write(f"  would archive {month:%Y-%m}")
+            return
+
+        started = timezone.now()
+        began = time.perf_counter()
+        total = 0
+        for month in months:
+            result = archive_month(month)
+            if result:
+                path, entries, members = result
+                total += entries
+                self.stdout.write(f"  {month:%Y-%m}: {entries:,} entries for {members:,} members -> {path}")
+        pruned = prune_member_snapshots(started)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total:,} history entries before {cutoff} to {archive_root()} "
+            f"and pruned {pruned:,} member snapshots in {time.perf_counter() - began:.1f}s"
+        ))
@@ -0,0 +1,67 @@
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from management.models import User
+from subscriptions import benchmarks
+from subscriptions.management.commands.run_benchmarks import BENCH_USER_EMAIL
+
+
+class Command(BaseCommand):
+    help = ("Compare throughput of the sync endpoints under WSGI with their async variants under ASGI, "
+            "at many concurrent clients. Both servers must already be running against the same database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Subset of: {', '.join(benchmarks.CONCURRENCY_TARGETS)}")
+        parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help="Base URL of the WSGI server")
+        parser.add_argument('--asgi', default='http://127.0.0.1:8001', help="Base URL of the ASGI (uvicorn) server")
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per run")
+        parser.add_argument('--output', help="JSON file to write (default: benchmarks/concurrency-<timestamp>.json)")
+
+    def handle(self, *args, **options):
+        unknown = set(options['targets']) - set(benchmarks.CONCURRENCY_TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+        user, _ = User.objects.get_or_create(
+            email=BENCH_USER_EMAIL,
+            defaults={'username': 'benchmark', 'role': 'admin', 'is_staff': True},
+        )
+        token = str(AccessToken.for_user(user))
+
+        # Sync endpoints under both servers separate the server's effect from the view's
+        runs = [('wsgi', 'sync'), ('asgi', 'sync'), ('asgi', 'async')]
+        results = []
+        self.stdout.write(f"{'endpoint':<20}{'server':<8}{'view':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+        for name in options['targets'] or benchmarks.CONCURRENCY_TARGETS:
+            prepare, sync_path, async_path = benchmarks.CONCURRENCY_TARGETS[name]
+            params = prepare()
+            for server, view in runs:
+                url = options[server].rstrip('/') + (sync_path if view == 'sync' else async_path)
+                result = benchmarks.run_concurrent(
+                    url, token, clients=options['clients'], duration=options['duration'], params=params,
+                )
+                result.update(name=name, server=server, view=view)
+                results.append(result)
+                self.stdout.write(
+                    f"{name:<20}{server:<8}{view:<7}{result['rps']:>9.1f}{result['p50_ms'] or 0:>9.1f}"
+                    f"{result['p95_ms'] or 0:>9.1f}{result['errors']:>8}"
+                )
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"concurrency-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'clients': options['clients'],
+                'duration': options['duration'],
+                'results': results,
+            }, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
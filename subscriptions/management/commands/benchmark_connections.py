@@ -0,0 +1,53 @@
+import json
+import os
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from management.models import User
+from subscriptions import benchmarks
+from subscriptions.management.commands.run_benchmarks import BENCH_USER_EMAIL
+
+
+class Command(BaseCommand):
+    help = ("Compare the cost of a request and of a task when each opens a new database connection "
+            "(CONN_MAX_AGE=0) with reusing a persistent one. Run it against Postgres for real figures.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycles', type=int, default=200, help="Requests/tasks per run")
+        parser.add_argument('--max-age', type=int, default=60, help="CONN_MAX_AGE of the persistent run")
+        parser.add_argument('--output', help="JSON file to write (default: benchmarks/connections-<timestamp>.json)")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(
+            email=BENCH_USER_EMAIL,
+            defaults={'username': 'benchmark', 'role': 'admin', 'is_staff': True},
+        )
+        token = str(AccessToken.for_user(user))
+        results = benchmarks.run_connection_reuse(token, cycles=options['cycles'], max_age=options['max_age'])
+
+        self.stdout.write(f"{'lifecycle':<11}{'max age':>8}{'connects':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result['name']:<11}{result['conn_max_age']:>8}{result['connections_opened']:>10}"
+                f"{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+            )
+        by_run = {(result['name'], result['conn_max_age']): result for result in results}
+        for name in ('request', 'task'):
+            saving = by_run[name, 0]['mean_ms'] - by_run[name, options['max_age']]['mean_ms']
+            self.stdout.write(f"Saving per {name}: {saving:.3f} ms")
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"connections-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump({
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'results': results,
+            }, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
@@ -0,0 +1,70 @@
+import csv
+import time
+import uuid
+from collections import defaultdict
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from subscriptions.bulk import BULK_FIELDS, CHUNK_SIZE, bulk_update_subscriptions
+from subscriptions.models import Subscription
+
+STATUSES = {value for value, _label in Subscription.STATUS_CHOICES}
+
+
+def _parse(field, raw):
+    raw = raw.strip()
+    if field == 'status':
+        if raw not in STATUSES:
+            raise ValueError(f"unknown status {raw!r}")
+        return raw
+    if field in ('start_date', 'end_date'):
+        return date.fromisoformat(raw)
+    if raw.lower() in ('1', 'true', 'yes'):
+        return True
+    if raw.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"expected true/false, got {raw!r}")
+
+
+class Command(BaseCommand):
+    help = ("Apply subscription changes from a CSV file with an `id` column and any of "
+            f"{', '.join(sorted(BULK_FIELDS))}, recording history for every change")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import")
+        parser.add_argument('--note', default="Imported change", help="Note stored on the history entries")
+
+    def handle(self, *args, **options):
+        # Rows with the same changes are applied together
+        groups = defaultdict(list)
+        with open(options['path'], newline='') as f:
+            reader = csv.DictReader(f)
+            fields = [name for name in reader.fieldnames or [] if name != 'id']
+            if 'id' not in (reader.fieldnames or []) or not fields:
+                raise CommandError("The CSV needs an `id` column and at least one field to change")
+            unknown = set(fields) - BULK_FIELDS
+            if unknown:
+                raise CommandError(f"Unsupported columns: {', '.join(sorted(unknown))}")
+            for line, row in enumerate(reader, start=2):
+                try:
+                    subscription_id = uuid.UUID(row['id'].strip())
+                    changes = tuple((field, _parse(field, row[field])) for field in fields if row[field].strip())
+                except ValueError as e:
+                    raise CommandError(f"Line {line}: {e}")
+                if changes:
+                    groups[changes].append(subscription_id)
+
+        began = time.perf_counter()
+        requested = updated = 0
+        for changes, ids in groups.items():
+            requested += len(ids)
+            for i in range(0, len(ids), CHUNK_SIZE):
+                updated += bulk_update_subscriptions(
+                    Subscription.objects.filter(pk__in=ids[i:i + CHUNK_SIZE]), note=options['note'], **dict(changes),
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {updated:,} of {requested:,} subscriptions in {time.perf_counter() - began:.1f}s "
+            f"(the rest were unknown or already up to date)"
+        ))
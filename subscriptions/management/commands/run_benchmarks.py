@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from management.models import User
+from members.models import Member
+from subscriptions import benchmarks
+from subscriptions.models import Subscription, SubscriptionHistory
+
+BENCH_USER_EMAIL = 'benchmark@club7.local'
+
+
+class Command(BaseCommand):
+    help = "Time the main API endpoints and write latency/query counts to JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Subset of: {', '.join(benchmarks.TARGETS)}")
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--output', help="JSON file to write (default: benchmarks/<timestamp>.json)")
+        parser.add_argument('--compare', help="Previous results JSON to diff against")
+
+    def handle(self, *args, **options):
+        unknown = set(options['targets']) - set(benchmarks.TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+        user, _ = User.objects.get_or_create(
+            email=BENCH_USER_EMAIL,
+            defaults={'username': 'benchmark', 'role': 'admin', 'is_staff': True},
+        )
+        results = benchmarks.run(
+            user,
+            names=options['targets'] or None,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+        )
+
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': self._git_revision(),
+            'database': connection.vendor,
+            'rows': {
+                'members': Member.objects.count(),
+                'subscriptions': Subscription.objects.count(),
+                'history': SubscriptionHistory.objects.count(),
+            },
+            'results': results,
+        }
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as fh:
+                previous = {r['name']: r for r in json.load(fh)['results']}
+
+        self.stdout.write(f"{'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}  status")
+        for result in results:
+            line = (f"{result['name']:<22}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                    f"{result['queries']:>9}  {','.join(map(str, result['status_codes']))}")
+            before = previous.get(result['name'])
+            if before:
+                line += (f"  (p50 {result['p50_ms'] - before['p50_ms']:+.1f} ms, "
+                         f"queries {result['queries'] - before['queries']:+d})")
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def _git_revision(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+            ).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
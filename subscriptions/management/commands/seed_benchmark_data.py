@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from subscriptions import seeding
+
+
+class Command(BaseCommand):
+    help = "Bulk-insert production-scale synthetic members, plans, subscriptions and history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=100_000)
+        parser.add_argument('--subscriptions', type=int, default=500_000)
+        parser.add_argument('--history', type=int, default=2_000_000)
+        parser.add_argument('--batch-size', type=int, default=2_000,
+                            help="Members written per transaction")
+        parser.add_argument('--seed', type=int, default=7, help="Random seed for reproducible data")
+        parser.add_argument('--force', action='store_true',
+                            help="Allow running with DEBUG off")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to seed synthetic data with DEBUG off (use --force)")
+        if options['subscriptions'] and not options['members']:
+            raise CommandError("Subscriptions need at least one member")
+
+        start = time.perf_counter()
+        written = seeding.seed(
+            members=options['members'],
+            subscriptions=options['subscriptions'],
+            history=options['history'],
+            batch_size=options['batch_size'],
+            seed_value=options['seed'],
+            stdout=self.stdout,
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {written['members']:,} members, {written['subscriptions']:,} subscriptions and "
+            f"{written['history']:,} history rows in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0002_remove_subscriptionhistory_changed_by_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(editable=False, max_length=64, unique=True)),
+                ('data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Member Snapshot',
+            },
+        ),
+        migrations.AddField(
+            model_name='subscriptionhistory',
+            name='member_snapshot_ref',
+            field=models.ForeignKey(help_text='Snapshot of the member at this point', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='history', to='subscriptions.membersnapshot'),
+        ),
+        migrations.AlterField(
+            model_name='subscriptionhistory',
+            name='member_snapshot',
+            field=models.JSONField(help_text='Snapshot of the member at this point', null=True),
+        ),
+    ]
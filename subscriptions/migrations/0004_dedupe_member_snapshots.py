@@ -0,0 +1,76 @@
+"""
+Move every history entry's member_snapshot JSON into MemberSnapshot, storing
+each distinct snapshot once. Entries are processed in primary-key batches so
+memory stays flat on large tables.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations
+
+BATCH_SIZE = 2_000
+
+
+def snapshot_hash(data):
+    # Frozen copy of subscriptions.models.snapshot_hash as of this migration
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _batches(queryset):
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def dedupe_member_snapshots(apps, schema_editor):
+    SubscriptionHistory = apps.get_model('subscriptions', 'SubscriptionHistory')
+    MemberSnapshot = apps.get_model('subscriptions', 'MemberSnapshot')
+    db = schema_editor.connection.alias
+
+    stored = {}  # content hash -> MemberSnapshot id
+    entries = SubscriptionHistory.objects.using(db).only('pk', 'member_snapshot')
+    for batch in _batches(entries):
+        hashes = [snapshot_hash(entry.member_snapshot or {}) for entry in batch]
+        new = {}
+        for content_hash, entry in zip(hashes, batch):
+            if content_hash not in stored:
+                new.setdefault(content_hash, entry.member_snapshot or {})
+        MemberSnapshot.objects.using(db).bulk_create(
+            [MemberSnapshot(content_hash=content_hash, data=data) for content_hash, data in new.items()],
+            ignore_conflicts=True,
+        )
+        stored.update(MemberSnapshot.objects.using(db)
+                      .filter(content_hash__in=list(new))
+                      .values_list('content_hash', 'id'))
+
+        for content_hash, entry in zip(hashes, batch):
+            entry.member_snapshot_ref_id = stored[content_hash]
+        SubscriptionHistory.objects.using(db).bulk_update(batch, ['member_snapshot_ref'], batch_size=500)
+
+
+def restore_member_snapshots(apps, schema_editor):
+    SubscriptionHistory = apps.get_model('subscriptions', 'SubscriptionHistory')
+    db = schema_editor.connection.alias
+
+    entries = SubscriptionHistory.objects.using(db).select_related('member_snapshot_ref')
+    for batch in _batches(entries):
+        for entry in batch:
+            entry.member_snapshot = entry.member_snapshot_ref.data if entry.member_snapshot_ref_id else {}
+        SubscriptionHistory.objects.using(db).bulk_update(batch, ['member_snapshot'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0003_membersnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_member_snapshots, restore_member_snapshots),
+    ]
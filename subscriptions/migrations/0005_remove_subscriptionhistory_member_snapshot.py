@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0004_dedupe_member_snapshots'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='subscriptionhistory',
+            name='member_snapshot',
+        ),
+        migrations.AlterField(
+            model_name='subscriptionhistory',
+            name='member_snapshot_ref',
+            field=models.ForeignKey(help_text='Snapshot of the member at this point', on_delete=django.db.models.deletion.PROTECT, related_name='history', to='subscriptions.membersnapshot'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0005_remove_subscriptionhistory_member_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedHistorySegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('member_id', models.BigIntegerField()),
+                ('month', models.DateField()),
+                ('path', models.CharField(help_text='Archive file, relative to HISTORY_ARCHIVE_ROOT', max_length=255)),
+                ('offset', models.BigIntegerField(help_text='Byte offset of the gzip block in the file')),
+                ('length', models.PositiveIntegerField(help_text='Compressed size of the block in bytes')),
+                ('entries', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived History Segment',
+                'ordering': ['member_id', 'month'],
+                'indexes': [models.Index(fields=['member_id', 'month'], name='subscriptio_member__94832a_idx')],
+            },
+        ),
+    ]
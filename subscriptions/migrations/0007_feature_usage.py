@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0003_feature_alter_membershipplan_options_and_more'),
+        ('subscriptions', '0006_archivedhistorysegment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uses', models.PositiveIntegerField(default=0)),
+                ('flushed_at', models.DateTimeField(auto_now=True)),
+                ('feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='plans.feature')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_usage', to='subscriptions.subscription')),
+            ],
+            options={
+                'verbose_name': 'Feature Usage',
+                'unique_together': {('subscription', 'feature')},
+            },
+        ),
+    ]
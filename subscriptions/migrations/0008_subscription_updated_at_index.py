@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscriptions', '0007_feature_usage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['updated_at', 'id'], name='subscriptio_updated_2f5a81_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.utils.timezone import now, timedelta
+import hashlib
+import json
 import uuid
 
 class Subscription(models.Model):
@@ -53,19 +56,64 @@ class Subscription(models.Model):
             subscription=self,
             old_plan=self.plan,
             new_plan=new_plan,
-            changed_by=changed_by
         )
 
         # Update plan (keep start/end unchanged)
         self.plan = new_plan
         self.save()
 
+    # --- Change tracking ---
+    # Field values as loaded from (or last written to) the database, keyed by
+    # attname, so the pre_save history signal can compare against them
+    # without re-reading the row.
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _remember_loaded_values(self, attnames=None):
+        current = self.__dict__
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if (attnames is None or field.attname in attnames) and field.attname in current:
+                loaded[field.attname] = current[field.attname]
+        self._loaded_values = loaded
+
+    def loaded_state(self):
+        """
+        A copy of this subscription as it was loaded from the database, or
+        None if this instance was not loaded from it. Fields that were not
+        loaded (only()/defer()) stay deferred on the copy, rather than taking
+        their defaults; see get_deferred_fields(). Relations that have not
+        changed reuse the objects already cached on this instance, so reading
+        them costs no query.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        attnames = [field.attname for field in self._meta.concrete_fields if field.attname in loaded]
+        old = Subscription.from_db(self._state.db, attnames, [loaded[attname] for attname in attnames])
+        for field in self._meta.concrete_fields:
+            if (field.is_relation and field.attname in loaded and field.is_cached(self)
+                    and loaded[field.attname] == getattr(self, field.attname)):
+                field.set_cached_value(old, field.get_cached_value(self))
+        return old
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember_loaded_values({self._meta.get_field(name).attname for name in fields} if fields else None)
+
     def save(self, *args, **kwargs):
         # Calculate end_date from plan only on first save
         if not self.end_date and self.plan and self.start_date:
             self.end_date = self.start_date + timedelta(days=self.plan.duration_days)
 
         super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._remember_loaded_values(
+            {self._meta.get_field(name).attname for name in update_fields} if update_fields is not None else None
+        )
 
     def __str__(self):
         return f"{self.member.full_name} - {self.plan.name} ({self.status})"
@@ -74,6 +122,10 @@ class Subscription(models.Model):
         ordering = ['-start_date']
         verbose_name = 'Subscription'
         verbose_name_plural = 'Subscriptions'
+        indexes = [
+            # Incremental sync (sync/changes.py)
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
 
 class SubscriptionPlanChangeLog(models.Model):
@@ -90,19 +142,165 @@ class SubscriptionPlanChangeLog(models.Model):
         verbose_name = 'Subscription Plan Change Log'
 
 
+def snapshot_hash(data):
+    """SHA-256 of the snapshot's canonical JSON (sorted keys, no whitespace)"""
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class MemberSnapshot(models.Model):
+    """
+    A member's details as recorded in subscription history. A member's
+    details rarely change between history entries, so each distinct
+    snapshot is stored once, keyed by the hash of its content.
+    """
+    UPSERT_BATCH = 500
+
+    content_hash = models.CharField(max_length=64, unique=True, editable=False)
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def _stored(cls, hashes):
+        hashes = list(hashes)
+        # Locked until the caller's transaction ends, so that
+        # prune_member_snapshots() (subscriptions/archive.py) skips a snapshot
+        # between intern() and the insert of the history entry pointing at it
+        stored = cls.objects.select_for_update(no_key=True)
+        return {
+            snapshot.content_hash: snapshot
+            for i in range(0, len(hashes), cls.UPSERT_BATCH)
+            for snapshot in stored.filter(content_hash__in=hashes[i:i + cls.UPSERT_BATCH])
+        }
+
+    @classmethod
+    @transaction.atomic(savepoint=False)
+    def _upsert(cls, snapshots):
+        """{content_hash: stored snapshot} for {content_hash: data}, inserting the new ones."""
+        stored = cls._stored(snapshots)
+        missing = [cls(content_hash=content_hash, data=data)
+                   for content_hash, data in snapshots.items() if content_hash not in stored]
+        # Only the new snapshots are upserted, so stored rows are never
+        # rewritten. ON CONFLICT DO UPDATE (rather than DO NOTHING) still
+        # returns the id of a row a concurrent writer inserted meanwhile
+        stored.update(
+            (snapshot.content_hash, snapshot) for snapshot in cls.objects.bulk_create(
+                missing, update_conflicts=True, unique_fields=['content_hash'], update_fields=['data'],
+                batch_size=cls.UPSERT_BATCH,
+            )
+        )
+        return stored
+
+    @classmethod
+    def intern(cls, data):
+        """
+        The stored snapshot with this content, created if it is new. Reference
+        it in the same transaction, while it is locked.
+        """
+        content_hash = snapshot_hash(data)
+        return cls._upsert({content_hash: data})[content_hash]
+
+    @classmethod
+    def intern_many(cls, snapshots):
+        """Bulk version of intern(): one stored snapshot per input, in order."""
+        hashes = [snapshot_hash(data) for data in snapshots]
+        stored = cls._upsert(dict(zip(hashes, snapshots)))
+        return [stored[content_hash] for content_hash in hashes]
+
+    def __str__(self):
+        return f"{self.data.get('full_name', 'Member')} ({self.content_hash[:12]})"
+
+    class Meta:
+        verbose_name = 'Member Snapshot'
+
+
 class SubscriptionHistory(models.Model):
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='history')
     snapshot = models.JSONField(help_text="Snapshot of the subscription at this point")
-    member_snapshot = models.JSONField(help_text="Snapshot of the member at this point")
+    member_snapshot_ref = models.ForeignKey(MemberSnapshot, on_delete=models.PROTECT, related_name='history',
+                                            help_text="Snapshot of the member at this point")
     note = models.TextField(blank=True, help_text="Optional context (e.g., 'plan changed during grace')")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Set through the member_snapshot property until the entry is saved
+    _pending_member_snapshot = None
 
+    @property
+    def member_snapshot(self):
+        if self._pending_member_snapshot is not None:
+            return self._pending_member_snapshot
+        return self.member_snapshot_ref.data if self.member_snapshot_ref_id else None
+
+    @member_snapshot.setter
+    def member_snapshot(self, data):
+        self._pending_member_snapshot = data
+
+    @classmethod
+    def resolve_member_snapshots(cls, entries):
+        """
+        Point unsaved entries at their stored member snapshots in bulk. Call
+        before bulk_create(), which bypasses save(), in the same transaction.
+        """
+        pending = [entry for entry in entries if entry._pending_member_snapshot is not None]
+        stored = MemberSnapshot.intern_many([entry._pending_member_snapshot for entry in pending])
+        for entry, snapshot in zip(pending, stored):
+            entry.member_snapshot_ref = snapshot
+            entry._pending_member_snapshot = None
+        return entries
+
+    @transaction.atomic(savepoint=False)
+    def save(self, *args, **kwargs):
+        if self._pending_member_snapshot is not None:
+            self.member_snapshot_ref = MemberSnapshot.intern(self._pending_member_snapshot)
+            self._pending_member_snapshot = None
+        super().save(*args, **kwargs)
 
-    
     def __str__(self):
         return f"History: {self.subscription.member.full_name} on {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Subscription History'
+
+
+class ArchivedHistorySegment(models.Model):
+    """
+    Where one member's archived history entries for one month are stored: a
+    compressed block inside an archive file (see subscriptions/archive.py).
+    """
+    # A plain id rather than a foreign key: the archive outlives the member
+    member_id = models.BigIntegerField()
+    month = models.DateField()
+    path = models.CharField(max_length=255, help_text="Archive file, relative to HISTORY_ARCHIVE_ROOT")
+    offset = models.BigIntegerField(help_text="Byte offset of the gzip block in the file")
+    length = models.PositiveIntegerField(help_text="Compressed size of the block in bytes")
+    entries = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived history: member {self.member_id}, {self.month:%Y-%m}"
+
+    class Meta:
+        ordering = ['member_id', 'month']
+        indexes = [models.Index(fields=['member_id', 'month'])]
+        verbose_name = 'Archived History Segment'
+
+
+class FeatureUsage(models.Model):
+    """
+    How many times a subscription has used a metered plan feature. Uses are
+    counted in Redis and copied here by the flush task (see
+    subscriptions/usage.py), so this row can trail the live count by up to
+    one flush interval.
+    """
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='feature_usage')
+    feature = models.ForeignKey('plans.Feature', on_delete=models.CASCADE, related_name='usage')
+    uses = models.PositiveIntegerField(default=0)
+    flushed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.subscription_id} - {self.feature_id}: {self.uses} uses"
+
+    class Meta:
+        unique_together = ['subscription', 'feature']
+        verbose_name = 'Feature Usage'
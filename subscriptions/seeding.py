@@ -0,0 +1,285 @@
+"""
+Synthetic data for reproducing production-scale performance locally.
+
+Everything is written with bulk_create in member-sized chunks, so signals
+(welcome WhatsApp, history snapshots) do not fire and memory stays flat no
+matter how many rows are requested. Used by the ``seed_benchmark_data``
+command and by the query-budget tests.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from members.models import Member
+from members.search import build_search_key
+from plans.models import Feature, MembershipPlan, PlanFeature
+from subscriptions.models import MemberSnapshot, Subscription, SubscriptionHistory
+
+FEATURES = [
+    ('Gym Floor', 'facility', 0),
+    ('Sauna', 'facility', 150),
+    ('Steam Room', 'facility', 150),
+    ('Yoga Class', 'class', 200),
+    ('Zumba Class', 'class', 200),
+    ('CrossFit Class', 'class', 300),
+    ('Personal Training Session', 'service', 800),
+    ('Diet Consultation', 'service', 500),
+]
+
+# name, plan_type, duration_days, price, {feature name: allowed uses (0 = unlimited)}
+PLANS = [
+    ('Monthly Basic', 'basic', 30, '1200.00', {'Gym Floor': 0}),
+    ('Quarterly Basic', 'basic', 90, '3300.00', {'Gym Floor': 0}),
+    ('Half-Yearly Basic', 'basic', 180, '6000.00', {'Gym Floor': 0, 'Sauna': 6}),
+    ('Annual Basic', 'basic', 365, '10000.00', {'Gym Floor': 0, 'Sauna': 12}),
+    ('Monthly Premium', 'premium', 30, '2500.00', {'Gym Floor': 0, 'Sauna': 4, 'Steam Room': 4, 'Yoga Class': 8}),
+    ('Annual Premium', 'premium', 365, '22000.00', {'Gym Floor': 0, 'Sauna': 0, 'Steam Room': 0, 'Yoga Class': 0, 'Zumba Class': 0}),
+    ('PT Monthly', 'personal_training', 30, '6000.00', {'Gym Floor': 0, 'Personal Training Session': 12, 'Diet Consultation': 1}),
+    ('Combo Quarterly', 'combo', 90, '9000.00', {'Gym Floor': 0, 'CrossFit Class': 24, 'Personal Training Session': 12, 'Diet Consultation': 3}),
+]
+
+FIRST_NAMES = ['Arjun', 'Anjali', 'Rahul', 'Fathima', 'Vishnu', 'Sneha', 'Akhil', 'Aparna', 'Nikhil', 'Divya',
+               'Muhammed', 'Athira', 'Sreejith', 'Neha', 'Abhijith', 'Lakshmi', 'Jithin', 'Reshma', 'Amal', 'Keerthana']
+LAST_NAMES = ['Nair', 'Menon', 'Pillai', 'Varghese', 'Thomas', 'Kurian', 'Rahman', 'Krishnan', 'Joseph', 'Das']
+CITIES = [('Sulthan Bathery', 'Wayanad'), ('Kalpetta', 'Wayanad'), ('Mananthavady', 'Wayanad'),
+          ('Kozhikode', 'Kozhikode'), ('Kannur', 'Kannur')]
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """
+    Let bulk_create keep the created_at/updated_at values we generate instead
+    of stamping every row with "now" (auto_now / auto_now_add).
+    """
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _aware(day, rng):
+    return timezone.make_aware(datetime.combine(day, time(rng.randint(6, 21), rng.randint(0, 59))))
+
+
+def seed_catalog():
+    """Create the feature and plan catalog (idempotent by name)."""
+    features = {}
+    for name, feature_type, price in FEATURES:
+        features[name], _ = Feature.objects.get_or_create(
+            name=name,
+            defaults={'feature_type': feature_type, 'price_per_session': Decimal(price)},
+        )
+
+    plans = []
+    for name, plan_type, duration, price, allowances in PLANS:
+        plan, created = MembershipPlan.objects.get_or_create(
+            name=name,
+            defaults={
+                'plan_type': plan_type,
+                'duration_days': duration,
+                'price': Decimal(price),
+                'includes_personal_training': plan_type in ('personal_training', 'combo'),
+            },
+        )
+        if created:
+            PlanFeature.objects.bulk_create([
+                PlanFeature(
+                    plan=plan,
+                    feature=features[feature_name],
+                    allowed_uses=uses,
+                    is_unlimited=uses == 0,
+                )
+                for feature_name, uses in allowances.items()
+            ])
+        plans.append(plan)
+    return plans
+
+
+def _member_snapshot(member):
+    return {
+        "full_name": member.full_name,
+        "email": member.email,
+        "phone_number": member.phone_number,
+        "alternate_phone": member.alternate_phone,
+        "dob": str(member.dob),
+        "gender": member.get_gender_display(),
+        "marital_status": member.marital_status,
+        "occupation": member.occupation,
+        "profession": member.profession,
+        "referral_source": member.referral_source,
+        "firm_name": member.firm_name,
+        "area_or_locality": member.area_or_locality,
+        "address": {
+            "line1": member.address_line_1,
+            "line2": member.address_line_2,
+            "city": member.city,
+            "district": member.district,
+            "state": member.state,
+            "pin_code": member.pin_code,
+        },
+        "height_cm": member.height_cm,
+        "weight_kg": member.weight_kg,
+        "bmi": member.bmi,
+        "biometric_id": member.biometric_id,
+        "profile_photo": None,
+        "join_date": str(member.join_date),
+        "is_active": member.is_active,
+    }
+
+
+def _subscription_snapshot(subscription, plan, status):
+    return {
+        "subscription_id": str(subscription.id),
+        "member_id": subscription.member_id,
+        "plan_id": str(plan.id),
+        "plan_name": plan.name,
+        "plan_price": float(plan.price),
+        "plan_duration_days": plan.duration_days,
+        "start_date": str(subscription.start_date),
+        "end_date": str(subscription.end_date),
+        "status": status,
+        "is_renewal": subscription.is_renewal,
+        "signed_by_member": subscription.signed_by_member,
+        "created_at": str(subscription.created_at),
+        "updated_at": str(subscription.updated_at),
+    }
+
+
+def _spread(total, buckets, rng):
+    """Split ``total`` into ``buckets`` non-negative integers with roughly equal mean."""
+    if buckets <= 0:
+        return []
+    base, extra = divmod(total, buckets)
+    counts = [base] * buckets
+    for i in rng.sample(range(buckets), extra):
+        counts[i] += 1
+    # Shuffle some weight around so members don't all look identical
+    for _ in range(buckets // 3):
+        a, b = rng.randrange(buckets), rng.randrange(buckets)
+        if counts[a] > 1:
+            counts[a] -= 1
+            counts[b] += 1
+    return counts
+
+
+def seed(members=100_000, subscriptions=500_000, history=2_000_000, batch_size=2_000,
+         seed_value=7, today=None, stdout=None):
+    """
+    Insert ``members`` members with ``subscriptions`` subscriptions between
+    them and ``history`` history rows spread over those subscriptions.
+    Returns a dict of the row counts written.
+    """
+    rng = random.Random(seed_value)
+    today = today or date.today()
+    plans = seed_catalog()
+
+    last = Member.objects.order_by('-id').values_list('biometric_id', flat=True).first()
+    next_biometric = (int(last) if last and last.isdigit() else 0) + 1
+
+    subs_per_member = _spread(subscriptions, members, rng)
+    history_per_sub = _spread(history, subscriptions, rng)
+    history_cursor = 0
+    written = {'members': 0, 'subscriptions': 0, 'history': 0}
+
+    for chunk_start in range(0, members, batch_size):
+        chunk_size = min(batch_size, members - chunk_start)
+        with transaction.atomic(), historical_timestamps(Member, Subscription, SubscriptionHistory):
+            member_objs = []
+            for offset in range(chunk_size):
+                n = next_biometric + chunk_start + offset
+                city, district = rng.choice(CITIES)
+                join_date = today - timedelta(days=rng.randint(0, 3 * 365))
+                created = _aware(join_date, rng)
+                member_objs.append(Member(
+                    full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                    email=f"member{n}@example.com",
+                    phone_number=f"9{n:09d}",
+                    gender=rng.choice('MFO'),
+                    dob=date(rng.randint(1965, 2007), rng.randint(1, 12), rng.randint(1, 28)),
+                    address_line_1=f"{rng.randint(1, 400)}, Main Road",
+                    city=city,
+                    district=district,
+                    state='Kerala',
+                    pin_code=f"67{rng.randint(3000, 3999)}",
+                    height_cm=rng.randint(150, 190),
+                    weight_kg=rng.randint(45, 110),
+                    biometric_id=f"{n:04d}",
+                    join_date=join_date,
+                    created_at=created,
+                    updated_at=created,
+                    is_active=rng.random() > 0.03,
+                ))
+            for member in member_objs:
+                member.search_key = build_search_key(member)
+            member_objs = Member.objects.bulk_create(member_objs)
+
+            sub_objs, history_objs = [], []
+            # One stored snapshot per member, shared by all of their history rows
+            snapshots = MemberSnapshot.intern_many([_member_snapshot(member) for member in member_objs]) if history else []
+            for member_index, member in enumerate(member_objs):
+                count = subs_per_member[chunk_start + member_index]
+                member_snapshot = snapshots[member_index] if snapshots else None
+                start = member.join_date
+                for i in range(count):
+                    plan = rng.choice(plans)
+                    end = start + timedelta(days=plan.duration_days)
+                    if end < today:
+                        status = 'expired'
+                    elif start > today:
+                        status = 'pending'
+                    else:
+                        status = 'active' if i == count - 1 else 'expired'
+                    if status == 'active' and rng.random() < 0.02:
+                        status = 'cancelled'
+                    created = _aware(start, rng)
+                    sub = Subscription(
+                        id=uuid.uuid4(),
+                        member_id=member.id,
+                        plan_id=plan.id,
+                        start_date=start,
+                        end_date=end,
+                        status=status,
+                        is_renewal=i > 0,
+                        signed_by_member=True,
+                        created_at=created,
+                        updated_at=created,
+                    )
+                    sub_objs.append(sub)
+
+                    for h in range(history_per_sub[history_cursor]):
+                        step_status = 'active' if h < history_per_sub[history_cursor] - 1 else status
+                        history_objs.append(SubscriptionHistory(
+                            subscription_id=sub.id,
+                            snapshot=_subscription_snapshot(sub, plan, step_status),
+                            member_snapshot_ref=member_snapshot,
+                            note="Subscription created" if h == 0 else "Subscription updated",
+                            created_at=created + timedelta(days=h * max(plan.duration_days // 4, 1)),
+                        ))
+                    history_cursor += 1
+                    # Renewals usually follow on, sometimes after a lapse
+                    start = end + timedelta(days=rng.choice((0, 0, 0, 3, 15, 45)))
+
+            Subscription.objects.bulk_create(sub_objs, batch_size=batch_size)
+            SubscriptionHistory.objects.bulk_create(history_objs, batch_size=batch_size)
+
+        written['members'] += len(member_objs)
+        written['subscriptions'] += len(sub_objs)
+        written['history'] += len(history_objs)
+        if stdout is not None:
+            stdout.write(
+                f"  {written['members']:,} members, {written['subscriptions']:,} subscriptions, "
+                f"{written['history']:,} history rows"
+            )
+    return written
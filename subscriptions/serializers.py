@@ -6,6 +6,7 @@ from members.models import Member
 from plans.models import MembershipPlan
 from members.serializers import MemberSerializer
 from plans.serializers import MembershipPlanSerializer
+from gymcrm.sparse import SparseFieldsSerializerMixin
 import datetime
 
 class DateFromDateTimeField(serializers.DateField):
@@ -18,9 +19,12 @@ class DateFromDateTimeField(serializers.DateField):
             value = value.split('T')[0]
         return super().to_internal_value(value)
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     member = MemberSerializer(read_only=True)
     plan = MembershipPlanSerializer(read_only=True)
+    # Writes name the member and plan by id; reads nest them
+    member_id = serializers.PrimaryKeyRelatedField(source='member', queryset=Member.objects.all(), write_only=True)
+    plan_id = serializers.PrimaryKeyRelatedField(source='plan', queryset=MembershipPlan.objects.all(), write_only=True)
     grace_period_days = serializers.ReadOnlyField()
     is_in_grace_period = serializers.ReadOnlyField()
     can_change_plan = serializers.ReadOnlyField()
@@ -30,11 +34,18 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = [
-            'id', 'member', 'plan', 'start_date', 'end_date', 
+            'id', 'member', 'plan', 'member_id', 'plan_id', 'start_date', 'end_date', 
             'status', 'is_renewal', 'signed_by_member', 'signature_file',
             'member_snapshot', 'created_at', 'updated_at',
             'grace_period_days', 'is_in_grace_period', 'can_change_plan'
         ]
+        # ?fields= / ?expand= (see gymcrm/sparse.py)
+        expandable_fields = {'member': MemberSerializer, 'plan': MembershipPlanSerializer}
+        field_sources = {
+            'grace_period_days': ['plan__duration_days'],
+            'is_in_grace_period': ['start_date', 'plan__duration_days'],
+            'can_change_plan': ['status', 'start_date', 'plan__duration_days'],
+        }
 
 
 class EnrollSubscriptionSerializer(serializers.Serializer):
@@ -133,17 +144,14 @@ class PlanChangeSerializer(serializers.Serializer):
 
 
 class SubscriptionHistorySerializer(serializers.ModelSerializer):
-    changed_by_username = serializers.SerializerMethodField()
-    
+    member_snapshot = serializers.JSONField(read_only=True)
+
     class Meta:
         model = SubscriptionHistory
         fields = [
-            'id', 'subscription', 'snapshot', 'member_snapshot', 
-            'note', 'created_at', 'changed_by', 'changed_by_username'
+            'id', 'subscription', 'snapshot', 'member_snapshot',
+            'note', 'created_at',
         ]
-    
-    def get_changed_by_username(self, obj):
-        return obj.changed_by.username if obj.changed_by else None
 
 
 class SubscriptionListSerializer(serializers.ModelSerializer):
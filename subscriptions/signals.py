@@ -1,6 +1,11 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from subscriptions.models import Subscription, SubscriptionHistory, SubscriptionPlanChangeLog
+from gymcrm.live import publish_on_commit
+from members.cards import invalidate_member_cards
+from members.summary import invalidate_membership_summary
+from subscriptions.usage import invalidate_allowances
 from django.utils import timezone
 from datetime import timedelta
 
@@ -42,8 +47,8 @@ def get_member_snapshot(member):
 def get_subscription_snapshot(subscription: Subscription):
     return {
         "subscription_id": str(subscription.id),
-        "member_id": subscription.member.id,
-        "plan_id": subscription.plan.id,
+        "member_id": subscription.member_id,
+        "plan_id": str(subscription.plan.id),
         "plan_name": subscription.plan.name,
         "plan_price": float(subscription.plan.price),
         "plan_duration_days": subscription.plan.duration_days,
@@ -59,21 +64,28 @@ def get_subscription_snapshot(subscription: Subscription):
 
 @receiver(pre_save, sender=Subscription)
 def snapshot_before_subscription_update(sender, instance, **kwargs):
-    if not instance.pk:
-        return  # Skip new subscriptions (handled by post_save above)
-
-    try:
-        old = Subscription.objects.get(pk=instance.pk)
-    except Subscription.DoesNotExist:
-        return
-
-    plan_changed = old.plan != instance.plan
-    status_changed = old.status != instance.status
-    other_changes = (
-        old.start_date != instance.start_date or
-        old.end_date != instance.end_date or
-        old.is_renewal != instance.is_renewal
-    )
+    if instance._state.adding:
+        return  # Skip new subscriptions (handled by post_save below)
+
+    # Compare against the values the instance was loaded with; only fall back
+    # to reading the row for instances that were not loaded from the database
+    old = instance.loaded_state()
+    if old is None:
+        try:
+            old = Subscription.objects.get(pk=instance.pk)
+        except Subscription.DoesNotExist:
+            return
+
+    # Fields the instance was loaded without (only()/defer()) have no old
+    # value to compare against
+    deferred = old.get_deferred_fields()
+
+    def changed(attname):
+        return attname not in deferred and getattr(old, attname) != getattr(instance, attname)
+
+    plan_changed = changed('plan_id')
+    status_changed = changed('status')
+    other_changes = changed('start_date') or changed('end_date') or changed('is_renewal')
 
     if plan_changed or status_changed or other_changes:
         note = ""
@@ -86,7 +98,6 @@ def snapshot_before_subscription_update(sender, instance, **kwargs):
                     subscription=old,
                     old_plan=old.plan,
                     new_plan=instance.plan,
-                    changed_by=None
                 )
         SubscriptionHistory.objects.create(
             subscription=old,
@@ -104,3 +115,30 @@ def snapshot_on_subscription_create(sender, instance, created, **kwargs):
             member_snapshot=get_member_snapshot(instance.member),
             note="Subscription created"
         )
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_summary_on_subscription_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_membership_summary)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_member_card_on_subscription_change(sender, instance, **kwargs):
+    member_id = instance.member_id
+    transaction.on_commit(lambda: invalidate_member_cards([member_id]))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_feature_allowances_on_subscription_change(sender, instance, **kwargs):
+    subscription_id = instance.pk
+    transaction.on_commit(lambda: invalidate_allowances([subscription_id]))
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def publish_subscription_change(sender, instance, **kwargs):
+    # Registered after the cache invalidation above, so streams read fresh cards
+    publish_on_commit(changed=[instance.member_id])
@@ -5,7 +5,7 @@ from members.models import Member
 from plans.models import MembershipPlan
 import logging
 from django.utils import timezone
-from django.db import connection, transaction
+from django.db import transaction
 from django.core.exceptions import ObjectDoesNotExist
 from django.conf import settings
 from twilio.rest import Client
@@ -21,6 +21,9 @@ import os
 from decimal import Decimal
 from urllib.parse import urljoin
 import io
+from gymcrm.task_metrics import timed
+from .bulk import bulk_update_subscriptions
+from . import usage
 
 logger = logging.getLogger(__name__)
 
@@ -45,11 +48,11 @@ def send_whatsapp_message(to, message, media_url=None):
     """Send WhatsApp message using Twilio API with optional media attachment"""
     try:
         formatted_phone = format_indian_phone_number(to)
-        logger.info(f"[WhatsApp] Sending message to: whatsapp:{formatted_phone}")
-        logger.info(f"[WhatsApp] Message preview: {message[:60]}...")
+        logger.info("[WhatsApp] Sending message to: whatsapp:%s", formatted_phone)
+        logger.debug("[WhatsApp] Message preview: %.60s...", message)
         
         if media_url:
-            logger.info(f"[WhatsApp] Attaching media: {media_url}")
+            logger.info("[WhatsApp] Attaching media: %s", media_url)
 
         client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
         
@@ -67,17 +70,18 @@ def send_whatsapp_message(to, message, media_url=None):
         if media_url:
             message_params['media_url'] = [media_url]
 
-        msg = client.messages.create(**message_params)
+        with timed('twilio_send_message'):
+            msg = client.messages.create(**message_params)
         
-        logger.info(f"[WhatsApp] Message sent successfully. SID: {msg.sid}")
+        logger.info("[WhatsApp] Message sent successfully. SID: %s", msg.sid)
         return msg.sid
 
     except TwilioRestException as e:
-        logger.error(f"[WhatsApp] Twilio error: {e}")
+        logger.error("[WhatsApp] Twilio error: %s", e)
         raise
 
     except Exception as e:
-        logger.error(f"[WhatsApp] Unexpected error: {e}")
+        logger.error("[WhatsApp] Unexpected error: %s", e)
         raise
 
 
@@ -121,22 +125,23 @@ def generate_subscription_pdf(subscription):
             'qr_code_data': f"SUB-{subscription.id}",  # For QR code if needed
         }
         
-        # Render HTML template
-        html_string = render_to_string('subscriptions/subscription_receipt.html', context)
-        
-        # Create a BytesIO buffer to receive PDF data
-        pdf_buffer = io.BytesIO()
-        
-        # Convert HTML to PDF using xhtml2pdf
-        pisa_status = pisa.CreatePDF(
-            html_string,
-            dest=pdf_buffer,
-            encoding='UTF-8'
-        )
+        with timed('generate_subscription_pdf'):
+            # Render HTML template
+            html_string = render_to_string('subscriptions/subscription_receipt.html', context)
+            
+            # Create a BytesIO buffer to receive PDF data
+            pdf_buffer = io.BytesIO()
+            
+            # Convert HTML to PDF using xhtml2pdf
+            pisa_status = pisa.CreatePDF(
+                html_string,
+                dest=pdf_buffer,
+                encoding='UTF-8'
+            )
         
         # Check if PDF generation was successful
         if pisa_status.err:
-            logger.error(f"PDF generation failed with errors: {pisa_status.err}")
+            logger.error("PDF generation failed with errors: %s", pisa_status.err)
             raise Exception("PDF generation failed")
         
         # Get PDF data
@@ -151,15 +156,15 @@ def generate_subscription_pdf(subscription):
         pdf_file = ContentFile(pdf_data, name=pdf_filename)
         saved_path = default_storage.save(pdf_path, pdf_file)
         
-        logger.info(f"PDF generated successfully: {saved_path}")
+        logger.info("PDF generated successfully: %s", saved_path)
         return saved_path
         
     except Exception as e:
-        logger.error(f"Error generating PDF: {e}")
+        logger.error("Error generating PDF: %s", e)
         raise
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_membership_enrolled_message(self, member_id, subscription_id):
     """
     Send WhatsApp message when a member enrolls in a membership plan
@@ -168,8 +173,6 @@ def send_membership_enrolled_message(self, member_id, subscription_id):
     logger.info(f"[Task {task_id}] Starting membership enrollment message task")
     
     try:
-        # Close any existing database connections to avoid issues
-        connection.close()
         time.sleep(1)
         
         with transaction.atomic():
@@ -314,7 +317,7 @@ Thank you for choosing us! 💪"""
     return message
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_membership_expiry_reminder(self, member_id, subscription_id, days_until_expiry):
     """
     Send WhatsApp reminder when membership is about to expire
@@ -323,7 +326,6 @@ def send_membership_expiry_reminder(self, member_id, subscription_id, days_until
     logger.info(f"[Task {task_id}] Starting expiry reminder task")
     
     try:
-        connection.close()
         time.sleep(1)
         
         with transaction.atomic():
@@ -405,7 +407,7 @@ Thank you! 🏋️‍♂️"""
     return message
 
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, ignore_result=True)
 def send_plan_change_notification(self, member_id, subscription_id, old_plan_name, new_plan_name):
     """
     Send WhatsApp notification when member changes their plan
@@ -414,7 +416,6 @@ def send_plan_change_notification(self, member_id, subscription_id, old_plan_nam
     logger.info(f"[Task {task_id}] Starting plan change notification task")
     
     try:
-        connection.close()
         time.sleep(1)
         
         with transaction.atomic():
@@ -486,4 +487,23 @@ Thank you! 🏋️‍♂️"""
             return {
                 'status': 'failed',
                 'message': f'Error after {self.max_retries} retries: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+@shared_task(ignore_result=True)
+def expire_lapsed_subscriptions():
+    """
+    Nightly: mark active subscriptions whose end date has passed as expired,
+    recording a history entry for each.
+    """
+    lapsed = Subscription.objects.filter(status='active', end_date__lt=timezone.now().date())
+    expired = bulk_update_subscriptions(lapsed, note="Subscription expired", status='expired')
+    logger.info("Expired %s lapsed subscriptions", expired)
+    return expired
+
+
+@shared_task(ignore_result=True)
+def flush_feature_usage():
+    """Every minute: copy the Redis feature-usage counters into FeatureUsage."""
+    flushed = usage.flush_feature_usage()
+    logger.info("Flushed %s feature usage counters", flushed)
+    return flushed
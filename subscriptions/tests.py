@@ -1,3 +1,704 @@
-from django.test import TestCase
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from gymcrm.redis_client import get_redis
+from gymcrm.testing import QueryBudgetTestCase, add_edge_cases
+from management.models import User
+from members.models import Member
+from plans.models import Feature, MembershipPlan, PlanFeature
+from subscriptions import archive, seeding, usage
+from subscriptions.bulk import bulk_update_subscriptions
+from subscriptions.models import (
+    ArchivedHistorySegment, FeatureUsage, MemberSnapshot, Subscription, SubscriptionHistory,
+)
+from subscriptions.serializers import SubscriptionHistorySerializer
+from subscriptions.tasks import expire_lapsed_subscriptions
+
+
+def _subscription(**filters):
+    return Subscription.objects.filter(**filters).select_related('member').order_by('created_at').first()
+
+
+def _member_without_active_subscription():
+    return Member.objects.exclude(subscriptions__status='active').order_by('id').first()
+
+
+def _plan(**filters):
+    return MembershipPlan.objects.filter(**filters).order_by('price').first()
+
+
+class SubscriptionEndpointQueryBudgetTests(QueryBudgetTestCase):
+    def test_list(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/'))
+
+    def test_retrieve(self):
+        def prepare():
+            subscription = _subscription()
+            return lambda: self.client.get(f'/api/subscriptions/{subscription.id}/')
+        # One for the ETag's updated_at values
+        self.assertQueryBudget(4, prepare)
+
+    def _write_payload(self, subscription, **changes):
+        return {
+            'member_id': subscription.member_id, 'plan_id': str(subscription.plan_id),
+            'start_date': str(subscription.start_date), 'end_date': str(subscription.end_date),
+            'status': subscription.status, **changes,
+        }
+
+    def test_create(self):
+        def prepare():
+            payload = self._write_payload(_subscription(), status='pending')
+            return lambda: self.client.post('/api/subscriptions/', payload, format='json')
+        self.assertQueryBudget(7, prepare, status_codes=(201,))
+
+    def test_update(self):
+        def prepare():
+            subscription = _subscription()
+            payload = self._write_payload(subscription, is_renewal=True)
+            return lambda: self.client.put(f'/api/subscriptions/{subscription.id}/', payload, format='json')
+        # The change is recorded in the history, storing a member snapshot
+        # when no identical one exists yet
+        self.assertQueryBudget(10, prepare)
+
+    def test_partial_update(self):
+        def prepare():
+            subscription = _subscription()
+            return lambda: self.client.patch(
+                f'/api/subscriptions/{subscription.id}/', {'signed_by_member': True}, format='json',
+            )
+        self.assertQueryBudget(4, prepare)
+
+    def test_destroy(self):
+        def prepare():
+            subscription = _subscription()
+            return lambda: self.client.delete(f'/api/subscriptions/{subscription.id}/')
+        self.assertQueryBudget(8, prepare, status_codes=(204,))
+
+    def test_sync(self):
+        # Rows with member and plan, plan features, tombstones
+        self.assertQueryBudget(4, lambda: lambda: self.client.get('/api/subscriptions/sync/'))
+
+    def test_list_sparse(self):
+        query = {'fields': 'id,status,member.full_name', 'expand': 'plan'}
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/', query))
+        self.assertQueryBudget(1, lambda: lambda: self.client.get('/api/subscriptions/', {'fields': 'id,member'}))
+
+    def test_enroll(self):
+        def prepare():
+            payload = {'member_id': _member_without_active_subscription().id, 'plan_id': str(_plan().id)}
+            return lambda: self.client.post('/api/subscriptions/enroll/', payload, format='json')
+        self.assertQueryBudget(16, prepare, status_codes=(201,))
+
+    def test_change_plan(self):
+        def prepare():
+            plan = _plan()
+            subscription = Subscription.objects.create(
+                member=_member_without_active_subscription(), plan=plan, status='active', start_date=date.today(),
+            )
+            new_plan = _plan(price__gt=plan.price)
+            return lambda: self.client.post(
+                f'/api/subscriptions/{subscription.id}/change_plan/', {'new_plan_id': str(new_plan.id)}, format='json',
+            )
+        self.assertQueryBudget(20, prepare)
+
+    def test_cancel(self):
+        def prepare():
+            subscription = _subscription(status='active')
+            return lambda: self.client.patch(f'/api/subscriptions/{subscription.id}/cancel/')
+        self.assertQueryBudget(12, prepare)
+
+    def test_renew(self):
+        def prepare():
+            subscription = _subscription(status='active')
+            return lambda: self.client.post(f'/api/subscriptions/{subscription.id}/renew/', {}, format='json')
+        self.assertQueryBudget(18, prepare, status_codes=(201,))
+
+    def test_available_plans(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/available_plans/'))
+
+    def test_member_lookup(self):
+        def prepare():
+            phone = _subscription(status='active').member.phone_number
+            return lambda: self.client.get('/api/subscriptions/member_lookup/', {'phone': phone})
+        self.assertQueryBudget(3, prepare)
+
+    def test_enrollment_data(self):
+        def prepare():
+            member_id = _subscription(status='active').member_id
+            return lambda: self.client.get('/api/subscriptions/enrollment_data/', {'member_id': member_id})
+        self.assertQueryBudget(6, prepare)
+
+    def test_all_members(self):
+        self.assertQueryBudget(2, lambda: lambda: self.client.get('/api/subscriptions/all_members/'))
+
+    def test_active_members(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/active_members/'))
+
+    def test_inactive_members(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/inactive_members/'))
+
+    def test_expiring_members(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/expiring_members/'))
+
+    def test_expiring_soon(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/expiring_soon/'))
+
+    def test_newly_added_members(self):
+        self.assertQueryBudget(3, lambda: lambda: self.client.get('/api/subscriptions/newly_added_members/'))
+
+    def test_member_subscription_history(self):
+        def prepare():
+            member_id = _subscription(status='active').member_id
+            return lambda: self.client.get('/api/subscriptions/member_subscription_history/', {'member_id': member_id})
+        self.assertQueryBudget(5, prepare)
+
+    def test_member_timeline(self):
+        def prepare():
+            member_id = _subscription(status='active').member_id
+            return lambda: self.client.get('/api/subscriptions/member_timeline/', {'member_id': member_id})
+        self.assertQueryBudget(3, prepare)
+
+    def test_subscription_invoice(self):
+        def prepare():
+            subscription = _subscription()
+            return lambda: self.client.get(f'/api/subscriptions/{subscription.id}/subscription_invoice/')
+        self.assertQueryBudget(3, prepare)
+
+
+class MemberSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(members=5, subscriptions=10, history=30, seed_value=17)
+
+    def test_seeded_history_shares_member_snapshots(self):
+        self.assertEqual(MemberSnapshot.objects.count(), 5)
+        self.assertEqual(SubscriptionHistory.objects.count(), 30)
+
+    def test_unchanged_member_is_stored_once(self):
+        member = _member_without_active_subscription()
+        subscription = Subscription.objects.create(member=member, plan=_plan(), status='pending')
+        subscription.status = 'active'
+        subscription.save()
+        subscription.status = 'cancelled'
+        subscription.save()
+
+        entries = SubscriptionHistory.objects.filter(subscription=subscription)
+        self.assertEqual(entries.count(), 3)
+        self.assertEqual(entries.values('member_snapshot_ref').distinct().count(), 1)
+
+        member.occupation = 'Architect'
+        member.save()
+        subscription.status = 'expired'
+        subscription.save()
+        self.assertEqual(entries.values('member_snapshot_ref').distinct().count(), 2)
+
+    def test_intern_many_dedupes_in_order(self):
+        first, second = {'full_name': 'A', 'city': 'Kochi'}, {'city': 'Kochi', 'full_name': 'B'}
+        stored = MemberSnapshot.intern_many([first, second, dict(reversed(first.items()))])
+        self.assertEqual([snapshot.data for snapshot in stored], [first, second, first])
+        self.assertEqual(stored[0].pk, stored[2].pk)
+        self.assertEqual(MemberSnapshot.intern(second).pk, stored[1].pk)
+
+    def test_stored_snapshots_are_not_rewritten(self):
+        stored = list(MemberSnapshot.objects.values_list('data', flat=True))
+        new = {'full_name': 'New', 'city': 'Thrissur'}
+        with CaptureQueriesContext(connection) as queries:
+            MemberSnapshot.intern_many(stored + [new])
+        writes = [query['sql'] for query in queries if not query['sql'].startswith('SELECT')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('Thrissur', writes[0])
+        self.assertFalse(any(data['full_name'] in writes[0] for data in stored))
+
+        with self.assertNumQueries(1):
+            MemberSnapshot.intern_many(stored + [new])
+
+    def test_serializer_reads_member_snapshot(self):
+        entry = SubscriptionHistory.objects.select_related('member_snapshot_ref').first()
+        with self.assertNumQueries(0):
+            data = SubscriptionHistorySerializer(entry).data
+        self.assertEqual(data['member_snapshot'], entry.member_snapshot_ref.data)
+        self.assertIn('full_name', data['member_snapshot'])
+
+
+class SubscriptionChangeTrackingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(members=5, subscriptions=10, history=0, seed_value=23)
+        add_edge_cases(1)
+
+    def _loaded(self, **filters):
+        return Subscription.objects.select_related('member', 'plan').filter(**filters).order_by('created_at').first()
+
+    def test_update_does_not_reread_the_row(self):
+        subscription = self._loaded(status='active')
+        subscription.status = 'cancelled'
+        with CaptureQueriesContext(connection) as queries:
+            subscription.save()
+        self.assertFalse([q['sql'] for q in queries if 'FROM "subscriptions_subscription"' in q['sql']
+                          or 'FROM "plans_membershipplan"' in q['sql'] or 'FROM "members_member"' in q['sql']])
+
+        entry = SubscriptionHistory.objects.exclude(note='Subscription created').get(subscription=subscription)
+        self.assertEqual(entry.snapshot['status'], 'active')
+        self.assertEqual(entry.member_snapshot['full_name'], subscription.member.full_name)
+
+    def test_consecutive_saves_compare_with_last_saved_state(self):
+        subscription = self._loaded(status='active')
+        subscription.status = 'expired'
+        subscription.save()
+        subscription.save()  # nothing changed since the last save
+        subscription.status = 'cancelled'
+        subscription.save()
+        statuses = (SubscriptionHistory.objects.filter(subscription=subscription)
+                    .exclude(note='Subscription created').order_by('id'))
+        self.assertEqual([entry.snapshot['status'] for entry in statuses], ['active', 'expired'])
+
+    def test_plan_change_snapshots_the_old_plan(self):
+        subscription = self._loaded(status='active')
+        subscription.start_date = date.today()
+        subscription.save()
+        old_plan = subscription.plan
+        subscription.plan = MembershipPlan.objects.exclude(pk=old_plan.pk).first()
+        subscription.save()
+
+        entry = SubscriptionHistory.objects.filter(subscription=subscription).order_by('-id').first()
+        self.assertEqual(entry.snapshot['plan_name'], old_plan.name)
+        self.assertEqual(entry.note, "Plan changed during grace period")
+        self.assertEqual(subscription.plan_change_logs.get().old_plan, old_plan)
+
+    def test_instance_not_loaded_from_the_database(self):
+        loaded = self._loaded(status='active')
+        subscription = Subscription(
+            id=loaded.id, member_id=loaded.member_id, plan_id=loaded.plan_id, start_date=loaded.start_date,
+            end_date=loaded.end_date, status='cancelled', is_renewal=loaded.is_renewal, created_at=loaded.created_at,
+        )
+        subscription._state.adding = False
+        subscription.save()
+        entry = SubscriptionHistory.objects.exclude(note='Subscription created').get(subscription=subscription)
+        self.assertEqual(entry.snapshot['status'], 'active')
+
+    def test_saving_an_instance_loaded_with_only(self):
+        # Sparse GETs load subscriptions with only(); fields left out must not
+        # look changed (start_date would otherwise compare against its default)
+        pk = self._loaded(status='active').pk
+        subscription = Subscription.objects.only('id', 'signed_by_member').get(pk=pk)
+        subscription.signed_by_member = True
+        subscription.save()
+        self.assertFalse(SubscriptionHistory.objects.exclude(note='Subscription created').filter(subscription_id=pk))
+
+        subscription = Subscription.objects.only('id', 'status').get(pk=pk)
+        subscription.status = 'cancelled'
+        subscription.save()
+        entry = SubscriptionHistory.objects.exclude(note='Subscription created').get(subscription_id=pk)
+        self.assertEqual(entry.snapshot['status'], 'active')
+        self.assertEqual(entry.note, 'Subscription updated')
+
+
+class BulkSubscriptionUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seeding.seed(members=40, subscriptions=120, history=0, seed_value=29)
+        add_edge_cases(1)
+        # Lapsed but never swept
+        Subscription.objects.filter(status='expired').update(status='active')
+
+    def _updated_entries(self, note):
+        return SubscriptionHistory.objects.filter(note=note)
+
+    def test_expire_sweep_records_history(self):
+        lapsed = Subscription.objects.filter(status='active', end_date__lt=date.today())
+        expected = set(lapsed.values_list('pk', flat=True))
+        self.assertGreater(len(expected), 10)
+
+        self.assertEqual(expire_lapsed_subscriptions(), len(expected))
+        self.assertFalse(lapsed.exists())
+        self.assertEqual(set(Subscription.objects.filter(pk__in=expected).values_list('status', flat=True)), {'expired'})
+        entries = self._updated_entries("Subscription expired")
+        self.assertEqual(set(entries.values_list('subscription_id', flat=True)), expected)
+        self.assertEqual({entry.snapshot['status'] for entry in entries}, {'active'})
+        self.assertEqual(expire_lapsed_subscriptions(), 0)
+
+    def test_queries_do_not_grow_with_rows(self):
+        active = Subscription.objects.filter(status='active').order_by('pk')
+        few, many = list(active.values_list('pk', flat=True)[:3]), list(active.values_list('pk', flat=True)[3:])
+        self.assertGreater(len(many), 10 * len(few))
+        counts = []
+        for pks in (few, many):
+            with CaptureQueriesContext(connection) as queries:
+                bulk_update_subscriptions(Subscription.objects.filter(pk__in=pks), note="Frozen", status='pending')
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(self._updated_entries("Frozen").count(), len(few) + len(many))
+
+    def test_rejects_relation_changes(self):
+        with self.assertRaises(ValueError):
+            bulk_update_subscriptions(Subscription.objects.all(), note="Moved", plan=_plan())
+
+    def test_import_command(self):
+        subscriptions = list(Subscription.objects.filter(status='active').order_by('pk')[:4])
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('id,status,signed_by_member\n')
+            for subscription in subscriptions[:2]:
+                f.write(f'{subscription.pk},cancelled,\n')
+            for subscription in subscriptions[2:]:
+                f.write(f'{subscription.pk},,false\n')
+        self.addCleanup(Path(f.name).unlink)
+
+        call_command('import_subscription_changes', f.name, note="Imported", stdout=StringIO())
+        statuses = {s.pk: (s.status, s.signed_by_member) for s in Subscription.objects.filter(pk__in=[s.pk for s in subscriptions])}
+        self.assertEqual([statuses[s.pk][0] for s in subscriptions], ['cancelled', 'cancelled', 'active', 'active'])
+        self.assertFalse(any(statuses[s.pk][1] for s in subscriptions[2:]))
+        self.assertEqual(self._updated_entries("Imported").count(), 2 + sum(s.signed_by_member for s in subscriptions[2:]))
+
+    def test_admin_cancel_action(self):
+        admin_user = User.objects.create_superuser(username='root', email='root@club7.local', password='x')
+        self.client.force_login(admin_user)
+        selected = list(Subscription.objects.filter(status='active').values_list('pk', flat=True)[:3])
+        response = self.client.post('/admin/subscriptions/subscription/', {
+            'action': 'mark_cancelled', '_selected_action': [str(pk) for pk in selected],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Subscription.objects.filter(pk__in=selected, status='cancelled').count(), 3)
+        self.assertEqual(self._updated_entries("Cancelled by admin").count(), 3)
+
+
+class HistoryArchiveTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='archivist', email='archivist@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=12, subscriptions=40, history=160, seed_value=19)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.enterContext(override_settings(HISTORY_ARCHIVE_ROOT=str(self.root)))
+
+    def _timeline(self, member_id):
+        response = self.client.get('/api/subscriptions/member_timeline/', {'member_id': member_id})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_archive_moves_old_entries(self):
+        cutoff = archive.archive_cutoff(6)
+        old = SubscriptionHistory.objects.filter(created_at__date__lt=cutoff)
+        expected = old.count()
+        self.assertGreater(expected, 0)
+        # Snapshots of archived entries predate the run
+        MemberSnapshot.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        call_command('archive_subscription_history', months=6, stdout=StringIO())
+
+        self.assertFalse(old.exists())
+        self.assertEqual(sum(segment.entries for segment in ArchivedHistorySegment.objects.all()), expected)
+        index = json.loads((self.root / archive.INDEX_FILE).read_text())
+        self.assertEqual(sum(entry['entries'] for entry in index['files'].values()), expected)
+        self.assertFalse(MemberSnapshot.objects.filter(history__isnull=True).exists())
+
+        # Nothing left to move on a second run
+        call_command('archive_subscription_history', months=6, stdout=StringIO())
+        self.assertEqual(sum(entry['entries'] for entry in json.loads(
+            (self.root / archive.INDEX_FILE).read_text())['files'].values()), expected)
+
+    def test_prune_keeps_snapshots_interned_during_the_run(self):
+        stale = MemberSnapshot.intern({'full_name': 'Former member'})
+        MemberSnapshot.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(days=2))
+        started = timezone.now()
+
+        # The prune lands between intern() and the insert of the entry
+        intern = MemberSnapshot.intern
+
+        def intern_then_prune(data):
+            snapshot = intern(data)
+            archive.prune_member_snapshots(started)
+            return snapshot
+
+        entry = SubscriptionHistory(subscription=Subscription.objects.first(), snapshot={},
+                                    member_snapshot={'full_name': 'Walk-in'})
+        with mock.patch.object(MemberSnapshot, 'intern', intern_then_prune):
+            entry.save()
+
+        self.assertTrue(MemberSnapshot.objects.filter(pk=entry.member_snapshot_ref_id).exists())
+        self.assertFalse(MemberSnapshot.objects.filter(pk=stale.pk).exists())
+
+    def test_timeline_reads_archived_entries(self):
+        member = Member.objects.filter(subscriptions__history__created_at__date__lt=archive.archive_cutoff(6)).first()
+        before = self._timeline(member.id)
+
+        with mock.patch.object(archive, 'BLOCK_BYTES', 1):
+            call_command('archive_subscription_history', months=6, stdout=StringIO())
+        after = self._timeline(member.id)
+
+        self.assertGreater(after['archived_count'], 0)
+        self.assertEqual(after['count'], before['count'])
+        strip = lambda entries: [{k: v for k, v in entry.items() if k != 'archived'} for entry in entries]
+        self.assertEqual(strip(after['results']), strip(before['results']))
+
+    def test_timeline_requires_member(self):
+        self.assertEqual(self.client.get('/api/subscriptions/member_timeline/').status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/subscriptions/member_timeline/', {'member_id': 999999}).status_code, 404,
+        )
+
+
+class MemberCardTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='counter', email='counter@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=10, subscriptions=30, history=0, seed_value=41)
+        add_edge_cases(1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        self.subscription = _subscription(status='active', end_date__gte=date.today())
+        self.member = self.subscription.member
+
+    def _lookup(self, **params):
+        response = self.client.get('/api/subscriptions/member_lookup/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_card_is_served_from_cache(self):
+        card = self._lookup(phone=self.member.phone_number)
+        self.assertEqual(card['id'], self.member.id)
+        self.assertTrue(card['has_active_subscription'])
+        self.assertEqual(
+            card['current_subscription']['days_remaining'], (self.subscription.end_date - date.today()).days,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self._lookup(phone=self.member.phone_number), card)
+            self.assertEqual(self._lookup(member_id=self.member.id), card)
+
+    def test_subscription_write_invalidates_card(self):
+        member = _member_without_active_subscription()
+        subscription = Subscription.objects.create(
+            member=member, plan=_plan(), status='active', start_date=date.today(),
+        )
+        self.assertTrue(self._lookup(member_id=member.id)['has_active_subscription'])
+        with self.captureOnCommitCallbacks(execute=True):
+            subscription.status = 'cancelled'
+            subscription.save()
+        self.assertFalse(self._lookup(member_id=member.id)['has_active_subscription'])
+
+    def test_stale_lookup_map_falls_back_to_database(self):
+        old_phone = self.member.phone_number
+        self._lookup(phone=old_phone)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.phone_number = '9000000041'
+            self.member.save()
+        self.assertEqual(self._lookup(phone='9000000041')['id'], self.member.id)
+        self.assertEqual(
+            self.client.get('/api/subscriptions/member_lookup/', {'phone': old_phone}).status_code, 404,
+        )
+
+    def test_lookup_requires_a_key(self):
+        self.assertEqual(self.client.get('/api/subscriptions/member_lookup/').status_code, 400)
+        self.assertEqual(self.client.get('/api/subscriptions/member_lookup/', {'member_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/subscriptions/member_lookup/', {'member_id': 999999}).status_code, 404)
+
+    def test_thumbnail(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        photo = BytesIO()
+        Image.new('RGB', (640, 480), 'red').save(photo, 'JPEG')
+        self.member.profile_photo.save('face.jpg', ContentFile(photo.getvalue()))
+
+        card = self._lookup(member_id=self.member.id)
+        self.assertTrue(card['photo_thumbnail'].startswith('http://testserver/media/members/thumbnails/'))
+        thumbnail = Path(media_root, 'members', 'thumbnails').iterdir().__next__()
+        with Image.open(thumbnail) as image:
+            self.assertLessEqual(max(image.size), 96)
+
+
+class FeatureUsageTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='sauna', email='sauna@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=4, subscriptions=8, history=0, seed_value=43)
+        cls.sauna = Feature.objects.create(name='Sauna Test', feature_type='facility')
+        cls.pool = Feature.objects.create(name='Pool Test', feature_type='facility')
+        cls.plan = MembershipPlan.objects.create(name='Metered', plan_type='premium', duration_days=30, price=1000)
+        PlanFeature.objects.create(plan=cls.plan, feature=cls.sauna, allowed_uses=3)
+        PlanFeature.objects.create(plan=cls.plan, feature=cls.pool, is_unlimited=True)
+        cls.subscription = Subscription.objects.create(
+            member=Member.objects.order_by('id').first(), plan=cls.plan, status='active', start_date=date.today(),
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        self.enterContext(mock.patch('gymcrm.redis_client._client', fakeredis.FakeRedis()))
+
+    def _use(self, feature):
+        return self.client.post(f'/api/subscriptions/{self.subscription.id}/use_feature/',
+                                {'feature_id': str(feature.id)}, format='json')
+
+    def test_allowance_is_enforced(self):
+        self.assertEqual([self._use(self.sauna).json()['remaining'] for _ in range(3)], [2, 1, 0])
+        response = self._use(self.sauna)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'No uses left'})
+        self.assertIsNone(self._use(self.pool).json()['remaining'])
+
+        usage = {row['feature_id']: row for row in self.client.get(
+            f'/api/subscriptions/{self.subscription.id}/feature_usage/').json()}
+        self.assertEqual(usage[str(self.sauna.id)]['used'], 3)
+        self.assertEqual(usage[str(self.sauna.id)]['remaining'], 0)
+        self.assertIsNone(usage[str(self.pool.id)]['remaining'])
+
+    def test_concurrent_uses_never_exceed_allowance(self):
+        PlanFeature.objects.filter(plan=self.plan, feature=self.sauna).update(allowed_uses=30)
+        usage.use_feature(self.subscription.id, self.sauna.id)  # seed the counter and allowances
+
+        def attempt(_):
+            try:
+                usage.use_feature(self.subscription.id, self.sauna.id)
+                return True
+            except usage.FeatureUnavailable:
+                return False
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(attempt, range(40)))
+        self.assertEqual(sum(results), 29)
+
+    def test_flush_writes_counts(self):
+        for _ in range(2):
+            usage.use_feature(self.subscription.id, self.sauna.id)
+        usage.use_feature(self.subscription.id, self.pool.id)
+        self.assertEqual(usage.flush_feature_usage(), 2)
+        stored = dict(FeatureUsage.objects.values_list('feature_id', 'uses'))
+        self.assertEqual(stored, {self.sauna.id: 2, self.pool.id: 1})
+
+        # Existing rows are updated; an evicted counter is reseeded from the table
+        usage.use_feature(self.subscription.id, self.pool.id)
+        self.assertEqual(usage.flush_feature_usage(), 1)
+        self.assertEqual(FeatureUsage.objects.get(feature=self.pool).uses, 2)
+        get_redis().flushall()
+        self.assertEqual(usage.use_feature(self.subscription.id, self.sauna.id), 0)
+        self.assertEqual(usage.flush_feature_usage(), 1)
+        self.assertEqual(FeatureUsage.objects.get(feature=self.sauna).uses, 3)
+
+    def test_unavailable_features(self):
+        other = Feature.objects.create(name='Massage Test', feature_type='service')
+        self.assertEqual(self._use(other).status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.status = 'cancelled'
+            self.subscription.save()
+        self.assertEqual(self._use(self.pool).json(), {'error': 'Subscription is not active'})
+
+
+class SparseFieldsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='sparse', email='sparse@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=4, subscriptions=6, history=0, seed_value=50)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def _get(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [query['sql'] for query in queries.captured_queries]
+
+    def test_member_fields(self):
+        member = Member.objects.order_by('id').first()
+        data, queries = self._get(f'/api/members/{member.id}/', fields='id,full_name,age')
+        self.assertEqual(data, {'id': member.id, 'full_name': member.full_name, 'age': member.age})
+        self.assertNotIn('"address_line_1"', queries[-1])
+        self.assertIn('"dob"', queries[-1])
+
+    def test_relations_are_ids_unless_expanded(self):
+        subscription = _subscription()
+        path = f'/api/subscriptions/{subscription.id}/'
+        data, _ = self._get(path, fields='id,member,plan,grace_period_days')
+        self.assertEqual(data['member'], subscription.member_id)
+        self.assertEqual(data['plan'], str(subscription.plan_id))
+        self.assertEqual(data['grace_period_days'], subscription.grace_period_days)
+
+        data, _ = self._get(path, expand='plan')
+        self.assertEqual(data['member'], subscription.member_id)
+        self.assertEqual(data['plan']['features'], self.client.get(path).json()['plan']['features'])
+
+    def test_expanded_relation_fields(self):
+        data, queries = self._get('/api/subscriptions/', fields='id,status,member.full_name,member.phone_number')
+        self.assertEqual(len(data), Subscription.objects.count())
+        self.assertEqual(set(data[0]), {'id', 'status', 'member'})
+        self.assertEqual(set(data[0]['member']), {'full_name', 'phone_number'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"member_snapshot"', queries[0])
+        self.assertNotIn('"plans_membershipplan"', queries[0])
+
+    def test_sync_fields(self):
+        data, _ = self._get('/api/members/sync/', fields='id,full_name')
+        self.assertEqual(set(data['results'][0]), {'id', 'full_name'})
+        self.assertEqual(self.client.get('/api/members/sync/', {'updated_since': data['cursor']}).status_code, 200)
+
+    def test_without_parameters_nothing_changes(self):
+        data = self.client.get('/api/subscriptions/').json()[0]
+        self.assertIn('phone_number', data['member'])
+        self.assertIn('features', data['plan'])
+
+    def test_unknown_fields_are_rejected(self):
+        for params in ({'fields': 'id,nope'}, {'fields': 'member.nope'}, {'expand': 'status'}):
+            response = self.client.get('/api/subscriptions/', params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(self.client.get('/api/members/', {'fields': 'plan'}).status_code, 400)
+
+
+class ExpiringMembersTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='expiry', email='expiry@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=8, subscriptions=10, history=0, seed_value=35)
+        Subscription.objects.filter(status='active').update(end_date=date.today() + timedelta(days=60))
+        members = list(Member.objects.filter(is_active=True).exclude(subscriptions__status='active').order_by('id')[:2])
+        cls.expiring, cls.lapsed = members
+        plan = _plan()
+        Subscription.objects.create(member=cls.expiring, plan=plan, status='active',
+                                    start_date=date.today() - timedelta(days=27), end_date=date.today() + timedelta(days=3))
+        Subscription.objects.create(member=cls.lapsed, plan=plan, status='active',
+                                    start_date=date.today() - timedelta(days=32), end_date=date.today() - timedelta(days=2))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_expiring_members_lists_recently_lapsed(self):
+        data = self.client.get('/api/subscriptions/expiring_members/').json()
+        self.assertEqual([row['id'] for row in data['members']], [self.lapsed.id])
+        self.assertEqual(data['members'][0]['subscription']['days_remaining'], 0)
+
+    def test_expiring_soon_shares_the_expiry_window(self):
+        from members.summary import get_membership_summary
+
+        data = self.client.get('/api/subscriptions/expiring_soon/').json()
+        self.assertEqual([row['id'] for row in data['members']], [self.expiring.id])
+        self.assertEqual(data['members'][0]['subscription']['days_remaining'], 3)
+        self.assertEqual(data['count'], get_membership_summary()['expiring_members'])
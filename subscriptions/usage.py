@@ -0,0 +1,210 @@
+"""
+Metered plan features (sauna sessions, classes, PT sessions).
+
+A plan's PlanFeature rows say how often a subscription may use each
+feature: ``allowed_uses`` times, or without limit when ``is_unlimited`` is
+set or ``allowed_uses`` is 0.
+
+Uses are counted in Redis, one counter per (subscription, feature). A use
+is an INCR; if that takes the count past the allowance it is DECRed back
+and refused. Nothing takes a row lock, so a class of 40 checking in at once
+costs 40 independent increments rather than 40 transactions queueing on
+one FeatureUsage row. A counter missing from Redis (first use, or expired
+after COUNTER_TTL of inactivity) is seeded from the FeatureUsage row.
+
+Every counter that changes is added to a dirty set. flush_feature_usage()
+(the flush-feature-usage beat task, every minute) drains that set and
+copies the counts into FeatureUsage with bulk_update/bulk_create.
+
+Allowances and the subscription's status are cached per subscription for
+FEATURE_ALLOWANCE_CACHE_SECONDS and dropped when the subscription is
+written, so a door check is one cache read and one Redis round trip.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from gymcrm.db_router import read_from_primary
+from gymcrm.redis_client import get_redis
+from plans.models import Feature, PlanFeature
+from subscriptions.models import FeatureUsage, Subscription
+
+COUNTER_PREFIX = 'usage:count'
+DIRTY_KEY = 'usage:dirty'
+COUNTER_TTL = timedelta(days=30)
+FLUSH_BATCH = 1_000
+
+
+class FeatureUnavailable(Exception):
+    pass
+
+
+def _allowances_key(subscription_id):
+    return f'usage:allowances:{subscription_id}'
+
+
+def _counter_key(subscription_id, feature_id):
+    return f'{COUNTER_PREFIX}:{subscription_id}:{feature_id}'
+
+
+@read_from_primary()
+def subscription_allowances(subscription_id):
+    """
+    {'status', 'start_date', 'end_date', 'features': {feature_id: allowed
+    uses, or None if unlimited}} for a subscription, from the cache when
+    possible. Raises FeatureUnavailable for an unknown subscription.
+    """
+    key = _allowances_key(subscription_id)
+    allowances = cache.get(key)
+    if allowances is None:
+        subscription = (Subscription.objects.filter(pk=subscription_id)
+                        .values('plan_id', 'status', 'start_date', 'end_date').first())
+        if subscription is None:
+            raise FeatureUnavailable("Subscription not found")
+        features = PlanFeature.objects.filter(plan_id=subscription.pop('plan_id'))
+        allowances = dict(subscription, features={
+            str(feature_id): None if unlimited or not allowed else allowed
+            for feature_id, allowed, unlimited in features.values_list('feature_id', 'allowed_uses', 'is_unlimited')
+        })
+        cache.set(key, allowances, settings.FEATURE_ALLOWANCE_CACHE_SECONDS)
+    return allowances
+
+
+def invalidate_allowances(subscription_ids):
+    cache.delete_many([_allowances_key(subscription_id) for subscription_id in subscription_ids])
+
+
+def _allowance(subscription_id, feature_id, today=None):
+    allowances = subscription_allowances(subscription_id)
+    today = today or timezone.now().date()
+    if allowances['status'] != 'active' or allowances['start_date'] > today or (
+            allowances['end_date'] and allowances['end_date'] < today):
+        raise FeatureUnavailable("Subscription is not active")
+    if feature_id not in allowances['features']:
+        raise FeatureUnavailable("Feature is not included in the plan")
+    return allowances['features'][feature_id]
+
+
+def _stored_uses(pairs):
+    """{(subscription_id, feature_id): uses} from FeatureUsage for the given pairs."""
+    if not pairs:
+        return {}
+    rows = FeatureUsage.objects.filter(
+        subscription_id__in={subscription_id for subscription_id, _ in pairs},
+        feature_id__in={feature_id for _, feature_id in pairs},
+    ).values_list('subscription_id', 'feature_id', 'uses')
+    return {(str(subscription_id), str(feature_id)): uses for subscription_id, feature_id, uses in rows}
+
+
+def use_feature(subscription_id, feature_id):
+    """
+    Record one use of a feature. Returns the uses left afterwards (None if
+    unlimited); raises FeatureUnavailable if the use is not allowed.
+    """
+    subscription_id, feature_id = str(subscription_id), str(feature_id)
+    allowance = _allowance(subscription_id, feature_id)
+
+    client = get_redis()
+    key = _counter_key(subscription_id, feature_id)
+    pair = f'{subscription_id}:{feature_id}'
+    if not client.exists(key):
+        # NX: if another process seeded it meanwhile, keep its (possibly incremented) count
+        uses = _stored_uses([(subscription_id, feature_id)]).get((subscription_id, feature_id), 0)
+        client.set(key, uses, nx=True, ex=COUNTER_TTL)
+
+    pipe = client.pipeline(transaction=False)
+    pipe.incr(key)
+    pipe.expire(key, COUNTER_TTL)
+    pipe.sadd(DIRTY_KEY, pair)
+    count = pipe.execute()[0]
+
+    if allowance is not None and count > allowance:
+        pipe = client.pipeline(transaction=False)
+        pipe.decr(key)
+        pipe.sadd(DIRTY_KEY, pair)
+        pipe.execute()
+        raise FeatureUnavailable("No uses left")
+    return None if allowance is None else allowance - count
+
+
+def remaining_uses(subscription_id):
+    """
+    [{'feature_id', 'allowed_uses', 'used', 'remaining'}] for every feature
+    of the subscription's plan; allowed_uses and remaining are None if
+    unlimited. Reads the live counters; takes no locks.
+    """
+    subscription_id = str(subscription_id)
+    features = subscription_allowances(subscription_id)['features']
+    feature_ids = sorted(features)
+    counts = get_redis().mget([_counter_key(subscription_id, feature_id) for feature_id in feature_ids]) \
+        if feature_ids else []
+    missing = [(subscription_id, feature_id) for feature_id, count in zip(feature_ids, counts) if count is None]
+    stored = _stored_uses(missing)
+
+    usage = []
+    for feature_id, count in zip(feature_ids, counts):
+        used = int(count) if count is not None else stored.get((subscription_id, feature_id), 0)
+        allowed = features[feature_id]
+        usage.append({
+            'feature_id': feature_id,
+            'allowed_uses': allowed,
+            'used': used,
+            'remaining': None if allowed is None else max(allowed - used, 0),
+        })
+    return usage
+
+
+def flush_feature_usage():
+    """Copy every changed counter into FeatureUsage. Returns the number of rows written."""
+    client = get_redis()
+    flushed = 0
+    while True:
+        pairs = [pair.decode() for pair in client.spop(DIRTY_KEY, FLUSH_BATCH) or []]
+        if not pairs:
+            return flushed
+        counts = client.mget([f'{COUNTER_PREFIX}:{pair}' for pair in pairs])
+        values = {
+            tuple(pair.split(':', 1)): int(count)
+            for pair, count in zip(pairs, counts) if count is not None
+        }
+        try:
+            flushed += _write_usage(values)
+        except Exception:
+            # Keep them for the next flush
+            client.sadd(DIRTY_KEY, *pairs)
+            raise
+
+
+def _write_usage(values):
+    if not values:
+        return 0
+    flushed_at = timezone.now()
+    with transaction.atomic():
+        rows = FeatureUsage.objects.filter(
+            subscription_id__in={subscription_id for subscription_id, _ in values},
+            feature_id__in={feature_id for _, feature_id in values},
+        )
+        existing = {(str(row.subscription_id), str(row.feature_id)): row for row in rows}
+        existing = {pair: row for pair, row in existing.items() if pair in values}
+        for pair, row in existing.items():
+            row.uses = values[pair]
+            row.flushed_at = flushed_at
+        FeatureUsage.objects.bulk_update(existing.values(), ['uses', 'flushed_at'], batch_size=FLUSH_BATCH)
+
+        # Counters of subscriptions or features deleted since their last use are dropped
+        new = [pair for pair in values if pair not in existing]
+        if new:
+            subscriptions = {str(pk) for pk in Subscription.objects.filter(
+                pk__in={subscription_id for subscription_id, _ in new}).values_list('pk', flat=True)}
+            features = {str(pk) for pk in Feature.objects.filter(
+                pk__in={feature_id for _, feature_id in new}).values_list('pk', flat=True)}
+            FeatureUsage.objects.bulk_create([
+                FeatureUsage(subscription_id=subscription_id, feature_id=feature_id,
+                             uses=values[subscription_id, feature_id], flushed_at=flushed_at)
+                for subscription_id, feature_id in new
+                if subscription_id in subscriptions and feature_id in features
+            ], batch_size=FLUSH_BATCH)
+    return len(values)
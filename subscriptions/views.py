@@ -13,20 +13,34 @@ from subscriptions.serializers import (
     SubscriptionHistorySerializer
 )
 from members.models import Member
+from members.cards import LOOKUP_FIELDS, get_member_card, resolve_member_id
+from members.search import matching_members
 from plans.models import MembershipPlan
-from plans.serializers import MembershipPlanSerializer
+from plans.serializers import MembershipPlanSerializer, PLAN_FEATURES_PREFETCH
 from members.serializers import MemberSerializer
 from rest_framework.permissions import IsAuthenticated
 import datetime
+import logging
 from rest_framework import serializers
 from django.conf import settings
 from django.db.models import Prefetch, Q
 from datetime import date, timedelta
 import os
+import uuid
+from redis.exceptions import RedisError
+from gymcrm.conditional import ConditionalGetMixin
+from gymcrm.db_router import primary_db
+from gymcrm.sparse import SparseFieldsMixin
+from plans.catalog import catalog_version
+from sync.changes import sync_response
 
 # Import the WhatsApp tasks
+from .archive import member_timeline
+from .usage import FeatureUnavailable, remaining_uses, use_feature
 from .tasks import send_membership_enrolled_message, send_plan_change_notification
 
+logger = logging.getLogger(__name__)
+
 # --- Helper functions and placeholders for missing functions ---
 def get_subscription_snapshot(subscription):
     # Placeholder: return serialized data or dict snapshot
@@ -42,15 +56,78 @@ def get_member_snapshot(member):
 def send_plan_renewal_notification(*args, **kwargs):
     class DummyTask:
         def delay(self, *a, **kw):
-            print("DEBUG: send_plan_renewal_notification called (dummy)")
+            logger.debug("send_plan_renewal_notification called (dummy)")
     return DummyTask()
 
 
-class SubscriptionViewSet(viewsets.ModelViewSet):
+def _plan_feature_names(plan):
+    """Feature names for the dashboard payloads; callers prefetch 'plan__features'."""
+    return [feature.name for feature in plan.features.all()]
+
+
+def _expiring_member_row(member, subscription, days_remaining):
+    """Member and subscription as the expiring lists of SubscriptionViewSet render them."""
+    photo_url = member.photo.url if getattr(member, 'photo', None) else None
+    return {
+        'id': member.id,
+        'member_id': getattr(member, 'member_id', f"00{member.id}"),
+        'full_name': member.full_name,
+        'email': member.email,
+        'phone_number': member.phone_number,
+        'address': getattr(member, 'address', ''),
+        'biometric_id': member.biometric_id,
+        'created_at': member.created_at,
+        'photo_url': photo_url,
+        'subscription': {
+            'id': subscription.id,
+            'plan_name': subscription.plan.name,
+            'plan_id': subscription.plan.id,
+            'status': subscription.status,
+            'start_date': subscription.start_date,
+            'end_date': subscription.end_date,
+            'days_remaining': days_remaining,
+            'can_change_plan': subscription.can_change_plan() if hasattr(subscription, 'can_change_plan') else False,
+            'is_in_grace_period': subscription.is_in_grace_period() if hasattr(subscription, 'is_in_grace_period') else False,
+            'grace_period_days': getattr(subscription, 'grace_period_days', None),
+            'is_renewal': getattr(subscription, 'is_renewal', False),
+            'plan_details': {
+                'id': subscription.plan.id,
+                'name': subscription.plan.name,
+                'description': getattr(subscription.plan, 'description', ''),
+                'price': getattr(subscription.plan, 'price', None),
+                'duration': getattr(subscription.plan, 'duration', None),
+                'duration_type': getattr(subscription.plan, 'duration_type', None),
+                'features': _plan_feature_names(subscription.plan),
+                'is_active': getattr(subscription.plan, 'is_active', True),
+                'created_at': getattr(subscription.plan, 'created_at', None),
+                'updated_at': getattr(subscription.plan, 'updated_at', None)
+            }
+        }
+    }
+
+
+class SubscriptionViewSet(SparseFieldsMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     lookup_field = 'id'
+    # Grace period, and the embedded member's age
+    changes_daily = True
+
+    def get_validators(self):
+        # The response embeds the member and the plan
+        versions = self.get_object_versions('updated_at', 'member__updated_at')
+        return versions and [*versions, catalog_version()]
+
+    @primary_db
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """Subscriptions changed or deleted since ?updated_since=<cursor> (see sync/changes.py)"""
+        # Unfiltered: a subscription leaving a filter would never be reported
+        queryset = Subscription.objects.select_related('member', 'plan').prefetch_related(
+            f'plan__{PLAN_FEATURES_PREFETCH}'
+        )
+        return sync_response(self, self.restrict_queryset(queryset, always=['updated_at']))
 
     def _get_user_or_none(self, request):
         """Helper method to get user or None for anonymous users"""
@@ -65,7 +142,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = Subscription.objects.select_related('member', 'plan').prefetch_related(
-            'member__subscriptions'
+            f'plan__{PLAN_FEATURES_PREFETCH}'
         )
         
         # Filter by member
@@ -78,14 +155,10 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         if status_filter:
             qs = qs.filter(status=status_filter)
         
-        # Search by member name or phone
+        # Search by member name, phone or biometric id (indexed, see members/search.py)
         query = self.request.query_params.get('q')
         if query:
-            qs = qs.filter(
-                models.Q(member__full_name__icontains=query) |
-                models.Q(member__phone_number__icontains=query) |
-                models.Q(member__biometric_id__icontains=query)
-            )
+            qs = qs.filter(member__in=matching_members(query))
         
         return qs
 
@@ -94,14 +167,10 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         """
         Enroll a member in a subscription plan - creates active subscription by default
         """
-        print("DEBUG: enroll called with data:", request.data)
-        import logging
-        logger = logging.getLogger(__name__)
         logger.debug("enroll called with data: %s", request.data)
 
         serializer = self.get_serializer(data=request.data)
         if not serializer.is_valid():
-            print("DEBUG: serializer errors:", serializer.errors)
             logger.error("serializer errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
@@ -109,7 +178,6 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             with transaction.atomic():
                 # Create subscription with active status
                 subscription = serializer.save(status='active')
-                print("DEBUG: subscription created as active:", subscription)
                 logger.info("subscription created as active: %s", subscription)
                 
                 # Create history entry
@@ -120,7 +188,6 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                     note="Initial enrollment - subscription activated",
                     
                 )
-                print("DEBUG: SubscriptionHistory created for subscription id:", subscription.id)
                 logger.info("SubscriptionHistory created for subscription id: %s", subscription.id)
                 
                 # Trigger WhatsApp message task after successful enrollment
@@ -129,10 +196,8 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                         member_id=str(subscription.member.id),
                         subscription_id=str(subscription.id)
                     )
-                    print("DEBUG: WhatsApp task queued successfully")
                     logger.info("WhatsApp task queued for member: %s", subscription.member.full_name)
                 except Exception as task_error:
-                    print(f"DEBUG: Failed to queue WhatsApp task: {task_error}")
                     logger.error("Failed to queue WhatsApp task: %s", task_error)
                     # Don't fail the enrollment if WhatsApp task fails
                 
@@ -141,7 +206,6 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_201_CREATED
             )
         except Exception as e:
-            print("DEBUG: Exception occurred:", str(e))
             logger.exception("Exception occurred during enrollment")
             return Response(
                 {'error': str(e)}, 
@@ -149,7 +213,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['post'])
-    def change_plan(self, request, pk=None):
+    def change_plan(self, request, id=None):
         """
         Change subscription plan within grace period
         """
@@ -187,9 +251,9 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                         old_plan_name=old_plan_name,
                         new_plan_name=new_plan.name
                     )
-                    print("DEBUG: Plan change notification task queued successfully")
+                    logger.info("Plan change notification queued for subscription: %s", subscription.id)
                 except Exception as task_error:
-                    print(f"DEBUG: Failed to queue plan change notification: {task_error}")
+                    logger.error("Failed to queue plan change notification: %s", task_error)
                     # Don't fail the plan change if notification task fails
                 
             return Response(
@@ -208,7 +272,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             )
 
     @action(detail=True, methods=['patch'])
-    def cancel(self, request, pk=None):
+    def cancel(self, request, id=None):
         """
         Cancel an active subscription
         """
@@ -243,67 +307,82 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         """
         Get all available membership plans
         """
-        plans = MembershipPlan.objects.all()
+        plans = MembershipPlan.objects.prefetch_related(PLAN_FEATURES_PREFETCH)
         serializer = MembershipPlanSerializer(plans, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def use_feature(self, request, id=None):
+        """
+        Record one use of a metered plan feature (sauna, class, PT session) at the door.
+        Body: {"feature_id": "<uuid>"}. Returns the uses left (null if unlimited), or 403
+        when the subscription is not active, the plan lacks the feature or no uses are left.
+        """
+        feature_id = request.data.get('feature_id')
+        try:
+            uuid.UUID(str(id))
+            uuid.UUID(str(feature_id))
+        except ValueError:
+            return Response({'error': 'Valid feature_id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            remaining = use_feature(id, feature_id)
+        except FeatureUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except RedisError:
+            return Response({'error': 'Usage tracking is unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({'feature_id': feature_id, 'remaining': remaining})
+
+    @action(detail=True, methods=['get'])
+    def feature_usage(self, request, id=None):
+        """Uses and remaining uses of every feature in the subscription's plan"""
+        try:
+            uuid.UUID(str(id))
+            usage = remaining_uses(id)
+        except (ValueError, FeatureUnavailable):
+            return Response({'error': 'Subscription not found'}, status=status.HTTP_404_NOT_FOUND)
+        except RedisError:
+            return Response({'error': 'Usage tracking is unavailable'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(usage)
+
     @action(detail=False, methods=['get'])
     def member_lookup(self, request):
         """
-        Look up member by ID, phone, or email for enrollment - OPTIMIZED
+        Look up a member's card by ID, phone, email or biometric ID for enrollment.
+        Cards and the phone/email/biometric ID -> member map are cached (see members/cards.py).
         """
         member_id = request.query_params.get('member_id')
-        phone = request.query_params.get('phone')
-        email = request.query_params.get('email')
-        biometric_id = request.query_params.get('biometric_id')
-        
-        if not any([member_id, phone, email, biometric_id]):
+        lookups = {
+            field: request.query_params.get(field)
+            for field in LOOKUP_FIELDS if request.query_params.get(field)
+        }
+
+        if not member_id and not lookups:
             return Response(
                 {'error': 'Please provide member_id, phone, email, or biometric_id'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        try:
-            # Optimized query with proper prefetching
-            member_qs = Member.objects.select_related().prefetch_related(
-                Prefetch(
-                    'subscriptions',
-                    queryset=Subscription.objects.select_related('plan'),
-                    to_attr='ordered_subscriptions'
-                )
-            )
-            
-            if member_id:
-                member = member_qs.get(id=member_id)
-            elif phone:
-                member = member_qs.get(phone_number=phone)
-            elif email:
-                member = member_qs.get(email=email)
-            elif biometric_id:
-                member = member_qs.get(biometric_id=biometric_id)
-                
-            # Check if member already has active subscription using prefetched data
-            active_subscription = None
-            if hasattr(member, 'ordered_subscriptions'):
-                for subscription in member.ordered_subscriptions:
-                    if subscription.status == 'active':
-                        active_subscription = subscription
-                        break
-            
-            response_data = MemberSerializer(member).data
-            response_data['has_active_subscription'] = bool(active_subscription)
-            
-            if active_subscription:
-                response_data['active_subscription'] = SubscriptionSerializer(active_subscription).data
-            
-            return Response(response_data)
-            
-        except Member.DoesNotExist:
+
+        if member_id:
+            if not member_id.isdigit():
+                return Response({'error': 'member_id must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            field, value = next(iter(lookups.items()))
+            member_id = resolve_member_id(field, value)
+
+        card = get_member_card(member_id) if member_id else None
+        if card is None:
             return Response(
                 {'error': 'Member not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        for photo in ('profile_photo', 'photo_thumbnail'):
+            if card[photo]:
+                card[photo] = request.build_absolute_uri(card[photo])
+        return Response(card)
 
+    # The enrollment that follows must not be decided on lagging data
+    @primary_db
     @action(detail=False, methods=['get'])
     def enrollment_data(self, request):
         """
@@ -313,7 +392,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         
         response_data = {
             'plans': MembershipPlanSerializer(
-                MembershipPlan.objects.all(), 
+                MembershipPlan.objects.prefetch_related(PLAN_FEATURES_PREFETCH),
                 many=True
             ).data
         }
@@ -517,7 +596,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         members_qs = Member.objects.select_related().prefetch_related(
             Prefetch(
                 'subscriptions',
-                queryset=Subscription.objects.select_related('plan').filter(status='active'),
+                queryset=Subscription.objects.select_related('plan').prefetch_related('plan__features').filter(status='active'),
                 to_attr='active_subscriptions'
             )
         ).filter(subscriptions__status='active').distinct().order_by('id')
@@ -572,7 +651,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                         'price': getattr(active_subscription.plan, 'price', None),
                         'duration': getattr(active_subscription.plan, 'duration', None),
                         'duration_type': getattr(active_subscription.plan, 'duration_type', None),
-                        'features': getattr(active_subscription.plan, 'features', []),
+                        'features': _plan_feature_names(active_subscription.plan),
                         'is_active': getattr(active_subscription.plan, 'is_active', True),
                         'created_at': getattr(active_subscription.plan, 'created_at', None),
                         'updated_at': getattr(active_subscription.plan, 'updated_at', None)
@@ -594,7 +673,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         members_qs = Member.objects.select_related().prefetch_related(
             Prefetch(
                 'subscriptions',
-                queryset=Subscription.objects.select_related('plan').order_by('-created_at'),
+                queryset=Subscription.objects.select_related('plan').prefetch_related('plan__features').order_by('-created_at'),
                 to_attr='ordered_subscriptions'
             )
         ).order_by('-id')
@@ -648,7 +727,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                             'price': getattr(latest_subscription.plan, 'price', None),
                             'duration': getattr(latest_subscription.plan, 'duration', None),
                             'duration_type': getattr(latest_subscription.plan, 'duration_type', None),
-                            'features': getattr(latest_subscription.plan, 'features', []),
+                            'features': _plan_feature_names(latest_subscription.plan),
                             'is_active': getattr(latest_subscription.plan, 'is_active', True),
                             'created_at': getattr(latest_subscription.plan, 'created_at', None),
                             'updated_at': getattr(latest_subscription.plan, 'updated_at', None)
@@ -665,14 +744,20 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         today = date.today()
         five_days_ago = today - timedelta(days=5)
 
-        members_qs = Member.objects.prefetch_related(
+        # Ordering by the joined end date repeated members with several
+        # subscriptions; only members with a lapsed active one are loaded and
+        # the rows are sorted below
+        members_qs = Member.objects.filter(
+            id__in=Subscription.objects.filter(
+                status='active', end_date__range=(five_days_ago, today),
+            ).values('member_id'),
+        ).prefetch_related(
             Prefetch(
                 'subscriptions',
-                queryset=Subscription.objects.select_related('plan').filter(status='active'),
+                queryset=Subscription.objects.select_related('plan').prefetch_related('plan__features').filter(status='active'),
                 to_attr='active_subscriptions'
             )
-        ).distinct().order_by('subscriptions__end_date')
-
+        )
 
         members_data = []
 
@@ -689,46 +774,39 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             if days_remaining < 0:
                 days_remaining = 0 
 
-            photo_url = member.photo.url if getattr(member, 'photo', None) else None
+            members_data.append(_expiring_member_row(member, active_subscription, days_remaining))
 
-            member_data = {
-                'id': member.id,
-                'member_id': getattr(member, 'member_id', f"00{member.id}"),
-                'full_name': member.full_name,
-                'email': member.email,
-                'phone_number': member.phone_number,
-                'address': getattr(member, 'address', ''),
-                'biometric_id': member.biometric_id,
-                'created_at': member.created_at,
-                'photo_url': photo_url,
-                'subscription': {
-                    'id': active_subscription.id,
-                    'plan_name': active_subscription.plan.name,
-                    'plan_id': active_subscription.plan.id,
-                    'status': active_subscription.status,
-                    'start_date': active_subscription.start_date,
-                    'end_date': active_subscription.end_date,
-                    'days_remaining': days_remaining,
-                    'can_change_plan': active_subscription.can_change_plan() if hasattr(active_subscription, 'can_change_plan') else False,
-                    'is_in_grace_period': active_subscription.is_in_grace_period() if hasattr(active_subscription, 'is_in_grace_period') else False,
-                    'grace_period_days': getattr(active_subscription, 'grace_period_days', None),
-                    'is_renewal': getattr(active_subscription, 'is_renewal', False),
-                    'plan_details': {
-                        'id': active_subscription.plan.id,
-                        'name': active_subscription.plan.name,
-                        'description': getattr(active_subscription.plan, 'description', ''),
-                        'price': getattr(active_subscription.plan, 'price', None),
-                        'duration': getattr(active_subscription.plan, 'duration', None),
-                        'duration_type': getattr(active_subscription.plan, 'duration_type', None),
-                        'features': getattr(active_subscription.plan, 'features', []),
-                        'is_active': getattr(active_subscription.plan, 'is_active', True),
-                        'created_at': getattr(active_subscription.plan, 'created_at', None),
-                        'updated_at': getattr(active_subscription.plan, 'updated_at', None)
-                    }
-                }
-            }
-            members_data.append(member_data)
+        members_data.sort(key=lambda row: row['subscription']['end_date'])
+        return Response({'members': members_data, 'count': len(members_data)})
+
+    @action(detail=False, methods=["get"])
+    def expiring_soon(self, request):
+        """
+        Active members whose active subscription ends within the coming expiry
+        window shared with the membership summary and the forecast
+        (subscriptions/windows.py). expiring_members lists the ones that ended
+        in the last five days.
+        """
+        from subscriptions.windows import expiring_subscriptions, expiry_window
+
+        today, _ = expiry_window()
+        expiring = expiring_subscriptions(today=today)
+        members_qs = Member.objects.filter(
+            id__in=expiring.values('member_id'), is_active=True,
+        ).prefetch_related(
+            Prefetch(
+                'subscriptions',
+                queryset=expiring.select_related('plan').prefetch_related('plan__features').order_by('end_date'),
+                to_attr='expiring_subscriptions'
+            )
+        )
 
+        members_data = [
+            _expiring_member_row(member, member.expiring_subscriptions[0],
+                                 (member.expiring_subscriptions[0].end_date - today).days)
+            for member in members_qs
+        ]
+        members_data.sort(key=lambda row: row['subscription']['end_date'])
         return Response({'members': members_data, 'count': len(members_data)})
 
     @action(detail=False, methods=["get"])
@@ -743,7 +821,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         members_qs = Member.objects.select_related().prefetch_related(
             Prefetch(
                 'subscriptions',
-                queryset=Subscription.objects.select_related('plan'),
+                queryset=Subscription.objects.select_related('plan').prefetch_related('plan__features'),
                 to_attr='ordered_subscriptions'
             )
         ).order_by('-created_at')  # Most recently created first
@@ -821,7 +899,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                         'price': getattr(current_subscription.plan, 'price', None),
                         'duration': getattr(current_subscription.plan, 'duration', None),
                         'duration_type': getattr(current_subscription.plan, 'duration_type', None),
-                        'features': getattr(current_subscription.plan, 'features', []),
+                        'features': _plan_feature_names(current_subscription.plan),
                         'is_active': getattr(current_subscription.plan, 'is_active', True),
                         'created_at': getattr(current_subscription.plan, 'created_at', None),
                         'updated_at': getattr(current_subscription.plan, 'updated_at', None)
@@ -833,7 +911,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
         return Response({'members': newly_added_members_data, 'count': len(newly_added_members_data)}) 
 
     @action(detail=True, methods=['post'])
-    def renew(self, request, pk=None):
+    def renew(self, request, id=None):
         """
         Renew a subscription plan - creates a new subscription and marks current as completed
         Also allows creation of a PersonalTrainingProfile if pt_profile is provided.
@@ -903,8 +981,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                     start_date=start_date,
                     end_date=new_end_date,
                     status='active',
-                    is_renewal=True,
-                    wants_personal_training=wants_personal_training
+                    is_renewal=True
                 )
                 
                 # If PT details provided, create PT profile
@@ -945,9 +1022,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                     SubscriptionPlanChangeLog.objects.create(
                         subscription=new_subscription,
                         old_plan=current_subscription.plan,
-                        new_plan=new_plan,
-                        changed_by=self._get_user_or_none(request),
-                        change_reason='Plan renewal with plan change'
+                        new_plan=new_plan
                     )
                 
                 # Manual history entry for the new subscription (since it's new, signal won't capture it)
@@ -968,9 +1043,9 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                         new_plan_name=new_plan.name,
                         plan_changed=new_plan.id != current_subscription.plan.id
                     )
-                    print("DEBUG: Plan renewal notification task queued successfully")
+                    logger.info("Plan renewal notification queued for subscription: %s", new_subscription.id)
                 except Exception as task_error:
-                    print(f"DEBUG: Failed to queue plan renewal notification: {task_error}")
+                    logger.error("Failed to queue plan renewal notification: %s", task_error)
                     # Don't fail the renewal if notification task fails
                 
                 return Response({
@@ -1013,7 +1088,7 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_201_CREATED)
                 
         except Exception as e:
-            print(f"DEBUG: Exception during renewal: {str(e)}")
+            logger.exception("Exception during renewal")
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -1100,6 +1175,29 @@ class SubscriptionViewSet(viewsets.ModelViewSet):
             },
             'thermal_invoice': invoice_text
         })
+
+    @action(detail=False, methods=['get'])
+    def member_timeline(self, request):
+        """
+        A member's full subscription history, newest first, including
+        entries moved to the archive by archive_subscription_history
+        """
+        member_id = request.query_params.get('member_id')
+        if not member_id or not member_id.isdigit():
+            return Response(
+                {'error': 'member_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        member = get_object_or_404(Member, id=member_id)
+
+        timeline = member_timeline(member.id)
+        return Response({
+            'member_id': member.id,
+            'count': len(timeline),
+            'archived_count': sum(entry['archived'] for entry in timeline),
+            'results': timeline,
+        })
+
     @action(detail=True, methods=['get'])
     def subscription_invoice(self, request, id=None):
         """
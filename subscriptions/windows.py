@@ -0,0 +1,23 @@
+"""
+Date windows shared by the expiring-members lists, the membership summary
+and the renewal forecast, so "expiring" means the same thing everywhere.
+"""
+from datetime import timedelta
+
+from django.utils.timezone import now
+
+from subscriptions.models import Subscription
+
+# Default look-ahead used by the front desk's expiring lists
+EXPIRING_WINDOW_DAYS = 5
+
+
+def expiry_window(days=EXPIRING_WINDOW_DAYS, today=None):
+    """(first, last) day, inclusive, of the next ``days`` days starting today."""
+    today = today or now().date()
+    return today, today + timedelta(days=days)
+
+
+def expiring_subscriptions(days=EXPIRING_WINDOW_DAYS, today=None):
+    """Active subscriptions whose end date falls inside expiry_window(days)."""
+    return Subscription.objects.filter(status='active', end_date__range=expiry_window(days, today))
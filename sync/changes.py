@@ -0,0 +1,156 @@
+"""
+Incremental "changed since" sync of members and subscriptions.
+
+The reception frontend keeps a local copy and asks only for what changed:
+GET /api/members/sync/?updated_since=<cursor> (likewise
+/api/subscriptions/sync/). Without updated_since it gets everything. The
+response is
+
+    {"results": [rows changed since the cursor, oldest change first],
+     "deleted": [ids of rows deleted since the cursor],
+     "cursor": "<the updated_since of the next request>",
+     "has_more": true when a page was full: ask again straight away}
+
+A subscription row embeds its member as of the subscription's last change;
+member changes arrive through the members stream.
+
+Rows are paged on (updated_at, id), which an index covers, so a page is one
+index range scan however large the table is. Deletions come from the
+Tombstone rows that sync.signals writes in the deleting transaction; they
+are kept for SYNC_TOMBSTONE_DAYS, and an older cursor is answered with 410
+Gone: the client must start over.
+
+updated_at is set before the row's transaction commits, so a row can become
+visible with an updated_at older than rows already handed out. The cursor
+therefore stays SETTLE_SECONDS behind the clock, full page or not: newer
+changes are sent, and sent again by the next request. Clients apply rows as
+upserts and deletions idempotently, so a repeat is harmless. For the same
+reason the sync actions read from the primary (@primary_db): a replica
+lagging by more than SETTLE_SECONDS would lose rows for good.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from sync.models import Tombstone
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1_000
+SETTLE_SECONDS = 10
+
+
+class CursorError(ValueError):
+    pass
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(changed, deleted):
+    """Opaque cursor from the (time, id) positions of both streams; id None means 'before any id'."""
+    positions = [changed[0].isoformat(), changed[1], deleted[0].isoformat(), deleted[1]]
+    return base64.urlsafe_b64encode(json.dumps(positions, default=str).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        changed_at, changed_id, deleted_at, deleted_id = json.loads(raw)
+        changed_at, deleted_at = datetime.fromisoformat(changed_at), datetime.fromisoformat(deleted_at)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise CursorError("Invalid cursor")
+    if timezone.is_naive(changed_at) or timezone.is_naive(deleted_at) or not isinstance(deleted_id, (int, type(None))):
+        raise CursorError("Invalid cursor")
+    return (changed_at, changed_id), (deleted_at, deleted_id)
+
+
+def _after(time_field, id_field, position):
+    at, pk = position
+    if pk is None:
+        return Q(**{f'{time_field}__gte': at})
+    return Q(**{f'{time_field}__gt': at}) | Q(**{time_field: at, f'{id_field}__gt': pk})
+
+
+def _advance(position, page, limit, settled_before):
+    """
+    The next position of a stream: after the page when it was full, else up
+    to the settle line. A full page never moves it past the settle line; the
+    rows after it are sent again once they have settled.
+    """
+    if len(page) >= limit and page[-1][0] < settled_before:
+        return page[-1], True
+    if position is None or position[0] < settled_before:
+        return (settled_before, None), False
+    return position, False
+
+
+def changes_since(queryset, cursor=None, limit=PAGE_SIZE):
+    """
+    (changed rows, deleted ids, next cursor, has_more) of ``queryset``'s
+    model since ``cursor``. Raises CursorError or CursorExpired.
+    """
+    now = timezone.now()
+    settled_before = now - timedelta(seconds=SETTLE_SECONDS)
+    if cursor:
+        changed_from, deleted_from = decode_cursor(cursor)
+        if deleted_from[0] < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+            raise CursorExpired("Cursor is older than the deletion history; sync from scratch")
+    else:
+        # A first sync has nothing to delete
+        changed_from, deleted_from = None, (settled_before, None)
+
+    rows = queryset.order_by('updated_at', 'pk')
+    if changed_from is not None:
+        try:
+            rows = rows.filter(_after('updated_at', 'pk', changed_from))
+        except (ValidationError, ValueError, TypeError):
+            raise CursorError("Invalid cursor")
+    rows = list(rows[:limit])
+
+    label = queryset.model._meta.label_lower
+    tombstones = list(
+        Tombstone.objects.filter(_after('deleted_at', 'pk', deleted_from), model=label)
+        .order_by('deleted_at', 'pk').values_list('deleted_at', 'pk', 'object_id')[:limit]
+    )
+
+    changed_to, more_changed = _advance(
+        changed_from, [(row.updated_at, row.pk) for row in rows], limit, settled_before)
+    deleted_to, more_deleted = _advance(
+        deleted_from, [(at, pk) for at, pk, _ in tombstones], limit, settled_before)
+    to_pk = queryset.model._meta.pk.to_python
+    deleted = [to_pk(object_id) for _, _, object_id in tombstones]
+    return rows, deleted, encode_cursor(changed_to, deleted_to), more_changed or more_deleted
+
+
+def sync_response(view, queryset):
+    """The sync action of a viewset: ``queryset`` rows serialized by the view's serializer."""
+    request = view.request
+    try:
+        limit = min(int(request.query_params.get('limit', PAGE_SIZE)), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        rows, deleted, cursor, has_more = changes_since(queryset, request.query_params.get('updated_since'), limit)
+    except CursorError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except CursorExpired as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+    return Response({
+        'results': view.get_serializer(rows, many=True).data,
+        'deleted': deleted,
+        'cursor': cursor,
+        'has_more': has_more,
+    })
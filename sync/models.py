@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """A deleted member or subscription, reported to syncing clients (see sync.changes)"""
+    model = models.CharField(max_length=50, help_text="App label and model name, e.g. members.member")
+    object_id = models.CharField(max_length=64)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M:%S}"
+
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['model', 'deleted_at', 'id']),
+        ]
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from members.models import Member
+from subscriptions.models import Subscription
+from sync.models import Tombstone
+
+
+@receiver(post_delete, sender=Member)
+@receiver(post_delete, sender=Subscription)
+def record_tombstone(sender, instance, **kwargs):
+    # In the deleting transaction: a rolled-back delete leaves no tombstone
+    Tombstone.objects.create(model=sender._meta.label_lower, object_id=str(instance.pk))
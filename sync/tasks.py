@@ -0,0 +1,19 @@
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from sync.models import Tombstone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def prune_tombstones():
+    """Nightly: drop tombstones older than any cursor still accepted (SYNC_TOMBSTONE_DAYS)."""
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    pruned, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    logger.info("Pruned %s tombstones", pruned)
+    return pruned
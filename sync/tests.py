@@ -0,0 +1,116 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from management.models import User
+from members.models import Member
+from subscriptions import seeding
+from subscriptions.models import Subscription
+from sync.changes import encode_cursor
+from sync.models import Tombstone
+from sync.tasks import prune_tombstones
+
+
+class SyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='sync', email='sync@club7.local', password='x', role='admin', is_staff=True,
+        )
+        seeding.seed(members=12, subscriptions=16, history=0, seed_value=49)
+        # Settled changes: older than the cursor's SETTLE_SECONDS
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Member.objects.update(updated_at=an_hour_ago)
+        Subscription.objects.update(updated_at=an_hour_ago)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, path, cursor=None, **params):
+        if cursor:
+            params['updated_since'] = cursor
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_first_sync_returns_everything(self):
+        data = self._sync('/api/members/sync/')
+        self.assertEqual(len(data['results']), Member.objects.count())
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['has_more'])
+
+    def test_only_changes_since_the_cursor(self):
+        cursor = self._sync('/api/members/sync/')['cursor']
+        self.assertEqual(self._sync('/api/members/sync/', cursor)['results'], [])
+
+        member = Member.objects.order_by('id').first()
+        member.city = 'Kannur'
+        member.save()
+        data = self._sync('/api/members/sync/', cursor)
+        self.assertEqual([row['id'] for row in data['results']], [member.id])
+        self.assertEqual(data['results'][0]['city'], 'Kannur')
+
+    def test_deletions_are_reported(self):
+        cursor = self._sync('/api/subscriptions/sync/')['cursor']
+        subscription = Subscription.objects.order_by('created_at').first()
+        member_id = subscription.member_id
+        subscription.member.delete()
+
+        data = self._sync('/api/members/sync/', cursor)
+        self.assertEqual(data['deleted'], [member_id])
+        data = self._sync('/api/subscriptions/sync/', cursor)
+        self.assertIn(subscription.id, data['deleted'])
+        self.assertEqual(data['results'], [])
+
+    def test_pages_follow_on_without_gaps_or_repeats(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            data = self._sync('/api/subscriptions/sync/', cursor, limit=5)
+            seen += [row['id'] for row in data['results']]
+            cursor, pages = data['cursor'], pages + 1
+            if not data['has_more']:
+                break
+        self.assertEqual(sorted(seen), sorted(str(pk) for pk in Subscription.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertGreater(pages, 3)
+
+    def test_recent_changes_are_sent_again(self):
+        member = Member.objects.order_by('id').first()
+        member.save()
+        cursor = self._sync('/api/members/sync/')['cursor']
+        # Could still be overtaken by a transaction committing late
+        self.assertEqual([row['id'] for row in self._sync('/api/members/sync/', cursor)['results']], [member.id])
+
+    def test_full_pages_stop_at_the_settle_line(self):
+        cursor = self._sync('/api/members/sync/')['cursor']
+        changed = list(Member.objects.order_by('id')[:2])
+        for member in changed:
+            member.save()
+        data = self._sync('/api/members/sync/', cursor, limit=2)
+        self.assertEqual(len(data['results']), 2)
+        self.assertFalse(data['has_more'])
+        again = self._sync('/api/members/sync/', data['cursor'], limit=2)
+        self.assertEqual(sorted(row['id'] for row in again['results']), [member.id for member in changed])
+
+    def test_invalid_and_expired_cursors(self):
+        self.assertEqual(self.client.get('/api/members/sync/', {'updated_since': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/members/sync/', {'limit': 0}).status_code, 400)
+        forged = encode_cursor((timezone.now(), 'not-a-uuid'), (timezone.now(), None))
+        self.assertEqual(self.client.get('/api/subscriptions/sync/', {'updated_since': forged}).status_code, 400)
+
+        long_ago = timezone.now() - timedelta(days=365)
+        expired = encode_cursor((long_ago, None), (long_ago, None))
+        self.assertEqual(self.client.get('/api/members/sync/', {'updated_since': expired}).status_code, 410)
+
+    def test_old_tombstones_are_pruned(self):
+        Member.objects.order_by('id').first().delete()
+        old = Tombstone.objects.count()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        Member.objects.order_by('id').first().delete()
+        recent = Tombstone.objects.count() - old
+
+        self.assertEqual(prune_tombstones(), old)
+        self.assertEqual(Tombstone.objects.count(), recent)